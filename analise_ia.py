@@ -0,0 +1,331 @@
+import time
+import uuid
+import json
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import desempenho
+
+# ==================== ANÁLISE IA ====================
+# Clientes de modelo intercambiáveis, montagem do prompt e fila de análises em lote.
+# A fila roda em threads próprias (fora da sessão do Streamlit) e grava tudo na tabela `analises`.
+
+MODELO_PADRAO = 'models/gemini-1.5-flash'
+# Incrementar sempre que o texto do prompt ou a seleção de trechos da legislação mudar (invalida o cache de respostas)
+VERSAO_PROMPT = 1
+
+# === CLIENTES DE MODELO ===
+class ClienteGemini:
+    def __init__(self, nome_modelo=MODELO_PADRAO):
+        self.nome = nome_modelo
+
+    def gerar(self, prompt):
+        import google.generativeai as genai
+        with desempenho.medir('ia', self.nome, entrada=len(prompt)) as m:
+            resposta = genai.GenerativeModel(self.nome).generate_content(prompt).text
+            m['quantidade'] = len(resposta)
+        return resposta
+
+class ClienteLocal:
+    # Stub determinístico para testar a fila sem rede nem cota; `falhas` simula erros transitórios
+    def __init__(self, latencia=0.0, falhas=0):
+        self.nome = 'local'
+        self.latencia = latencia
+        self.falhas = falhas
+        self._lock = threading.Lock()
+
+    def gerar(self, prompt):
+        with self._lock:
+            if self.falhas > 0:
+                self.falhas -= 1
+                raise RuntimeError("Falha simulada")
+        with desempenho.medir('ia', self.nome, entrada=len(prompt)) as m:
+            if self.latencia: time.sleep(self.latencia)
+            resposta = f"[análise local] prompt com {len(prompt)} caracteres."
+            m['quantidade'] = len(resposta)
+        return resposta
+
+# Nome exibido -> identificador gravado em analises.modelo
+MODELOS = {
+    "Gemini 1.5 Flash": MODELO_PADRAO,
+    "Local (teste)": "local",
+}
+
+def criar_cliente(modelo):
+    return ClienteLocal() if modelo == "local" else ClienteGemini(modelo)
+
+# === PROMPT ===
+def montar_prompt(d, txt_l, txt_p=""):
+    return f"Analise se o projeto cumpre a legislação.\nDADOS: {d[3]}, {d[5]}, {d[7]}m²\nLEI: {txt_l}\nPROJETO: {txt_p}"
+
+def chave_analise(modelo, d, hashes_projeto=(), hashes_leis=(), modo=None):
+    # Impressão digital determinística da análise: mesma entrada -> mesma chave, sem precisar montar o prompt
+    dados = [modelo, VERSAO_PROMPT, d[3], d[5], d[6], d[7], list(hashes_projeto), list(hashes_leis)]
+    if modo: dados.append(modo)
+    return hashlib.sha256(json.dumps(dados, ensure_ascii=False, default=str).encode()).hexdigest()
+
+# === MAP-REDUCE (DOCUMENTOS MAIORES QUE O ORÇAMENTO DO PROMPT) ===
+def dividir_texto(texto, tamanho, sobreposicao=500):
+    # Partes de até `tamanho` caracteres, cortando em quebra de linha quando possível e repetindo um pouco do fim
+    partes, inicio = [], 0
+    while inicio < len(texto):
+        fim = min(inicio + tamanho, len(texto))
+        if fim < len(texto):
+            quebra = texto.rfind("\n", inicio + tamanho // 2, fim)
+            if quebra > 0: fim = quebra
+        partes.append(texto[inicio:fim])
+        if fim >= len(texto): break
+        inicio = max(fim - sobreposicao, inicio + 1)
+    return partes
+
+def montar_prompt_parcial(d, txt_l, trecho, i, n):
+    return (f"Analise se a PARTE {i} de {n} do projeto cumpre a legislação. Liste apenas as conformidades e "
+            f"não conformidades encontradas nesta parte, citando o artigo.\nDADOS: {d[3]}, {d[5]}, {d[7]}m²\nLEI: {txt_l}\nPROJETO (PARTE {i}/{n}): {trecho}")
+
+def montar_prompt_consolidacao(d, parciais):
+    achados = "\n\n".join(f"--- PARTE {i} ---\n{p}" for i, p in enumerate(parciais, 1))
+    return (f"Consolide as análises parciais abaixo, feitas sobre partes do mesmo projeto, num parecer único: "
+            f"elimine repetições, resolva contradições e conclua se o projeto cumpre a legislação.\nDADOS: {d[3]}, {d[5]}, {d[7]}m²\nANÁLISES PARCIAIS:\n{achados}")
+
+def analisar_map_reduce(cliente, d, texto_projeto, buscar_lei, tamanho_parte, max_concorrencia=4):
+    """Analisa cada parte do projeto em paralelo (com no máximo `max_concorrencia` chamadas simultâneas)
+    contra a legislação relevante daquela parte e consolida os achados. Retorna (parecer, parciais)."""
+    partes = dividir_texto(texto_projeto, tamanho_parte)
+    # A busca na legislação usa a conexão do chamador, então roda antes, fora das threads
+    prompts = [montar_prompt_parcial(d, buscar_lei(p), p, i, len(partes)) for i, p in enumerate(partes, 1)]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concorrencia, len(prompts)))) as pool:
+        parciais = list(pool.map(cliente.gerar, prompts))
+    if len(parciais) == 1: return parciais[0], parciais
+    # Redução em níveis enquanto os achados não cabem num único prompt
+    nivel = parciais
+    while sum(len(p) for p in nivel) > tamanho_parte and len(nivel) > 1:
+        grupos, atual = [], []
+        for p in nivel:
+            if atual and sum(len(x) for x in atual) + len(p) > tamanho_parte:
+                grupos.append(atual); atual = []
+            atual.append(p)
+        grupos.append(atual)
+        if len(grupos) == len(nivel): break
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concorrencia, len(grupos)))) as pool:
+            nivel = list(pool.map(lambda g: g[0] if len(g) == 1 else cliente.gerar(montar_prompt_consolidacao(d, g)), grupos))
+    return cliente.gerar(montar_prompt_consolidacao(d, nivel)), parciais
+
+# === TABELA ===
+COLUNAS_FILA = {
+    'lote': 'TEXT', 'prompt': 'TEXT', 'modelo': 'TEXT', 'tentativas': 'INTEGER DEFAULT 0',
+    'erro': 'TEXT', 'data_fim': 'TEXT', 'chave_cache': 'TEXT',
+}
+
+def criar_tabelas(c):
+    existentes = {r[1] for r in c.execute("PRAGMA table_info(analises)")}
+    for coluna, tipo in COLUNAS_FILA.items():
+        if coluna not in existentes: c.execute(f"ALTER TABLE analises ADD COLUMN {coluna} {tipo}")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_analises_status ON analises(status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_analises_lote ON analises(lote)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_analises_processo ON analises(processo_id)")
+    c.execute('''CREATE TABLE IF NOT EXISTS cache_ia (
+        chave TEXT PRIMARY KEY, modelo TEXT, resposta TEXT,
+        tamanho INTEGER, acessos INTEGER DEFAULT 0,
+        criado_em REAL, ultimo_acesso REAL
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_cache_ia_acesso ON cache_ia(ultimo_acesso)")
+
+def _gravar(conn, funcao, esperar=True):
+    # Pelo escritor único quando `conn` é do banco ativo (ver banco.gravar)
+    import banco  # importado aqui: o banco importa este módulo
+    return banco.gravar(conn, funcao, esperar)
+
+def registrar_analise(conn, processo_id, prompt, resultado, modelo, chave_cache=None):
+    _gravar(conn, lambda c: c.execute(
+        "INSERT INTO analises (processo_id, prompt, resultado, status, modelo, chave_cache, data_fim) VALUES (?,?,?,'Concluída',?,?,CURRENT_TIMESTAMP)",
+        (processo_id, prompt, resultado, modelo, chave_cache)))
+
+def enfileirar(conn, itens, modelo):
+    """itens: lista de (processo_id, prompt, chave_cache). Retorna o identificador do lote."""
+    lote = uuid.uuid4().hex[:12]
+    _gravar(conn, lambda c: c.executemany("INSERT INTO analises (processo_id, prompt, chave_cache, status, lote, modelo) VALUES (?,?,?,'Pendente',?,?)",
+                                          [(pid, prompt, chave, lote, modelo) for pid, prompt, chave in itens]))
+    return lote
+
+def progresso_lote(conn, lote):
+    return dict(conn.execute("SELECT status, COUNT(*) FROM analises WHERE lote=? GROUP BY status", (lote,)).fetchall())
+
+# === CACHE DE RESPOSTAS ===
+class CacheRespostas:
+    """Cache persistente (tabela cache_ia) das respostas do modelo, com TTL, limite de tamanho (LRU) e contadores."""
+
+    def __init__(self, ttl_dias=30, max_bytes=50 * 1024 * 1024, max_entradas=5000):
+        self.ttl = ttl_dias * 86400
+        self.max_bytes = max_bytes
+        self.max_entradas = max_entradas
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+        self._em_voo = {}
+
+    def ler(self, conn, chave):
+        agora = time.time()
+        linha = conn.execute("SELECT resposta FROM cache_ia WHERE chave=? AND criado_em >= ?", (chave, agora - self.ttl)).fetchone()
+        if linha is None: return None
+        # Contador de uso: quem leu não precisa esperar a gravação
+        _gravar(conn, lambda c: c.execute("UPDATE cache_ia SET acessos = acessos + 1, ultimo_acesso=? WHERE chave=?", (agora, chave)), esperar=False)
+        return linha[0]
+
+    def gravar(self, conn, chave, modelo, resposta):
+        agora = time.time()
+
+        def inserir(c):
+            c.execute("INSERT OR REPLACE INTO cache_ia (chave, modelo, resposta, tamanho, acessos, criado_em, ultimo_acesso) VALUES (?,?,?,?,0,?,?)",
+                      (chave, modelo, resposta, len(resposta.encode()), agora, agora))
+            self._podar(c, agora)
+        _gravar(conn, inserir)
+
+    def _podar(self, conn, agora):
+        # Expirados pelo TTL e, acima dos limites, os menos usados recentemente
+        conn.execute("DELETE FROM cache_ia WHERE criado_em < ?", (agora - self.ttl,))
+        conn.execute("""DELETE FROM cache_ia WHERE chave IN (
+            SELECT chave FROM (SELECT chave, SUM(tamanho) OVER (ORDER BY ultimo_acesso DESC) AS acumulado,
+                                      ROW_NUMBER() OVER (ORDER BY ultimo_acesso DESC) AS posicao FROM cache_ia)
+            WHERE acumulado > ? OR posicao > ?)""", (self.max_bytes, self.max_entradas))
+
+    def obter_ou_gerar(self, conn, chave, modelo, gerar):
+        """Retorna (resposta, veio_do_cache). Pedidos simultâneos da mesma chave esperam a primeira geração."""
+        resposta = self.ler(conn, chave)
+        if resposta is not None:
+            with self._lock: self.acertos += 1
+            return resposta, True
+        with self._lock:
+            evento = self._em_voo.get(chave)
+            dono = evento is None
+            if dono: evento = self._em_voo[chave] = threading.Event()
+        if not dono:
+            evento.wait()
+            resposta = self.ler(conn, chave)
+            if resposta is not None:
+                with self._lock: self.acertos += 1
+                return resposta, True
+        with self._lock: self.falhas += 1
+        try:
+            resposta = gerar()
+            self.gravar(conn, chave, modelo, resposta)
+            return resposta, False
+        finally:
+            if dono:
+                with self._lock: self._em_voo.pop(chave, None)
+                evento.set()
+
+    def estatisticas(self, conn):
+        entradas, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM cache_ia").fetchone()
+        consultas = self.acertos + self.falhas
+        return {'acertos': self.acertos, 'falhas': self.falhas, 'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'entradas': entradas, 'bytes': total_bytes}
+
+# === CONTROLE DE TAXA ===
+class LimitadorTaxa:
+    # Token bucket compartilhado pelos workers: no máximo `por_minuto` chamadas, sem rajadas maiores que `rajada`
+    def __init__(self, por_minuto=15, rajada=1):
+        self.intervalo = 60.0 / por_minuto
+        self.capacidade = rajada
+        self.fichas = rajada
+        self.ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self.fichas = min(self.capacidade, self.fichas + (agora - self.ultimo) / self.intervalo)
+                self.ultimo = agora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                espera = (1 - self.fichas) * self.intervalo
+            time.sleep(espera)
+
+# === FILA ===
+class FilaAnalises:
+    # Os workers leem pela conexão da própria thread do `banco_dados` (banco.Banco) e escrevem pelo escritor único dele
+    def __init__(self, banco_dados, fabrica_cliente=criar_cliente, cache=None, max_workers=3, por_minuto=15, max_tentativas=3, backoff_base=2.0):
+        self.banco = banco_dados
+        self.fabrica_cliente = fabrica_cliente
+        self.cache = cache
+        self._clientes = {}
+        self.max_workers = max_workers
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.limitador = LimitadorTaxa(por_minuto)
+        self._novo_trabalho = threading.Event()
+        self._parar = threading.Event()
+        self._threads = []
+        self._lock_clientes = threading.Lock()
+
+    def _cliente(self, modelo):
+        with self._lock_clientes:
+            if modelo not in self._clientes: self._clientes[modelo] = self.fabrica_cliente(modelo)
+            return self._clientes[modelo]
+
+    def iniciar(self):
+        if self._threads: return self
+        # Jobs interrompidos por um reinício voltam para a fila
+        self.banco.transacao(lambda c: c.execute("UPDATE analises SET status='Pendente' WHERE status='Processando'"))
+        for i in range(self.max_workers):
+            t = threading.Thread(target=self._worker, name=f"fila-ia-{i}", daemon=True)
+            t.start(); self._threads.append(t)
+        self.avisar()
+        return self
+
+    def avisar(self):
+        self._novo_trabalho.set()
+
+    def parar(self, timeout=5):
+        self._parar.set(); self._novo_trabalho.set()
+        for t in self._threads: t.join(timeout)
+        self._threads = []
+
+    def _reservar(self, conn):
+        # Sem pendentes, nem passa pelo escritor; a reserva (leitura e UPDATE) é uma transação só do escritor único,
+        # então dois workers nunca pegam o mesmo job
+        if not conn.execute("SELECT 1 FROM analises WHERE status='Pendente' LIMIT 1").fetchone(): return None
+
+        def reservar(c):
+            linha = c.execute("SELECT id, prompt, modelo, chave_cache FROM analises WHERE status='Pendente' ORDER BY id LIMIT 1").fetchone()
+            if linha: c.execute("UPDATE analises SET status='Processando', data_analise=CURRENT_TIMESTAMP WHERE id=?", (linha[0],))
+            return linha
+        return self.banco.transacao(reservar)
+
+    def _worker(self):
+        conn = self.banco.conexao()
+        try:
+            while not self._parar.is_set():
+                job = self._reservar(conn)
+                if job is None:
+                    self._novo_trabalho.wait(timeout=5)
+                    self._novo_trabalho.clear()
+                    continue
+                self._processar(conn, *job)
+        finally:
+            conn.close()
+
+    def _processar(self, conn, job_id, prompt, modelo, chave_cache):
+        modelo = modelo or MODELO_PADRAO
+        for tentativa in range(1, self.max_tentativas + 1):
+            try:
+                def gerar():
+                    self.limitador.aguardar()
+                    return self._cliente(modelo).gerar(prompt)
+                if self.cache and chave_cache:
+                    resultado, _ = self.cache.obter_ou_gerar(conn, chave_cache, modelo, gerar)
+                else:
+                    resultado = gerar()
+                self.banco.transacao(lambda c: c.execute(
+                    "UPDATE analises SET status='Concluída', resultado=?, erro=NULL, tentativas=?, data_fim=CURRENT_TIMESTAMP WHERE id=?",
+                    (resultado, tentativa, job_id)))
+                return
+            except Exception as e:
+                erro = str(e)
+                self.banco.transacao(lambda c: c.execute("UPDATE analises SET tentativas=?, erro=? WHERE id=?", (tentativa, erro, job_id)))
+                if tentativa < self.max_tentativas and not self._parar.is_set():
+                    # Backoff exponencial com jitter
+                    time.sleep(self.backoff_base * 2 ** (tentativa - 1) * (1 + random.random()))
+        self.banco.transacao(lambda c: c.execute("UPDATE analises SET status='Erro', data_fim=CURRENT_TIMESTAMP WHERE id=?", (job_id,)))
@@ -1,571 +1,866 @@
 import streamlit as st
-import google.generativeai as genai
-import PyPDF2
+from streamlit.errors import StreamlitAPIException
 from datetime import datetime, date
-import sqlite3
+from importlib.metadata import version, PackageNotFoundError
 import os
-from fpdf import FPDF
+import io
+import hashlib
+import tempfile
+from extracao_pdf import extrair_textos, hash_conteudo
+import legislacao
+import analise_ia
+import permanencia
+import busca
+import tendencias
+import exportacao
+import importacao
+import backup
+import banco
+import desempenho
+import cache_leituras
+from banco import (
+    executar_query, listar_processos_pagina, listar_analistas, listar_status, buscar_processo,
+    contar_por_status, listar_cartoes_kanban, mover_processos, ORDENACOES_PROCESSOS,
+)
 
 # ==================== CONFIGURAÇÃO INICIAL ====================
 st.set_page_config(page_title="Sistema de Validação", page_icon="🏛️", layout="wide")
 
-# Tentativa segura de importar bibliotecas gráficas
-try:
-    import pandas as pd
-    import plotly.express as px
-except ImportError:
-    pd = None
-    px = None
-
 # ==================== BANCO DE DADOS ====================
 @st.cache_resource
 def init_db():
     try:
-        conn = sqlite3.connect('processos.db', check_same_thread=False)
-        c = conn.cursor()
-        # Tabelas
-        c.execute('''CREATE TABLE IF NOT EXISTS processos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            numero TEXT UNIQUE NOT NULL,
-            rt TEXT, requerente TEXT, analista TEXT, uso TEXT,
-            tipologia TEXT, area REAL, data_protocolo TEXT,
-            status TEXT DEFAULT 'Protocolado',
-            data_cadastro TEXT DEFAULT CURRENT_TIMESTAMP
-        )''')
-        c.execute('''CREATE TABLE IF NOT EXISTS tramitacao (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            processo_id INTEGER, setor TEXT, data_entrada TEXT,
-            data_saida TEXT, observacao TEXT,
-            FOREIGN KEY (processo_id) REFERENCES processos(id)
-        )''')
-        c.execute('''CREATE TABLE IF NOT EXISTS analises (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            processo_id INTEGER, resultado TEXT, status TEXT,
-            data_analise TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (processo_id) REFERENCES processos(id)
-        )''')
-        
-        # === CORREÇÃO DE NOMES DE SETORES ANTIGOS ===
-        updates = [
-            "UPDATE tramitacao SET setor = 'Pré-análise' WHERE setor = 'Pró-análise'",
-            "UPDATE tramitacao SET setor = 'Pré-análise' WHERE setor = 'Pró-Análise'",
-            "UPDATE tramitacao SET setor = 'Pré-análise' WHERE setor = 'Pro-analise'",
-            "UPDATE tramitacao SET setor = 'Pré-análise' WHERE setor = 'Pro-Analise'"
-        ]
-        for cmd in updates:
-            c.execute(cmd)
-            
-        conn.commit()
-        return conn
+        return banco.iniciar(banco.CAMINHO_DB)
     except Exception as e:
         st.error(f"Erro no Banco de Dados: {e}")
         return None
 
-conn = init_db()
+db = init_db()
+banco.usar(db)
 
-# ==================== FUNÇÕES AUXILIARES ====================
-def executar_query(query, params=(), commit=False):
-    if not conn: return False, "Sem conexão"
-    try:
-        c = conn.cursor()
-        c.execute(query, params)
-        if commit: conn.commit()
-        return True, c
-    except Exception as e:
-        return False, str(e)
+def conexao():
+    # A conexão do SQLite só vale na thread que a abriu, e cada rerun (da página ou de um fragmento) pode rodar
+    # em outra thread: pega-se a conexão da thread atual a cada uso, nunca guardada em variável global
+    return db.conexao() if db else None
 
-def listar_processos():
-    suc, res = executar_query('SELECT * FROM processos ORDER BY id DESC')
-    return res.fetchall() if suc else []
+# === KANBAN ===
+KANBAN_POR_PAGINA = 20
 
-def buscar_processo(numero_ou_id):
-    query = 'SELECT * FROM processos WHERE id = ?' if isinstance(numero_ou_id, int) else 'SELECT * FROM processos WHERE numero = ?'
-    suc, res = executar_query(query, (numero_ou_id,))
-    return res.fetchone() if suc else None
+def get_resumo_dashboard():
+    return banco.resumo_dashboard(conexao()) if db else None
 
-def get_processos_df():
-    if not conn: return pd.DataFrame()
-    try:
-        df = pd.read_sql_query("SELECT * FROM processos", conn)
-        df['data_protocolo'] = pd.to_datetime(df['data_protocolo'], errors='coerce')
-        return df
-    except Exception:
-        return pd.DataFrame()
-
-# === FUNÇÃO DE GERAÇÃO DE PDF DO DASHBOARD ===
-class PDFRelatorio(FPDF):
-    def header(self):
-        # Fundo do cabeçalho
-        self.set_fill_color(240, 240, 240)
-        self.rect(0, 0, 210, 30, 'F')
-        self.set_font('Arial', 'B', 14)
-        self.set_y(10)
-        self.cell(0, 10, 'Relatório Gerencial - Sistema de Validação', 0, 1, 'C')
-        self.ln(15)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Página {self.page_no()} - Gerado via Sistema Automático', 0, 0, 'C')
-
-def gerar_pdf_dashboard(df, metricas, fig_status=None, fig_uso=None, fig_tipo=None):
-    pdf = PDFRelatorio()
-    pdf.add_page()
-    pdf.set_font("Arial", size=10)
-    
-    # 1. Cabeçalho com Métricas Gerais
-    pdf.set_font("Arial", 'B', 11)
-    pdf.cell(0, 8, f"Data do Relatório: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 0, 1)
-    pdf.ln(2)
-    
-    # Tabela de Resumo Executivo
-    pdf.set_fill_color(230, 230, 250) # Lilás bem claro
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(0, 8, "  Resumo Executivo", 0, 1, 'L', fill=True)
-    pdf.ln(2)
-    
-    pdf.set_font("Arial", size=10)
-    w_col = 63
-    pdf.cell(w_col, 8, f"Total de Processos: {metricas['total']}", 1)
-    pdf.cell(w_col, 8, f"Aprovados: {metricas['aprovados']}", 1)
-    pdf.cell(w_col, 8, f"Média Dias: {metricas['media_dias']}", 1, 1)
-    pdf.cell(w_col*2, 8, f"Área Total Analisada: {metricas['area_total']}", 1, 1)
-    pdf.ln(5)
-
-    # 2. Inserção dos Gráficos
-    pdf.set_font("Arial", 'B', 10)
-    pdf.set_fill_color(230, 230, 250)
-    pdf.cell(0, 8, "  Indicadores Visuais", 0, 1, 'L', fill=True)
-    pdf.ln(2)
-    
-    def salvar_img_temp(fig, nome):
-        try:
-            fig.write_image(nome, width=600, height=400, scale=2)
-            return True
-        except Exception:
-            return False
-
-    y_start = pdf.get_y()
-    
-    # GRÁFICOS LADO A LADO (Status e Uso)
-    if fig_status and fig_uso:
-        salvar_img_temp(fig_status, "temp_status.png")
-        salvar_img_temp(fig_uso, "temp_uso.png")
-        pdf.image("temp_status.png", x=10, y=y_start, w=90)
-        pdf.image("temp_uso.png", x=105, y=y_start, w=90)
-        if os.path.exists("temp_status.png"): os.remove("temp_status.png")
-        if os.path.exists("temp_uso.png"): os.remove("temp_uso.png")
-        pdf.ln(65)
-
-    # GRÁFICO DE TIPOLOGIA
-    if fig_tipo:
-        if pdf.get_y() > 220: pdf.add_page()
-        salvar_img_temp(fig_tipo, "temp_tipo.png")
-        x_center = (210 - 120) / 2
-        pdf.image("temp_tipo.png", x=x_center, w=120)
-        if os.path.exists("temp_tipo.png"): os.remove("temp_tipo.png")
-        pdf.ln(5)
-
-    # 3. Produtividade Analistas
-    if pdf.get_y() > 220: pdf.add_page()
-    pdf.ln(5)
-    
-    pdf.set_font("Arial", 'B', 10)
-    pdf.set_fill_color(230, 230, 250)
-    pdf.cell(0, 8, "  Produtividade da Equipe", 0, 1, 'L', fill=True)
-    pdf.ln(2)
-    
-    df_analista = df[df['analista'].str.len() > 0].groupby('analista')['area'].sum().sort_values(ascending=False)
-    
-    pdf.set_fill_color(245, 245, 245)
-    pdf.set_font("Arial", 'B', 9)
-    pdf.cell(120, 8, "Analista Responsável", 1, 0, fill=True)
-    pdf.cell(50, 8, "Área Total (m²)", 1, 1, fill=True)
-    
-    pdf.set_font("Arial", size=9)
-    for analista, area in df_analista.items():
-        analista_clean = str(analista).encode('latin-1', 'replace').decode('latin-1')
-        pdf.cell(120, 8, analista_clean, 1)
-        pdf.cell(50, 8, f"{area:,.2f}", 1, 1)
+# === RELATÓRIO PDF DO DASHBOARD ===
+def chave_resumo(resumo):
+    # Impressão digital dos dados agregados: muda só quando o conteúdo do dashboard muda
+    import pandas as pd
+    h = hashlib.sha256()
+    for nome in ('status', 'uso', 'tipologia', 'analista'):
+        h.update(nome.encode())
+        h.update(pd.util.hash_pandas_object(resumo[nome], index=False).values.tobytes())
+    h.update(f"{resumo['media_dias']:.0f}".encode())
+    return h.hexdigest()
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def renderizar_graficos_dashboard(chave, _resumo):
+    import relatorio_pdf
+    # Só entra nas medições quando os gráficos são de fato gerados (acerto de cache não executa a função)
+    with desempenho.medir('pdf', 'gráficos do relatório do dashboard') as m:
+        imagens = tuple(relatorio_pdf.renderizar_figura(f) for f in relatorio_pdf.montar_figuras_dashboard(_resumo))
+        m['quantidade'] = sum(len(i) for i in imagens if i)
+    return imagens
+
+def gerar_pdf_dashboard(chave, metricas, resumo):
+    # O caro (JPEGs pelo kaleido) fica em cache entre as sessões; o PDF pronto fica na sessão (ver aba_dashboard)
+    import relatorio_pdf
+    return relatorio_pdf.gerar_pdf_dashboard(resumo['analista'], metricas, *renderizar_graficos_dashboard(chave, resumo))
+
+# Orçamento de caracteres de cada documento enviado à IA
+LIMITE_TEXTO_IA = 30000
+# Chamadas simultâneas ao modelo no modo completo (map-reduce)
+MAX_CONCORRENCIA_IA = 4
+
+# === FILA DE ANÁLISES EM LOTE ===
+@st.cache_resource
+def obter_cache_ia():
+    return analise_ia.CacheRespostas()
 
-    return pdf.output(dest='S').encode('latin-1')
+@st.cache_resource
+def obter_fila_ia():
+    # Uma única fila por servidor, compartilhada por todas as sessões
+    return analise_ia.FilaAnalises(db, cache=obter_cache_ia()).iniciar()
 
-# ==================== INTERFACE PRINCIPAL ====================
-def main():
-    # --- LOGIN ---
-    if 'logged_in' not in st.session_state: st.session_state['logged_in'] = False
-    
-    if not st.session_state['logged_in']:
-        st.title("🔐 Login")
-        with st.form("login"):
-            user = st.text_input("Usuário")
-            pwd = st.text_input("Senha", type="password")
-            if st.form_submit_button("Entrar"):
-                admin_user = st.secrets.get("admin_user", {}).get("username", "admin")
-                admin_pass = st.secrets.get("admin_user", {}).get("password", "admin")
+@st.fragment(run_every=3)
+def painel_fila_ia():
+    import pandas as pd
+    lotes = st.session_state.get('lotes_ia', [])
+    if not lotes: return
+    for lote in lotes[-3:]:
+        prog = analise_ia.progresso_lote(conexao(), lote)
+        total = sum(prog.values())
+        feitos = prog.get('Concluída', 0) + prog.get('Erro', 0)
+        st.progress(feitos / total if total else 1.0, text=f"Lote {lote}: {feitos}/{total} ({prog.get('Erro', 0)} com erro)")
+    suc, res = executar_query(f"""SELECT p.numero, a.status, a.tentativas, COALESCE(a.resultado, a.erro, ''), a.data_fim
+        FROM analises a LEFT JOIN processos p ON p.id = a.processo_id
+        WHERE a.lote IN ({','.join('?' * len(lotes))}) ORDER BY a.id""", tuple(lotes))
+    if suc:
+        df_fila = pd.DataFrame(res.fetchall(), columns=['Processo', 'Status', 'Tentativas', 'Resultado', 'Concluída em'])
+        st.dataframe(df_fila, use_container_width=True, hide_index=True)
+
+# === LISTAS GLOBAIS ===
+usos = ["Multifamiliar", "Serviços", "Comércio Varejista", "Indústria", "Unifamiliar", "Misto", "Sem destinação específica"]
+tipos = ["Aprovação inicial", "Levantamento do existente", "Modificação de projeto", "Regularização", "Misto", "Análise RIU", "ERB"]
+setores = ["Análise prévia", "Pré-análise", "Analista", "Parecer externo", "Fiscalização", "Emissão de documentos", "Requerente"]
+
+# ==================== ABAS ====================
+# Cada aba é uma função; só a aba selecionada roda a cada rerun e as bibliotecas pesadas são importadas dentro dela
+
+def rerun_parcial():
+    # Num rerun do fragmento (clique dentro dele) só o fragmento roda de novo; fora disso, a página inteira
+    try: st.rerun(scope="fragment")
+    except StreamlitAPIException: st.rerun()
+
+# === BUSCA DE PROCESSOS ===
+# No lugar de listas com todos os processos: o texto digitado vai ao índice FTS5 e só os melhores resultados aparecem
+def _campo_busca(chave):
+    return st.text_input("🔎 Buscar processo", key=f"{chave}_busca", placeholder="Número, requerente, RT ou observação")
+
+def _rotulo(p):
+    return f"{p[1]} - {p[2]} [{p[3]}]"
+
+def seletor_processo(chave, rotulo="Processo:"):
+    achados = busca.buscar_processos(conexao(), _campo_busca(chave)) if db else []
+    if not achados:
+        st.info("Nenhum processo encontrado."); return None
+    rotulos = {p[0]: _rotulo(p) for p in achados}
+    return st.selectbox(rotulo, list(rotulos), format_func=rotulos.get, key=chave)
+
+def seletor_processos(chave, rotulo="Processos:"):
+    # Os já escolhidos continuam entre as opções quando a busca muda
+    rotulos = st.session_state.setdefault(f"{chave}_rotulos", {})
+    achados = busca.buscar_processos(conexao(), _campo_busca(chave)) if db else []
+    rotulos.update((p[0], _rotulo(p)) for p in achados)
+    opcoes = list(dict.fromkeys([*st.session_state.get(chave, []), *(p[0] for p in achados)]))
+    return st.multiselect(rotulo, opcoes, format_func=lambda pid: rotulos.get(pid, str(pid)), key=chave)
+
+# --- ABA 1: CADASTRAR ---
+@desempenho.cronometrar('aba', 'Novo')
+def aba_cadastrar():
+    st.header("Cadastrar Processo")
+    with st.form("novo_proc"):
+        c1, c2 = st.columns(2)
+        num = c1.text_input("Número Processo")
+        rt = c1.text_input("RT")
+        uso = c1.selectbox("Uso", usos)
+        area = c1.number_input("Área (m²)", min_value=0.0)
+        req = c2.text_input("Requerente")
+        ana = c2.text_input("Analista")
+        tipo = c2.selectbox("Tipo", tipos)
+        data = c2.date_input("Data Protocolo", format="DD/MM/YYYY")
+        
+        if st.form_submit_button("Salvar Processo"):
+            suc, msg = banco.salvar_processo({'numero': num, 'rt': rt, 'requerente': req, 'analista': ana, 'uso': uso, 'tipologia': tipo,
+                                              'area': area, 'data_protocolo': data.strftime('%Y-%m-%d')})
+            if suc: st.success("Sucesso!"); st.rerun()
+            else: st.error(f"Erro: {msg}")
+
+    # --- IMPORTAÇÃO EM LOTE ---
+    if db:
+        with st.expander("📥 Importar Planilha (CSV/XLSX)"):
+            tipo_imp = st.radio("Dados", ["Processos", "Tramitações"], horizontal=True, key="imp_tipo")
+            tipo = 'processos' if tipo_imp == "Processos" else 'tramitacao'
+            arquivo_imp = st.file_uploader("Arquivo", type=importacao.formatos_disponiveis(), key="imp_arquivo")
+            if arquivo_imp:
+                try:
+                    cabecalho, _ = importacao.ler_tabela(io.BytesIO(arquivo_imp.getvalue()), arquivo_imp.name)
+                except Exception as e:
+                    st.error(f"Arquivo ilegível: {e}"); return
+                # Colunas sugeridas pelo nome do cabeçalho; o usuário pode trocar qualquer uma
+                sugestao = importacao.mapear_colunas(cabecalho, tipo)
+                st.caption("Coluna do arquivo para cada campo (* obrigatório):")
+                mapa, cols = {}, st.columns(3)
+                for i, (campo, _, obrigatorio, _) in enumerate(importacao.CAMPOS[tipo]):
+                    escolha = cols[i % 3].selectbox(
+                        campo + (" *" if obrigatorio else ""), range(len(cabecalho) + 1), index=sugestao.get(campo, -1) + 1,
+                        format_func=lambda j: "—" if j == 0 else cabecalho[j - 1], key=f"imp_mapa_{tipo}_{campo}")
+                    if escolha: mapa[campo] = escolha - 1
+                faltando = [c for c, _, obrigatorio, _ in importacao.CAMPOS[tipo] if obrigatorio and c not in mapa]
+                if faltando: st.warning(f"Escolha a coluna de: {', '.join(faltando)}")
+                elif st.button("📥 Importar", type="primary", key="imp_executar"):
+                    anterior = st.session_state.pop('importacao', None)
+                    if anterior and os.path.exists(anterior['caminho']): os.remove(anterior['caminho'])
+                    andamento = st.empty()
+                    try:
+                        # Recusas vão para um CSV temporário conforme aparecem, junto com a linha original
+                        with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
+                            rejeitos, texto = importacao.escritor_rejeitos(tmp, cabecalho)
+                            _, linhas = importacao.ler_tabela(io.BytesIO(arquivo_imp.getvalue()), arquivo_imp.name)
+                            r = importacao.importar(db, linhas, mapa, tipo, rejeitos, progresso=lambda lidas, ok, rec: andamento.caption(
+                                f"{lidas} linhas lidas · {ok} importadas · {rec} recusadas"))
+                            texto.flush(); texto.detach()
+                        r.update(caminho=tmp.name, nome=f"recusas_{os.path.splitext(arquivo_imp.name)[0]}.csv")
+                        st.session_state['importacao'] = r
+                    except Exception as e:
+                        st.error(f"Erro na importação: {e}")
+            imp = st.session_state.get('importacao')
+            if imp:
+                st.success(f"{imp['importadas']} importadas, {imp['recusadas']} recusadas de {imp['lidas']} linhas em {imp['segundos']:.1f}s")
+                if imp['recusadas'] and os.path.exists(imp['caminho']):
+                    with open(imp['caminho'], "rb") as f:
+                        st.download_button("📄 Baixar relatório de recusas", f, imp['nome'], "text/csv", key="imp_baixar")
+
+# --- ABA 2: GERENCIAR ---
+@st.fragment
+@desempenho.cronometrar('aba', 'Gerenciar')
+def aba_gerenciar():
+    st.header("Editar ou Excluir")
+    lista_analistas = listar_analistas()
+    lista_status = listar_status()
+    if lista_status:
+        st.caption("Filtros:")
+        col_f1, col_f2, col_f3, col_vazia = st.columns([1, 1, 1, 1])
+        with col_f1: filtro_analista = st.selectbox("👤 Analista:", ["Todos"] + lista_analistas)
+        with col_f2: filtro_status = st.selectbox("📌 Status:", ["Todos"] + lista_status)
+        with col_f3: ordem = st.selectbox("↕️ Ordenar por:", list(ORDENACOES_PROCESSOS))
+
+        termo = _campo_busca("ger_sel")
+        filtros = {'analista': None if filtro_analista == "Todos" else filtro_analista,
+                   'status': None if filtro_status == "Todos" else filtro_status}
+
+        # Pilha de cursores da paginação; volta à primeira página quando os filtros mudam
+        chave_filtros = (filtro_analista, filtro_status, ordem)
+        if st.session_state.get('ger_filtros') != chave_filtros:
+            st.session_state['ger_filtros'] = chave_filtros
+            st.session_state['ger_cursores'] = [None]
+        cursores = st.session_state['ger_cursores']
+
+        # Com texto na busca, os resultados mais relevantes (dentro dos filtros) substituem a paginação
+        if termo.strip():
+            procs_filtrados, prox_cursor = busca.buscar_processos(conexao(), termo, **filtros), None
+        else:
+            procs_filtrados, prox_cursor = listar_processos_pagina(**filtros, ordem=ordem, cursor=cursores[-1])
+
+        if procs_filtrados:
+            if not termo.strip():
+                col_ant, col_pag, col_prox = st.columns([1, 2, 1])
+                if len(cursores) > 1 and col_ant.button("⬅️ Anterior", key="ger_ant"):
+                    cursores.pop(); rerun_parcial()
+                col_pag.caption(f"Página {len(cursores)}")
+                if prox_cursor is not None and col_prox.button("Próxima ➡️", key="ger_prox"):
+                    cursores.append(prox_cursor); rerun_parcial()
+
+            opcoes = {f"{p[1]} - {p[2]} [{p[3]}]": p[0] for p in procs_filtrados}
+            sel = st.selectbox("Selecione o Processo:", list(opcoes.keys()))
+            pid = opcoes[sel]
+            d = buscar_processo(pid)
+            
+            if d:
+                st.markdown("---")
+                with st.form(f"edit_{pid}"):
+                    c1, c2 = st.columns(2)
+                    enum = c1.text_input("Número", d[1])
+                    ert = c1.text_input("RT", d[2])
+                    euso = c1.selectbox("Uso", usos, index=usos.index(d[5]) if d[5] in usos else 0)
+                    earea = c1.number_input("Área", float(d[7] or 0))
+                    ereq = c2.text_input("Requerente", d[3])
+                    eana = c2.text_input("Analista", d[4])
+                    etipo = c2.selectbox("Tipo", tipos, index=tipos.index(d[6]) if d[6] in tipos else 0)
+                    edata = c2.date_input("Data", datetime.strptime(d[8], '%Y-%m-%d').date() if d[8] else None, format="DD/MM/YYYY")
+                    
+                    status_atuais = ['Protocolado', 'Em Análise', 'Aguardando Correções', 'Aprovado', 'Reprovado']
+                    if d[9] not in status_atuais: status_atuais.append(d[9])
+                    estatus = c1.selectbox("Status Atual", status_atuais, index=status_atuais.index(d[9]))
+
+                    st.markdown("---")
+                    btn_save = st.form_submit_button("💾 Salvar Alterações", type="primary")
+                    btn_del = st.form_submit_button("🗑️ Deletar Processo", type="secondary")
+                    
+                    if btn_save:
+                        suc, res = banco.salvar_processo({'numero': enum, 'rt': ert, 'requerente': ereq, 'analista': eana, 'uso': euso, 'tipologia': etipo, 'area': earea,
+                                                          'data_protocolo': edata.strftime('%Y-%m-%d') if edata else None, 'status': estatus}, pid)
+                        if not suc: st.error(f"Erro: {res}")
+                        elif not res.rowcount: st.warning("O processo não existe mais (excluído em outra sessão).")
+                        else: st.success("Salvo!"); st.rerun()
+                    
+                    if btn_del:
+                        st.session_state[f'del_{pid}'] = True
                 
-                if user == admin_user and pwd == admin_pass:
-                    st.session_state['logged_in'] = True
-                    st.rerun()
-                else:
-                    st.error("Dados incorretos.")
-        return
+                if st.session_state.get(f'del_{pid}'):
+                    st.warning("Confirma a exclusão?")
+                    if st.button("Sim, Excluir Definitivamente"):
+                        suc, res = banco.excluir_processo(pid)
+                        if suc: st.success("Excluído!"); st.rerun()
+                        else: st.error(f"Erro: {res}")
+        else:
+            st.warning("Nenhum processo encontrado com esses filtros.")
+
+# --- ABA 3: TRAMITAÇÃO ---
+@desempenho.cronometrar('aba', 'Tramitação')
+def aba_tramitacao():
+    import pandas as pd
+    st.header("Tramitação")
+    conn = conexao()
+    if conn:
+        with st.expander("⏱️ Prazos (SLA) e Permanência por Setor"), desempenho.medir('secao', 'prazos e permanência'):
+            # Percentis lidos do histograma mantido por triggers; atrasos pelo índice das movimentações em aberto
+            percentis = permanencia.percentis_setor(conn)
+            atrasos = permanencia.contar_violacoes(conn)
+            if percentis:
+                df_perc = pd.DataFrame([
+                    {'Setor': s, 'Prazo (dias)': permanencia.SLA_PADRAO_DIAS.get(s), 'Concluídas': v.get('concluidas', 0),
+                     'P50': v.get('p50'), 'P90': v.get('p90'), 'P95': v.get('p95'), 'Em aberto': v.get('abertas', 0),
+                     'Mais antiga (dias)': v.get('mais_antiga'), 'Fora do prazo': atrasos.get(s, 0)}
+                    for s, v in percentis.items() if s
+                ]).sort_values('Fora do prazo', ascending=False)
+                st.dataframe(df_perc, use_container_width=True, hide_index=True)
+            sc1, sc2 = st.columns(2)
+            setor_sla = sc1.selectbox("Setor", setores, key="sla_setor")
+            dias_sla = sc2.number_input("Há mais de (dias)", min_value=0, step=1, key=f"sla_dias_{setor_sla}",
+                                        value=permanencia.SLA_PADRAO_DIAS.get(setor_sla, 30))
+            violacoes = permanencia.violacoes_sla(conn, setor_sla, dias_sla)
+            if violacoes:
+                df_v = pd.DataFrame(violacoes, columns=['ID', 'Número', 'Requerente', 'Analista', 'Entrada', 'Dias'])
+                df_v['Entrada'] = pd.to_datetime(df_v['Entrada']).dt.strftime('%d/%m/%Y')
+                st.caption(f"{len(df_v)} processo(s) em '{setor_sla}' há mais de {dias_sla} dias" + (" (primeiros 500)" if len(df_v) >= 500 else ""))
+                st.dataframe(df_v.drop(columns='ID'), use_container_width=True, hide_index=True)
+            else:
+                st.success(f"Nenhum processo em '{setor_sla}' há mais de {dias_sla} dias.")
+    pid_tram = seletor_processo("tram_sel_main")
+    if pid_tram is not None:
+        
+        with st.form("new_tram"):
+            st.subheader("Nova Movimentação")
+            c1, c2 = st.columns(2)
+            setor = c1.selectbox("Setor Destino", setores)
+            obs = c2.text_area("Observação", height=68)
+            
+            st.markdown("**Datas:**")
+            c3, c4 = st.columns(2)
+            with c3: dt_ent = st.date_input("📅 Data de Entrada", value=date.today(), format="DD/MM/YYYY")
+            with c4:
+                tem_saida = st.checkbox("Informar Data de Saída?")
+                if tem_saida: dt_sai = st.date_input("📅 Data de Saída", value=date.today(), format="DD/MM/YYYY")
+                else: dt_sai = None; st.caption("Saída 'Em Aberto' (Atual)")
+            
+            st.markdown("---")
+            if st.form_submit_button("Movimentar", type="primary"):
+                # Sem data de saída, a nova movimentação fecha a que estava em aberto
+                saida_val = dt_sai.strftime('%Y-%m-%d') if tem_saida and dt_sai else None
+                suc, res = banco.salvar_movimentacao({'processo_id': pid_tram, 'setor': setor, 'data_entrada': dt_ent.strftime('%Y-%m-%d'),
+                                                      'data_saida': saida_val, 'observacao': obs}, fechar_aberta=not tem_saida)
+                if suc: st.success("Movimentação registrada!"); st.rerun()
+                else: st.error(f"Erro: {res}")
+        
+        st.divider()
+        rows = permanencia.movimentacoes_processo(conn, pid_tram) if conn else []
+        if rows:
+            # Dias de cada movimentação já vêm calculados do banco (saída ou hoje, menos a entrada)
+            df = pd.DataFrame(rows, columns=['ID', 'Setor', 'Entrada', 'Saída', 'Dias', 'Obs'])
+            df['Entrada'] = pd.to_datetime(df['Entrada'])
+            df['Saída'] = pd.to_datetime(df['Saída'])
+            
+            st.subheader("📊 Total de Dias por Setor")
+            df_resumo = df.groupby('Setor')['Dias'].sum().reset_index().sort_values('Dias', ascending=False)
+            st.dataframe(df_resumo, use_container_width=True)
+            
+            st.subheader("📜 Histórico Detalhado")
+            df_show = df.sort_values(by='Entrada', ascending=True).copy()
+            df_show['Entrada'] = df_show['Entrada'].dt.strftime('%d/%m/%Y')
+            df_show['Saída'] = df_show['Saída'].dt.strftime('%d/%m/%Y').fillna("Atual")
+            st.dataframe(df_show[['Setor', 'Entrada', 'Saída', 'Dias', 'Obs']], use_container_width=True)
 
-    # --- MENU LATERAL ---
+            st.divider()
+            st.subheader("📝 Editar Histórico")
+            opts_t = {f"{r[1]} ({pd.to_datetime(r[2]).strftime('%d/%m/%Y')})": r[0] for r in rows}
+            sel_t = st.selectbox("Selecione para corrigir:", ["Selecione..."] + list(opts_t.keys()))
+            
+            if sel_t != "Selecione...":
+                tid = opts_t[sel_t]
+                r = next((x for x in rows if x[0] == tid), None)
+                if r:
+                    with st.form(f"edit_tram_{tid}"):
+                        ec1, ec2 = st.columns(2)
+                        idx_setor = setores.index(r[1]) if r[1] in setores else 0
+                        esetor = ec1.selectbox("Setor", setores, index=idx_setor)
+                        eobs = ec2.text_input("Observação", r[5] or "")
+                        ec3, ec4 = st.columns(2)
+                        with ec3: edtent = st.date_input("Data Entrada", datetime.strptime(r[2], '%Y-%m-%d').date(), format="DD/MM/YYYY")
+                        with ec4:
+                            has_exit = st.checkbox("Possui Saída?", value=bool(r[3]))
+                            edtsai = None
+                            if has_exit:
+                                val_sai = datetime.strptime(r[3], '%Y-%m-%d').date() if r[3] else date.today()
+                                edtsai = st.date_input("Data Saída", val_sai, format="DD/MM/YYYY")
+                        
+                        st.markdown("---")
+                        btn_t_save = st.form_submit_button("Salvar Correção", type="primary")
+                        btn_t_del = st.form_submit_button("Excluir Movimentação")
+                        
+                        if btn_t_save:
+                            s_val = edtsai.strftime('%Y-%m-%d') if has_exit and edtsai else None
+                            suc, res = banco.salvar_movimentacao({'setor': esetor, 'data_entrada': edtent.strftime('%Y-%m-%d'), 'data_saida': s_val,
+                                                                  'observacao': eobs}, tid)
+                            if suc: st.success("Atualizado!"); st.rerun()
+                            else: st.error(f"Erro: {res}")
+                        if btn_t_del:
+                            suc, res = banco.excluir_movimentacao(tid)
+                            if suc: st.success("Apagado!"); st.rerun()
+                            else: st.error(f"Erro: {res}")
+
+# --- ABA 4: KANBAN ---
+@st.fragment
+@desempenho.cronometrar('aba', 'Kanban')
+def aba_kanban():
+    st.header("Kanban")
+    cols = st.columns(5)
+    stats = ['Protocolado', 'Em Análise', 'Aguardando Correções', 'Aprovado', 'Reprovado']
+    contagens = contar_por_status()
+    for i, s in enumerate(stats):
+        with cols[i]:
+            total_col = contagens.get(s, 0)
+            st.caption(f"**{s}** ({total_col})")
+            limite_key = f"kanban_limite_{i}"
+            limite_col = st.session_state.get(limite_key, KANBAN_POR_PAGINA)
+            cartoes = listar_cartoes_kanban(s, limite_col)
+
+            # Movimentação em lote dos cartões selecionados
+            if cartoes:
+                opcoes_kb = {f"{p[1]} - {p[2]}": p[0] for p in cartoes}
+                sel_kb = st.multiselect("Selecionar", list(opcoes_kb.keys()), key=f"kanban_sel_{i}", label_visibility="collapsed", placeholder="Selecionar...")
+                if sel_kb:
+                    col_lote_back, col_lote_next = st.columns(2)
+                    destino = None
+                    if i > 0 and col_lote_back.button("⬅️ Lote", key=f"kanban_lote_back_{i}"): destino = stats[i-1]
+                    if i < 4 and col_lote_next.button("Lote ➡️", key=f"kanban_lote_next_{i}"): destino = stats[i+1]
+                    if destino:
+                        suc, msg = mover_processos([opcoes_kb[k] for k in sel_kb], destino)
+                        if suc:
+                            del st.session_state[f"kanban_sel_{i}"]
+                            rerun_parcial()
+                        else: st.error(f"Erro: {msg}")
+
+            for p in cartoes:
+                with st.container(border=True):
+                    st.write(f"**{p[1]}**\n{p[2]}")
+                    col_back, col_next = st.columns(2)
+                    destino = None
+                    if i > 0 and col_back.button("⬅️", key=f"back_{p[0]}"): destino = stats[i-1]
+                    if i < 4 and col_next.button("➡️", key=f"next_{p[0]}"): destino = stats[i+1]
+                    if destino:
+                        suc, msg = mover_processos([p[0]], destino)
+                        if suc: rerun_parcial()
+                        else: st.error(f"Erro: {msg}")
+
+            if len(cartoes) < total_col:
+                if st.button(f"Carregar mais ({total_col - len(cartoes)})", key=f"kanban_mais_{i}"):
+                    st.session_state[limite_key] = limite_col + KANBAN_POR_PAGINA
+                    rerun_parcial()
+
+# --- ABA 5: IA ---
+@desempenho.cronometrar('aba', 'IA')
+def aba_ia():
+    st.header("Análise IA")
+    conn = conexao()
+    with st.expander("📚 Biblioteca de Legislação"):
+        up_lei = st.file_uploader("Adicionar lei (PDF)", type='pdf', accept_multiple_files=True, key="bib_upload")
+        if st.button("Adicionar à Biblioteca") and up_lei:
+            with st.spinner("Indexando legislação..."):
+                for f in up_lei:
+                    try:
+                        _, nova = legislacao.adicionar_lei(conn, os.path.splitext(f.name)[0], f.getvalue())
+                        if nova: st.success(f"{f.name} indexada.")
+                        else: st.info(f"{f.name} já estava na biblioteca.")
+                    except Exception as e: st.error(f"Erro em {f.name}: {e}")
+        leis = legislacao.listar_leis(conn) if conn else []
+        for lei_id, titulo, n_trechos, data_cad in leis:
+            col_lei, col_rm = st.columns([4, 1])
+            col_lei.write(f"**{titulo}** — {n_trechos} trechos")
+            if col_rm.button("🗑️", key=f"rm_lei_{lei_id}"):
+                legislacao.remover_lei(conn, lei_id); st.rerun()
+
+    nome_modelo = st.selectbox("Modelo:", list(analise_ia.MODELOS), key="ia_modelo")
+    modelo_ia = analise_ia.MODELOS[nome_modelo]
+    opcoes_leis = {titulo: lei_id for lei_id, titulo, _, _ in leis}
+    if modelo_ia != "local" and not st.session_state.get("api_key_gemini") and "GOOGLE_API_KEY" not in os.environ: st.info("Insira a API Key no menu lateral para usar a IA.")
+    else:
+        pid_ia = seletor_processo("ia_sel")
+        d_ia = buscar_processo(pid_ia) if pid_ia is not None else None
+        up_p = st.file_uploader("Projeto (PDF)", type='pdf', accept_multiple_files=True)
+        sel_leis = st.multiselect("Legislação aplicável:", list(opcoes_leis.keys()), default=list(opcoes_leis.keys()))
+        modo_ia = st.radio("Modo:", ["Simples", "Completo (projeto inteiro)"], horizontal=True, key="ia_modo",
+                           help="O modo completo divide o projeto em partes analisadas em paralelo e consolida os achados num parecer único.")
+        completo = modo_ia != "Simples"
+        if st.button("Analisar") and up_p and sel_leis and d_ia:
+            with st.spinner("Analisando..."):
+                try:
+                    dados_p = [f.getvalue() for f in up_p]
+                    ids_lei = [opcoes_leis[t] for t in sel_leis]
+                    chave = analise_ia.chave_analise(modelo_ia, d_ia, [hash_conteudo(b) for b in dados_p], legislacao.hashes_leis(conn, ids_lei),
+                                                     modo="map-reduce" if completo else None)
+                    trechos, parciais, prompt = [], [], None
+
+                    # Só roda (extração, busca na legislação e chamada ao modelo) se a chave não estiver em cache
+                    def gerar_analise():
+                        nonlocal prompt
+                        cliente = analise_ia.criar_cliente(modelo_ia)
+                        if completo:
+                            txt_p = extrair_textos(conn, dados_p, None)
+                            buscar_lei = lambda parte: legislacao.formatar_trechos(
+                                legislacao.buscar_trechos(conn, parte, (d_ia[5], d_ia[6]), ids_lei, limite=LIMITE_TEXTO_IA))
+                            parecer, res_parciais = analise_ia.analisar_map_reduce(cliente, d_ia, txt_p, buscar_lei, LIMITE_TEXTO_IA, MAX_CONCORRENCIA_IA)
+                            parciais.extend(res_parciais)
+                            prompt = f"[map-reduce] {len(res_parciais)} partes, {len(txt_p)} caracteres"
+                            return parecer
+                        txt_p = extrair_textos(conn, dados_p, LIMITE_TEXTO_IA)
+                        # Só os artigos mais relevantes para o projeto e os dados do processo entram no prompt
+                        trechos.extend(legislacao.buscar_trechos(conn, txt_p, (d_ia[5], d_ia[6]), ids_lei, limite=LIMITE_TEXTO_IA))
+                        prompt = analise_ia.montar_prompt(d_ia, legislacao.formatar_trechos(trechos), txt_p)
+                        return cliente.gerar(prompt)
+
+                    resultado, do_cache = obter_cache_ia().obter_ou_gerar(conn, chave, modelo_ia, gerar_analise)
+                    analise_ia.registrar_analise(conn, pid_ia, prompt, resultado, modelo_ia, chave)
+                    st.success("Análise realizada!" + (" (resposta em cache)" if do_cache else "")); st.markdown(resultado)
+                    if trechos:
+                        with st.expander(f"Trechos da legislação utilizados ({len(trechos)})"):
+                            st.text(legislacao.formatar_trechos(trechos))
+                    if len(parciais) > 1:
+                        with st.expander(f"Análises parciais ({len(parciais)} partes)"):
+                            for i, p in enumerate(parciais, 1): st.markdown(f"**Parte {i}**\n\n{p}")
+                except Exception as e: st.error(f"Erro: {e}")
+
+        # --- ANÁLISE EM LOTE ---
+        st.divider()
+        st.subheader("Análise em Lote")
+        st.caption("Os processos entram numa fila processada em segundo plano; a análise usa os dados do processo e a legislação da biblioteca.")
+        sel_lote = seletor_processos("ia_lote_sel")
+        if st.button("📨 Enfileirar Análises") and sel_lote:
+            ids_lei = [opcoes_leis[t] for t in sel_leis]
+            itens, ausentes = [], []
+            for pid in sel_lote:
+                d = buscar_processo(pid)
+                # Excluído entre a seleção e o envio
+                if d is None:
+                    ausentes.append(st.session_state.get("ia_lote_sel_rotulos", {}).get(pid, str(pid))); continue
+                trechos = legislacao.buscar_trechos(conn, "", (d[5], d[6]), ids_lei, limite=LIMITE_TEXTO_IA) if ids_lei else []
+                chave = analise_ia.chave_analise(modelo_ia, d, hashes_leis=legislacao.hashes_leis(conn, ids_lei))
+                itens.append((d[0], analise_ia.montar_prompt(d, legislacao.formatar_trechos(trechos)), chave))
+            if ausentes: st.warning(f"Processos não encontrados (excluídos?), fora do lote: {', '.join(ausentes)}")
+            if itens:
+                lote = analise_ia.enfileirar(conn, itens, modelo_ia)
+                obter_fila_ia().avisar()
+                st.session_state.setdefault('lotes_ia', []).append(lote)
+                st.success(f"{len(itens)} análises enfileiradas (lote {lote}).")
+        obter_fila_ia()
+        painel_fila_ia()
+
+        est = obter_cache_ia().estatisticas(conn)
+        st.caption(f"Cache de respostas: {est['acertos']} acertos / {est['falhas']} falhas ({est['taxa_acerto']:.0%}) · {est['entradas']} entradas, {est['bytes'] / 1024:.0f} KB")
+
+# --- ABA 6: DASHBOARD ---
+@desempenho.cronometrar('aba', 'Dashboard')
+def aba_dashboard():
+    st.header("Dashboard")
+    # Bibliotecas gráficas só são carregadas quando o Dashboard é aberto
+    try:
+        import plotly.express as px
+        import relatorio_pdf
+    except ImportError:
+        px = None
+    if px is not None:
+        resumo = get_resumo_dashboard()
+        if resumo:
+            c1, c2, c3, c4 = st.columns(4)
+            total_processos = resumo['total']
+            area_total = f"{resumo['area_total']:,.0f} m²"
+            total_aprovados = resumo['aprovados']
+            media_dias = resumo['media_dias']
+            c1.metric("Total", total_processos); c2.metric("Área Total", area_total)
+            c3.metric("Aprovados", total_aprovados); c4.metric("Média Dias", f"{media_dias:.0f}")
+            
+            fig_status, fig_uso, fig_tipo = relatorio_pdf.montar_figuras_dashboard(resumo)
+
+            st.divider()
+            col_btn, col_vazia = st.columns([1, 4])
+            with col_btn:
+                # O relatório só é montado no clique em "Gerar" (com a data e hora do clique) e fica pronto na sessão,
+                # pela impressão digital dos dados: os reruns e os downloads seguintes não o montam de novo
+                chave_pdf = chave_resumo(resumo)
+                if st.session_state.get('pdf_dashboard_chave') != chave_pdf:
+                    if st.button("📄 Gerar Relatório Colorido", type="primary"):
+                        try:
+                            with st.spinner("Gerando relatório..."):
+                                pdf_bytes = gerar_pdf_dashboard(chave_pdf, relatorio_pdf.metricas_dashboard(resumo), resumo)
+                            st.session_state['pdf_dashboard'] = (pdf_bytes, f"Relatorio_{datetime.now().strftime('%d-%m-%Y')}.pdf")
+                            st.session_state['pdf_dashboard_chave'] = chave_pdf
+                        except Exception as e: st.error(f"Erro PDF: {e}")
+                if st.session_state.get('pdf_dashboard_chave') == chave_pdf:
+                    pdf_bytes, nome_pdf = st.session_state['pdf_dashboard']
+                    st.download_button("📥 Baixar Relatório Colorido", data=pdf_bytes, file_name=nome_pdf, mime="application/pdf", type="primary")
+            st.divider()
+
+            r1, r2 = st.columns(2); r3, r4 = st.columns(2)
+            with r1: st.plotly_chart(fig_status, use_container_width=True)
+            with r2: st.plotly_chart(fig_uso, use_container_width=True)
+            with r3: st.plotly_chart(fig_tipo, use_container_width=True)
+            with r4:
+                if not resumo['setor'].empty:
+                    st.plotly_chart(px.pie(resumo['setor'], values='dias', names='setor', title='Tempo Total (Dias)', color_discrete_sequence=px.colors.qualitative.Safe), use_container_width=True)
+            
+            st.divider(); st.subheader("Produtividade da Equipe")
+            df_analista = resumo['analista'].sort_values('area', ascending=True)
+            if not df_analista.empty:
+                st.plotly_chart(px.bar(df_analista, x='area', y='analista', orientation='h', title='Total de m² Analisados por Analista', text_auto='.0f', labels={'area': 'Área (m²)', 'analista': 'Analista'}), use_container_width=True)
+        if db: secao_tendencias()
+
+# === TENDÊNCIAS ===
+# Lidas das tabelas de séries (tendencias.py); mudar o intervalo só roda esta seção de novo
+@st.fragment
+@desempenho.cronometrar('secao', 'tendências')
+def secao_tendencias():
+    import pandas as pd
+    import plotly.express as px
+    st.divider(); st.subheader("📈 Tendências")
+    inicio_padrao, fim_padrao = tendencias.intervalo_padrao()
+    c1, c2, c3, c4 = st.columns([1, 1, 2, 1])
+    inicio = c1.date_input("De", inicio_padrao, format="DD/MM/YYYY", key="tend_inicio")
+    fim = c2.date_input("Até", fim_padrao, format="DD/MM/YYYY", key="tend_fim")
+    grao = c3.radio("Agrupar", list(tendencias.GRAOS), format_func=tendencias.NOMES_GRAO.get, index=1, horizontal=True, key="tend_grao")
+    setor = c4.selectbox("Setor", ["Todos"] + setores, key="tend_setor")
+    if inicio > fim:
+        st.warning("A data inicial é posterior à final."); return
+    setor = None if setor == "Todos" else setor
+    conn = conexao()
+
+    totais = tendencias.totais(conn, inicio, fim)
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Protocolados", totais.get('protocolo', 0)); m2.metric("Mudanças de status", totais.get('transicao', 0))
+    m3.metric("Entradas em setores", totais.get('entrada', 0)); m4.metric("Saídas de setores", totais.get('saida', 0))
+
+    rotulos = {'periodo': 'Período', 'quantidade': 'Quantidade', 'serie': ''}
+    g1, g2 = st.columns(2)
+    with g1:
+        df = pd.DataFrame(tendencias.serie(conn, 'protocolo', grao, inicio, fim), columns=['periodo', 'quantidade'])
+        st.plotly_chart(px.bar(df, x='periodo', y='quantidade', title='Processos Protocolados', labels=rotulos), use_container_width=True)
+    with g2:
+        df = pd.DataFrame(tendencias.serie_por_chave(conn, 'transicao', grao, inicio, fim), columns=['periodo', 'serie', 'quantidade'])
+        if df.empty: st.info("Nenhuma mudança de status no período (contadas desde a criação das tendências).")
+        else: st.plotly_chart(px.bar(df, x='periodo', y='quantidade', color='serie', title='Mudanças de Status (novo status)', labels=rotulos), use_container_width=True)
+    g3, g4 = st.columns(2)
+    with g3:
+        fluxo = [(p, 'Entradas', q) for p, q in tendencias.serie(conn, 'entrada', grao, inicio, fim, setor)]
+        fluxo += [(p, 'Saídas', q) for p, q in tendencias.serie(conn, 'saida', grao, inicio, fim, setor)]
+        df = pd.DataFrame(fluxo, columns=['periodo', 'serie', 'quantidade'])
+        st.plotly_chart(px.line(df, x='periodo', y='quantidade', color='serie', markers=True, title='Entradas e Saídas na Tramitação', labels=rotulos), use_container_width=True)
+    with g4:
+        df = pd.DataFrame(tendencias.estoque(conn, grao, inicio, fim, setor), columns=['periodo', 'quantidade'])
+        st.plotly_chart(px.area(df, x='periodo', y='quantidade', title='Movimentações em Aberto (fim do período)', labels=rotulos), use_container_width=True)
+
+# --- ABA 7: DESEMPENHO ---
+def aba_desempenho():
+    import pandas as pd
+    st.header("Desempenho")
+    # As medições ficam em memória, no processo do servidor: somam todas as sessões desde a última limpeza
+    c1, c2, c3 = st.columns([2, 1, 1])
+    tipo = c1.selectbox("Tipo", ["Todos"] + desempenho.tipos(), key="met_tipo")
+    limite = c2.number_input("Consulta lenta acima de (ms)", min_value=1.0, step=10.0, key="met_limite",
+                             value=desempenho.LIMITE_LENTA_MS)
+    ativo = c3.toggle("Coletar medições", value=True, key="met_ativo")
+    desempenho.configurar(ativo=ativo, limite_ms=limite)
+
+    tipo = None if tipo == "Todos" else tipo
+    st.caption(f"{len(desempenho.medicoes())} medição(ões) no buffer (máximo {desempenho.CAPACIDADE})")
+    resumo = desempenho.resumo(tipo)
+    if resumo:
+        df = pd.DataFrame(resumo).rename(columns={'tipo': 'Tipo', 'nome': 'Nome', 'n': 'N', 'max': 'Máx', 'total': 'Total (ms)',
+                                                  'quantidade_media': 'Qtd. média'})
+        st.dataframe(df.round(1), use_container_width=True, hide_index=True)
+    else:
+        st.info("Nenhuma medição registrada.")
+
+    st.subheader("🐢 Consultas lentas")
+    lentas = desempenho.lentas(limite)
+    if lentas:
+        df_l = pd.DataFrame([{'Momento': datetime.fromtimestamp(m.momento).strftime('%d/%m/%Y %H:%M:%S'), 'ms': round(m.ms, 1),
+                              'Linhas': m.quantidade, 'SQL': m.nome} for m in reversed(lentas)])
+        st.dataframe(df_l, use_container_width=True, hide_index=True)
+    else:
+        st.success(f"Nenhuma consulta acima de {limite:.0f} ms.")
+
+    st.subheader("🗃️ Cache de leituras")
+    # Compartilhado por todas as sessões; é descartado a cada escrita nos processos ou na tramitação
+    est = cache_leituras.CACHE.estatisticas()
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Taxa de acerto", f"{est['taxa_acerto']:.0%}", help=f"{est['acertos']} acertos, {est['falhas']} falhas")
+    m2.metric("Entradas", est['entradas'], help=f"máximo {cache_leituras.CACHE.max_entradas}")
+    m3.metric("Memória", f"{est['bytes'] / 1e6:.1f} MB", help=f"máximo {cache_leituras.CACHE.max_bytes / 1e6:.0f} MB")
+    m4.metric("Invalidações", est['invalidacoes'], help=f"{est['despejos']} entradas despejadas pelo limite (LRU)")
+    if est['por_funcao']:
+        df_c = pd.DataFrame([{'Função': nome, 'Acertos': v['acertos'], 'Falhas': v['falhas'], 'Taxa de acerto': f"{v['taxa_acerto']:.0%}"}
+                             for nome, v in est['por_funcao'].items()]).sort_values('Falhas', ascending=False)
+        st.dataframe(df_c, use_container_width=True, hide_index=True)
+
+    st.divider()
+    b1, b2, b3, b4 = st.columns(4)
+    # A exportação é montada no clique, não a cada rerun
+    if b1.button("⚙️ Gerar exportação", key="met_gerar"):
+        lista = desempenho.medicoes(tipo)
+        st.session_state['met_exportacao'] = {'csv': desempenho.exportar_csv(lista), 'json': desempenho.exportar_json(lista)}
+    exp = st.session_state.get('met_exportacao')
+    if exp:
+        carimbo = datetime.now().strftime('%Y%m%d_%H%M')
+        b2.download_button("💾 CSV", exp['csv'], f"desempenho_{carimbo}.csv", "text/csv", key="met_csv")
+        b3.download_button("💾 JSON", exp['json'], f"desempenho_{carimbo}.json", "application/json", key="met_json")
+    if b4.button("🗑️ Limpar medições", key="met_limpar"):
+        desempenho.limpar()
+        st.session_state.pop('met_exportacao', None)
+        st.rerun()
+
+ABAS = {
+    "➕ Novo": aba_cadastrar,
+    "📝 Gerenciar": aba_gerenciar,
+    "🔄 Tramitação": aba_tramitacao,
+    "📊 Kanban": aba_kanban,
+    "🤖 IA": aba_ia,
+    "📈 Dashboard": aba_dashboard,
+    "⏱️ Desempenho": aba_desempenho,
+}
+
+# ==================== INTERFACE PRINCIPAL ====================
+@desempenho.cronometrar('secao', 'menu lateral')
+def menu_lateral():
     st.sidebar.title("🏛️ Menu")
     if st.sidebar.button("Sair"):
         st.session_state['logged_in'] = False
         st.rerun()
     st.sidebar.markdown("---")
     
-    api_key_input = st.sidebar.text_input("API Key Gemini", type="password")
+    api_key_input = st.sidebar.text_input("API Key Gemini", type="password", key="api_key_gemini")
     if api_key_input:
+        # A biblioteca do Gemini (lenta para importar) só é carregada quando há uma chave
+        import google.generativeai as genai
         genai.configure(api_key=api_key_input)
     
-    if genai.__version__ < "0.8.3":
-        st.sidebar.error(f"⚠️ Versão IA antiga: {genai.__version__}. Atualize o requirements.txt")
+    try: versao_genai = version("google-generativeai")
+    except PackageNotFoundError: versao_genai = "0"
+    if versao_genai < "0.8.3":
+        st.sidebar.error(f"⚠️ Versão IA antiga: {versao_genai}. Atualize o requirements.txt")
 
     # === SEÇÃO DE DADOS E BACKUP ===
     st.sidebar.markdown("---")
     st.sidebar.header("💾 Dados e Backup")
     
-    if conn and pd is not None:
+    conn = conexao()
+    if conn:
         with st.sidebar.expander("📥 Exportar Planilhas"):
-            df_procs = get_processos_df()
-            if not df_procs.empty:
-                df_export = df_procs.copy()
-                df_export['data_protocolo'] = df_export['data_protocolo'].dt.strftime('%d/%m/%Y')
-                
-                csv_procs = df_export.to_csv(index=False, sep=';', encoding='utf-8-sig')
-                st.download_button("📄 Lista de Processos", csv_procs, "processos.csv", "text/csv")
+            # Nada é lido do banco até o clique em "Gerar"; o arquivo é escrito em blocos num temporário
+            tipo_exp = st.radio("Dados", ["Lista de Processos", "Histórico Completo"], key="exp_tipo")
+            formato_exp = st.radio("Formato", exportacao.formatos_disponiveis(), horizontal=True, key="exp_formato")
+            status_exp = st.multiselect("Status", listar_status(), key="exp_status")
+            periodo_exp = st.checkbox("Filtrar por período", key="exp_periodo")
+            inicio_exp = fim_exp = None
+            if periodo_exp:
+                st.caption("Data de protocolo" if tipo_exp == "Lista de Processos" else "Data de entrada no setor")
+                inicio_exp = st.date_input("De", value=date(date.today().year, 1, 1), format="DD/MM/YYYY", key="exp_inicio")
+                fim_exp = st.date_input("Até", value=date.today(), format="DD/MM/YYYY", key="exp_fim")
+
+            if st.button("⚙️ Gerar arquivo", key="exp_gerar"):
+                anterior = st.session_state.pop('exportacao', None)
+                if anterior and os.path.exists(anterior['caminho']): os.remove(anterior['caminho'])
+                tipo = 'processos' if tipo_exp == "Lista de Processos" else 'historico'
+                extensao = formato_exp.lower()
+                try:
+                    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{extensao}") as tmp:
+                        gerar = exportacao.exportar_csv if formato_exp == "CSV" else exportacao.exportar_parquet
+                        linhas = gerar(conn, tmp, tipo, inicio_exp, fim_exp, status_exp)
+                    st.session_state['exportacao'] = {
+                        'caminho': tmp.name, 'linhas': linhas, 'mime': "text/csv" if formato_exp == "CSV" else "application/octet-stream",
+                        'nome': f"{'processos' if tipo == 'processos' else 'historico'}_{datetime.now().strftime('%Y%m%d_%H%M')}.{extensao}",
+                    }
+                except Exception as e:
+                    st.error(f"Erro ao exportar: {e}")
+
+            exp = st.session_state.get('exportacao')
+            if exp and os.path.exists(exp['caminho']):
+                st.caption(f"{exp['linhas']} linha(s)")
+                with open(exp['caminho'], "rb") as f:
+                    st.download_button(f"💾 Baixar {exp['nome']}", f, exp['nome'], exp['mime'], key="exp_baixar")
             
+        # Backup só é gerado no clique: cópia consistente pela API de backup do SQLite, comprimida em gzip
+        if st.sidebar.button("📦 Gerar Backup", key="bkp_gerar"):
+            anterior = st.session_state.pop('backup', None)
+            if anterior and os.path.exists(anterior['caminho']): os.remove(anterior['caminho'])
             try:
-                q_hist = "SELECT p.numero, t.* FROM tramitacao t JOIN processos p ON t.processo_id = p.id"
-                df_hist = pd.read_sql_query(q_hist, conn)
-                if not df_hist.empty:
-                    if 'data_entrada' in df_hist.columns:
-                        df_hist['data_entrada'] = pd.to_datetime(df_hist['data_entrada']).dt.strftime('%d/%m/%Y')
-                    if 'data_saida' in df_hist.columns:
-                        df_hist['data_saida'] = pd.to_datetime(df_hist['data_saida']).dt.strftime('%d/%m/%Y')
-                    
-                    csv_hist = df_hist.to_csv(index=False, sep=';', encoding='utf-8-sig')
-                    st.download_button("📜 Histórico Completo", csv_hist, "historico.csv", "text/csv")
-            except: pass
-            
-        if os.path.exists("processos.db"):
-            with open("processos.db", "rb") as f:
+                with st.spinner("Copiando banco..."):
+                    with tempfile.NamedTemporaryFile(delete=False, suffix=".db.gz") as tmp:
+                        info = backup.gerar_backup(tmp, banco.CAMINHO_DB)
+                info.update(caminho=tmp.name, nome=f"backup_{datetime.now().strftime('%Y%m%d_%H%M')}.db.gz")
+                st.session_state['backup'] = info
+            except Exception as e:
+                st.sidebar.error(f"Erro no backup: {e}")
+        bkp = st.session_state.get('backup')
+        if bkp and os.path.exists(bkp['caminho']):
+            st.sidebar.caption(f"{bkp['bytes'] / 1e6:.1f} MB → {os.path.getsize(bkp['caminho']) / 1e6:.1f} MB em {bkp['segundos']:.1f}s")
+            with open(bkp['caminho'], "rb") as f:
                 st.sidebar.download_button(
-                    label="📦 Baixar Backup (.db)",
+                    label="📦 Baixar Backup (.db.gz)",
                     data=f,
-                    file_name=f"backup_{datetime.now().strftime('%Y%m%d_%H%M')}.db",
-                    mime="application/octet-stream"
+                    file_name=bkp['nome'],
+                    mime="application/gzip"
                 )
         
         st.sidebar.markdown("---")
         st.sidebar.subheader("⚠️ Restaurar Backup")
-        uploaded_db = st.sidebar.file_uploader("Upload do arquivo .db", type="db")
+        uploaded_db = st.sidebar.file_uploader("Upload do arquivo .db ou .db.gz", type=["db", "gz"])
         if uploaded_db:
             st.sidebar.warning("Isso substituirá TODOS os dados.")
             if st.sidebar.button("🔴 Confirmar Restauração"):
                 try:
-                    with open("processos.db", "wb") as f:
-                        f.write(uploaded_db.getbuffer())
-                    st.toast("Restaurado com sucesso! Reiniciando...", icon="✅")
-                    import time
-                    time.sleep(1)
+                    with st.spinner("Validando..."):
+                        arquivo_ok = backup.preparar_restauracao(uploaded_db, banco.CAMINHO_DB)
+                except ValueError as e:
+                    arquivo_ok = None
+                    st.sidebar.error(f"Backup recusado: {e}")
+                if arquivo_ok:
+                    try:
+                        # A fila de IA para antes (não grava resultado velho no banco novo) e volta no próximo rerun
+                        obter_fila_ia().parar()
+                        with st.spinner("Restaurando..."):
+                            backup.restaurar(arquivo_ok, banco.CAMINHO_DB, db)
+                        st.toast("Restaurado com sucesso! Reiniciando...", icon="✅")
+                    except Exception as e:
+                        st.sidebar.error(f"Erro: {e}")
+                    finally:
+                        # Conexões, escritor e fila são recriados apontando para o conteúdo atual do banco
+                        init_db.clear(); obter_fila_ia.clear()
+                        st.session_state.pop('backup', None)
                     st.rerun()
-                except Exception as e:
-                    st.sidebar.error(f"Erro: {e}")
 
-    # --- ABAS ---
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["➕ Novo", "📝 Gerenciar", "🔄 Tramitação", "📊 Kanban", "🤖 IA", "📈 Dashboard"])
-
-    # === LISTAS GLOBAIS ===
-    usos = ["Multifamiliar", "Serviços", "Comércio Varejista", "Indústria", "Unifamiliar", "Misto", "Sem destinação específica"]
-    tipos = ["Aprovação inicial", "Levantamento do existente", "Modificação de projeto", "Regularização", "Misto", "Análise RIU", "ERB"]
-    setores = ["Análise prévia", "Pré-análise", "Analista", "Parecer externo", "Fiscalização", "Emissão de documentos", "Requerente"]
-
-    # --- ABA 1: CADASTRAR ---
-    with tab1:
-        st.header("Cadastrar Processo")
-        with st.form("novo_proc"):
-            c1, c2 = st.columns(2)
-            num = c1.text_input("Número Processo")
-            rt = c1.text_input("RT")
-            uso = c1.selectbox("Uso", usos)
-            area = c1.number_input("Área (m²)", min_value=0.0)
-            req = c2.text_input("Requerente")
-            ana = c2.text_input("Analista")
-            tipo = c2.selectbox("Tipo", tipos)
-            data = c2.date_input("Data Protocolo", format="DD/MM/YYYY")
-            
-            if st.form_submit_button("Salvar Processo"):
-                suc, msg = executar_query(
-                    'INSERT INTO processos (numero, rt, requerente, analista, uso, tipologia, area, data_protocolo) VALUES (?,?,?,?,?,?,?,?)',
-                    (num, rt, req, ana, uso, tipo, area, data.strftime('%Y-%m-%d')), commit=True
-                )
-                if suc: st.success("Sucesso!"); st.rerun()
-                else: st.error(f"Erro: {msg}")
-
-    # --- ABA 2: GERENCIAR ---
-    with tab2:
-        st.header("Editar ou Excluir")
-        procs = listar_processos()
-        if procs:
-            lista_analistas = sorted(list(set([p[4] for p in procs if p[4]])))
-            lista_status = sorted(list(set([p[9] for p in procs if p[9]])))
-            
-            st.caption("Filtros:")
-            col_f1, col_f2, col_vazia = st.columns([1, 1, 2])
-            with col_f1: filtro_analista = st.selectbox("👤 Analista:", ["Todos"] + lista_analistas)
-            with col_f2: filtro_status = st.selectbox("📌 Status:", ["Todos"] + lista_status)
-            
-            procs_filtrados = procs
-            if filtro_analista != "Todos": procs_filtrados = [p for p in procs_filtrados if p[4] == filtro_analista]
-            if filtro_status != "Todos": procs_filtrados = [p for p in procs_filtrados if p[9] == filtro_status]
-
-            if procs_filtrados:
-                opcoes = {f"{p[1]} - {p[3]} [{p[9]}]": p[0] for p in procs_filtrados}
-                sel = st.selectbox("Selecione o Processo:", list(opcoes.keys()))
-                pid = opcoes[sel]
-                d = buscar_processo(pid)
+def main():
+    # --- LOGIN ---
+    if 'logged_in' not in st.session_state: st.session_state['logged_in'] = False
+    
+    if not st.session_state['logged_in']:
+        st.title("🔐 Login")
+        with st.form("login"):
+            user = st.text_input("Usuário")
+            pwd = st.text_input("Senha", type="password")
+            if st.form_submit_button("Entrar"):
+                admin_user = st.secrets.get("admin_user", {}).get("username", "admin")
+                admin_pass = st.secrets.get("admin_user", {}).get("password", "admin")
                 
-                if d:
-                    st.markdown("---")
-                    with st.form(f"edit_{pid}"):
-                        c1, c2 = st.columns(2)
-                        enum = c1.text_input("Número", d[1])
-                        ert = c1.text_input("RT", d[2])
-                        euso = c1.selectbox("Uso", usos, index=usos.index(d[5]) if d[5] in usos else 0)
-                        earea = c1.number_input("Área", float(d[7]))
-                        ereq = c2.text_input("Requerente", d[3])
-                        eana = c2.text_input("Analista", d[4])
-                        etipo = c2.selectbox("Tipo", tipos, index=tipos.index(d[6]) if d[6] in tipos else 0)
-                        edata = c2.date_input("Data", datetime.strptime(d[8], '%Y-%m-%d').date(), format="DD/MM/YYYY")
-                        
-                        status_atuais = ['Protocolado', 'Em Análise', 'Aguardando Correções', 'Aprovado', 'Reprovado']
-                        if d[9] not in status_atuais: status_atuais.append(d[9])
-                        estatus = c1.selectbox("Status Atual", status_atuais, index=status_atuais.index(d[9]))
+                if user == admin_user and pwd == admin_pass:
+                    st.session_state['logged_in'] = True
+                    st.rerun()
+                else:
+                    st.error("Dados incorretos.")
+        return
 
-                        st.markdown("---")
-                        btn_save = st.form_submit_button("💾 Salvar Alterações", type="primary")
-                        btn_del = st.form_submit_button("🗑️ Deletar Processo", type="secondary")
-                        
-                        if btn_save:
-                            executar_query('UPDATE processos SET numero=?, rt=?, requerente=?, analista=?, uso=?, tipologia=?, area=?, data_protocolo=?, status=? WHERE id=?',
-                                        (enum, ert, ereq, eana, euso, etipo, earea, edata.strftime('%Y-%m-%d'), estatus, pid), commit=True)
-                            st.success("Salvo!"); st.rerun()
-                        
-                        if btn_del:
-                            st.session_state[f'del_{pid}'] = True
-                    
-                    if st.session_state.get(f'del_{pid}'):
-                        st.warning("Confirma a exclusão?")
-                        if st.button("Sim, Excluir Definitivamente"):
-                            executar_query('DELETE FROM tramitacao WHERE processo_id=?', (pid,), commit=True)
-                            executar_query('DELETE FROM analises WHERE processo_id=?', (pid,), commit=True)
-                            executar_query('DELETE FROM processos WHERE id=?', (pid,), commit=True)
-                            st.success("Excluído!"); st.rerun()
-            else:
-                st.warning("Nenhum processo encontrado com esses filtros.")
-
-    # --- ABA 3: TRAMITAÇÃO ---
-    with tab3:
-        st.header("Tramitação")
-        if procs:
-            opcoes_geral = {f"{p[1]} - {p[3]}": p[0] for p in procs}
-            sel_key = st.selectbox("Processo:", list(opcoes_geral.keys()), key="tram_sel_main")
-            pid_tram = opcoes_geral[sel_key]
-            
-            with st.form("new_tram"):
-                st.subheader("Nova Movimentação")
-                c1, c2 = st.columns(2)
-                setor = c1.selectbox("Setor Destino", setores)
-                obs = c2.text_area("Observação", height=68)
-                
-                st.markdown("**Datas:**")
-                c3, c4 = st.columns(2)
-                with c3: dt_ent = st.date_input("📅 Data de Entrada", value=date.today(), format="DD/MM/YYYY")
-                with c4:
-                    tem_saida = st.checkbox("Informar Data de Saída?")
-                    if tem_saida: dt_sai = st.date_input("📅 Data de Saída", value=date.today(), format="DD/MM/YYYY")
-                    else: dt_sai = None; st.caption("Saída 'Em Aberto' (Atual)")
-                
-                st.markdown("---")
-                if st.form_submit_button("Movimentar", type="primary"):
-                    if not tem_saida:
-                        executar_query("UPDATE tramitacao SET data_saida=? WHERE processo_id=? AND data_saida IS NULL",
-                                    (dt_ent.strftime('%Y-%m-%d'), pid_tram), commit=True)
-                    
-                    saida_val = dt_sai.strftime('%Y-%m-%d') if tem_saida and dt_sai else None
-                    executar_query("INSERT INTO tramitacao (processo_id, setor, data_entrada, data_saida, observacao) VALUES (?,?,?,?,?)",
-                                (pid_tram, setor, dt_ent.strftime('%Y-%m-%d'), saida_val, obs), commit=True)
-                    st.success("Movimentação registrada!"); st.rerun()
-            
-            st.divider()
-            suc, res = executar_query("SELECT * FROM tramitacao WHERE processo_id=?", (pid_tram,))
-            if suc:
-                rows = res.fetchall()
-                if rows:
-                    df = pd.DataFrame(rows, columns=['ID', 'PID', 'Setor', 'Entrada', 'Saída', 'Obs'])
-                    df['Setor'] = df['Setor'].replace({'Pró-análise': 'Pré-análise', 'Pró-Análise': 'Pré-análise', 'Pro-analise': 'Pré-análise'})
-                    df['Entrada'] = pd.to_datetime(df['Entrada'])
-                    df['Saída'] = pd.to_datetime(df['Saída'])
-                    
-                    now = pd.Timestamp.now().normalize()
-                    df['Dias'] = df.apply(lambda x: ((x['Saída'] if pd.notnull(x['Saída']) else now) - x['Entrada']).days, axis=1)
-                    
-                    st.subheader("📊 Total de Dias por Setor")
-                    df_resumo = df.groupby('Setor')['Dias'].sum().reset_index().sort_values('Dias', ascending=False)
-                    st.dataframe(df_resumo, use_container_width=True)
-                    
-                    st.subheader("📜 Histórico Detalhado")
-                    df_show = df.sort_values(by='Entrada', ascending=True).copy()
-                    df_show['Entrada'] = df_show['Entrada'].dt.strftime('%d/%m/%Y')
-                    df_show['Saída'] = df_show['Saída'].dt.strftime('%d/%m/%Y').fillna("Atual")
-                    st.dataframe(df_show[['Setor', 'Entrada', 'Saída', 'Dias', 'Obs']], use_container_width=True)
-
-                    st.divider()
-                    st.subheader("📝 Editar Histórico")
-                    opts_t = {f"{r[2]} ({pd.to_datetime(r[3]).strftime('%d/%m/%Y')})": r[0] for r in rows}
-                    sel_t = st.selectbox("Selecione para corrigir:", ["Selecione..."] + list(opts_t.keys()))
-                    
-                    if sel_t != "Selecione...":
-                        tid = opts_t[sel_t]
-                        r = next((x for x in rows if x[0] == tid), None)
-                        if r:
-                            with st.form(f"edit_tram_{tid}"):
-                                ec1, ec2 = st.columns(2)
-                                idx_setor = setores.index(r[2]) if r[2] in setores else 0
-                                esetor = ec1.selectbox("Setor", setores, index=idx_setor)
-                                eobs = ec2.text_input("Observação", r[5] or "")
-                                ec3, ec4 = st.columns(2)
-                                with ec3: edtent = st.date_input("Data Entrada", datetime.strptime(r[3], '%Y-%m-%d').date(), format="DD/MM/YYYY")
-                                with ec4:
-                                    has_exit = st.checkbox("Possui Saída?", value=bool(r[4]))
-                                    edtsai = None
-                                    if has_exit:
-                                        val_sai = datetime.strptime(r[4], '%Y-%m-%d').date() if r[4] else date.today()
-                                        edtsai = st.date_input("Data Saída", val_sai, format="DD/MM/YYYY")
-                                
-                                st.markdown("---")
-                                btn_t_save = st.form_submit_button("Salvar Correção", type="primary")
-                                btn_t_del = st.form_submit_button("Excluir Movimentação")
-                                
-                                if btn_t_save:
-                                    s_val = edtsai.strftime('%Y-%m-%d') if has_exit and edtsai else None
-                                    executar_query("UPDATE tramitacao SET setor=?, data_entrada=?, data_saida=?, observacao=? WHERE id=?",
-                                                (esetor, edtent.strftime('%Y-%m-%d'), s_val, eobs, tid), commit=True)
-                                    st.success("Atualizado!"); st.rerun()
-                                if btn_t_del:
-                                    executar_query("DELETE FROM tramitacao WHERE id=?", (tid,), commit=True)
-                                    st.success("Apagado!"); st.rerun()
-
-    # --- ABA 4: KANBAN ---
-    with tab4:
-        st.header("Kanban")
-        cols = st.columns(5)
-        stats = ['Protocolado', 'Em Análise', 'Aguardando Correções', 'Aprovado', 'Reprovado']
-        for i, s in enumerate(stats):
-            with cols[i]:
-                st.caption(f"**{s}**")
-                for p in [x for x in procs if x[9] == s]:
-                    with st.container(border=True):
-                        st.write(f"**{p[1]}**\n{p[3]}")
-                        col_back, col_next = st.columns(2)
-                        if i > 0:
-                            if col_back.button("⬅️", key=f"back_{p[0]}"):
-                                executar_query("UPDATE processos SET status=? WHERE id=?", (stats[i-1], p[0]), commit=True)
-                                st.rerun()
-                        if i < 4:
-                            if col_next.button("➡️", key=f"next_{p[0]}"):
-                                executar_query("UPDATE processos SET status=? WHERE id=?", (stats[i+1], p[0]), commit=True)
-                                st.rerun()
-
-    # --- ABA 5: IA ---
-    with tab5:
-        st.header("Análise IA")
-        if not api_key_input and "GOOGLE_API_KEY" not in os.environ: st.info("Insira a API Key no menu lateral para usar a IA.")
-        elif procs:
-            opcoes_ia = {f"{p[1]} - {p[3]}": p[0] for p in procs}
-            sel_ia = st.selectbox("Processo:", list(opcoes_ia.keys()), key="ia_sel")
-            pid_ia = opcoes_ia[sel_ia]
-            d_ia = buscar_processo(pid_ia)
-            up_p = st.file_uploader("Projeto (PDF)", type='pdf', accept_multiple_files=True)
-            up_l = st.file_uploader("Lei (PDF)", type='pdf', accept_multiple_files=True)
-            if st.button("Analisar") and up_p and up_l:
-                with st.spinner("Analisando..."):
-                    try:
-                        txt_p = ""; txt_l = ""
-                        for p_file in up_p:
-                            for page in PyPDF2.PdfReader(p_file).pages: txt_p += page.extract_text() or ""
-                        for l_file in up_l:
-                            for page in PyPDF2.PdfReader(l_file).pages: txt_l += page.extract_text() or ""
-                        model = genai.GenerativeModel('models/gemini-1.5-flash')
-                        res = model.generate_content(f"Analise se o projeto cumpre a legislação.\nDADOS: {d_ia[3]}, {d_ia[5]}, {d_ia[7]}m²\nLEI: {txt_l[:30000]}\nPROJETO: {txt_p[:30000]}")
-                        st.success("Análise realizada!"); st.markdown(res.text)
-                    except Exception as e: st.error(f"Erro: {e}")
-
-    # --- ABA 6: DASHBOARD ---
-    with tab6:
-        st.header("Dashboard")
-        if pd is not None and px is not None:
-            df = get_processos_df()
-            if not df.empty:
-                # --- NORMALIZAÇÃO DE DADOS (CORREÇÃO DE DUPLICIDADE) ---
-                df['tipologia'] = df['tipologia'].astype(str).str.strip().str.title()
-                df['uso'] = df['uso'].astype(str).str.strip().str.title()
-                # AQUI ESTÁ A CORREÇÃO DO NOME DO ANALISTA:
-                df['analista'] = df['analista'].astype(str).str.strip().str.title()
-
-                c1, c2, c3, c4 = st.columns(4)
-                total_processos = len(df)
-                area_total = f"{df['area'].sum():,.0f} m²"
-                total_aprovados = len(df[df['status']=='Aprovado'])
-                media_dias = (pd.Timestamp.now() - df['data_protocolo']).dt.days.mean()
-                c1.metric("Total", total_processos); c2.metric("Área Total", area_total)
-                c3.metric("Aprovados", total_aprovados); c4.metric("Média Dias", f"{media_dias:.0f}")
-                
-                fig_status = px.pie(df, names='status', title='Distribuição por Status', color_discrete_sequence=px.colors.qualitative.Set2)
-                fig_status.update_layout(template="plotly_white", title_font_size=16)
-                
-                count_uso = df['uso'].value_counts().reset_index()
-                count_uso.columns = ['uso', 'count']
-                fig_uso = px.bar(count_uso, x='count', y='uso', orientation='h', title='Uso Principal', color='uso', color_discrete_sequence=px.colors.qualitative.Prism)
-                fig_uso.update_layout(template="plotly_white", showlegend=False)
-                
-                count_tipo = df['tipologia'].value_counts().reset_index()
-                count_tipo.columns = ['tipologia', 'count']
-                fig_tipo = px.bar(count_tipo, x='count', y='tipologia', orientation='h', title='Tipologia dos Projetos', color='tipologia', color_discrete_sequence=px.colors.qualitative.Bold)
-                fig_tipo.update_layout(template="plotly_white", showlegend=False)
-
-                st.divider()
-                col_btn, col_vazia = st.columns([1, 4])
-                with col_btn:
-                    try:
-                        metricas_pdf = {'total': total_processos, 'area_total': area_total, 'aprovados': total_aprovados, 'media_dias': f"{media_dias:.0f}"}
-                        pdf_bytes = gerar_pdf_dashboard(df, metricas_pdf, fig_status, fig_uso, fig_tipo)
-                        st.download_button("📄 Baixar Relatório Colorido", data=pdf_bytes, file_name=f"Relatorio_{datetime.now().strftime('%d-%m-%Y')}.pdf", mime="application/pdf", type="primary")
-                    except Exception as e: st.error(f"Erro PDF: {e}")
-                st.divider()
-
-                r1, r2 = st.columns(2); r3, r4 = st.columns(2)
-                with r1: st.plotly_chart(fig_status, use_container_width=True)
-                with r2: st.plotly_chart(fig_uso, use_container_width=True)
-                with r3: st.plotly_chart(fig_tipo, use_container_width=True)
-                with r4:
-                    try:
-                        df_tram = pd.read_sql_query("SELECT * FROM tramitacao", conn)
-                        if not df_tram.empty:
-                            df_tram['data_saida'] = pd.to_datetime(df_tram['data_saida']).fillna(pd.Timestamp.now().normalize())
-                            df_tram['dias'] = (df_tram['data_saida'] - pd.to_datetime(df_tram['data_entrada'])).dt.days
-                            st.plotly_chart(px.pie(df_tram.groupby('setor')['dias'].sum().reset_index(), values='dias', names='setor', title='Tempo Total (Dias)', color_discrete_sequence=px.colors.qualitative.Safe), use_container_width=True)
-                    except: pass
-                
-                st.divider(); st.subheader("Produtividade da Equipe")
-                df_analista = df[df['analista'].str.len() > 0].groupby('analista')['area'].sum().reset_index().sort_values('area', ascending=True)
-                if not df_analista.empty:
-                    st.plotly_chart(px.bar(df_analista, x='area', y='analista', orientation='h', title='Total de m² Analisados por Analista', text_auto='.0f', labels={'area': 'Área (m²)', 'analista': 'Analista'}), use_container_width=True)
+    # --- MENU LATERAL ---
+    menu_lateral()
+
+    # --- ABAS ---
+    # Só a aba escolhida é executada (com st.tabs todas rodavam a cada rerun)
+    aba = st.radio("Aba", list(ABAS), horizontal=True, key="aba", label_visibility="collapsed")
+    ABAS[aba]()
 
 if __name__ == "__main__":
     main()
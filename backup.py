@@ -0,0 +1,137 @@
+import os
+import gzip
+import time
+import shutil
+import sqlite3
+import tempfile
+import banco
+import permanencia
+import busca
+import tendencias
+import migracoes
+
+# ==================== BACKUP E RESTAURAÇÃO ====================
+# O backup é uma cópia consistente do banco em uso feita pela API de backup do SQLite (num único passo, sobre um
+# retrato de leitura que no modo WAL não trava as escritas da aplicação), comprimida em gzip por blocos. A restauração valida o arquivo enviado
+# numa cópia de trabalho e só então copia o conteúdo para o banco ativo numa única transação.
+
+BLOCO_BYTES = 1024 * 1024
+MAGICO_SQLITE = b"SQLite format 3\x00"
+MAGICO_GZIP = b"\x1f\x8b"
+
+# Tabelas e colunas que um backup precisa ter para ser aceito
+ESQUEMA_MINIMO = {
+    'processos': {'id', 'numero', 'rt', 'requerente', 'analista', 'uso', 'tipologia', 'area', 'data_protocolo', 'status'},
+    'tramitacao': {'id', 'processo_id', 'setor', 'data_entrada', 'data_saida', 'observacao'},
+    'analises': {'id', 'processo_id', 'resultado', 'status', 'data_analise'},
+}
+
+def _copiar_paginas(origem, destino, progresso=None):
+    # Um passo só (pages=-1): a cópia inteira sai de uma transação de leitura, que no WAL não bloqueia o escritor.
+    # Em passos, cada commit de outra conexão no meio faria a cópia recomeçar, e num banco movimentado ela não terminaria
+    origem.backup(destino, pages=-1, progress=progresso)
+
+# === BACKUP ===
+def gerar_backup(destino, caminho=banco.CAMINHO_DB, progresso=None):
+    """Escreve em `destino` (arquivo binário) o backup comprimido (.db.gz). Retorna estatísticas da cópia."""
+    inicio = time.perf_counter()
+    fd, temporario = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        origem, copia = banco.conectar(caminho), sqlite3.connect(temporario)
+        try:
+            _copiar_paginas(origem, copia, progresso)
+            paginas = copia.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            copia.close(); origem.close()
+        tamanho = os.path.getsize(temporario)
+        with open(temporario, "rb") as f, gzip.GzipFile(fileobj=destino, mode="wb", compresslevel=6) as gz:
+            shutil.copyfileobj(f, gz, BLOCO_BYTES)
+    finally:
+        os.remove(temporario)
+    return {'paginas': paginas, 'bytes': tamanho, 'segundos': time.perf_counter() - inicio}
+
+# === RESTAURAÇÃO ===
+def _gravar_trabalho(arquivo, caminho_trabalho):
+    # Grava o upload em disco por blocos, descomprimindo se vier em gzip
+    inicio = arquivo.read(2)
+    arquivo.seek(0)
+    leitor = gzip.GzipFile(fileobj=arquivo, mode="rb") if inicio == MAGICO_GZIP else arquivo
+    with open(caminho_trabalho, "wb") as f:
+        shutil.copyfileobj(leitor, f, BLOCO_BYTES)
+
+def validar(caminho_trabalho):
+    """Confere cabeçalho, integridade e esquema mínimo. Levanta ValueError com o motivo da recusa."""
+    with open(caminho_trabalho, "rb") as f:
+        if f.read(len(MAGICO_SQLITE)) != MAGICO_SQLITE: raise ValueError("O arquivo não é um banco SQLite.")
+    conn = sqlite3.connect(caminho_trabalho)
+    try:
+        resultado = [r[0] for r in conn.execute("PRAGMA integrity_check").fetchall()]
+        if resultado != ['ok']: raise ValueError(f"Banco corrompido: {'; '.join(resultado[:3])}")
+        for tabela, colunas in ESQUEMA_MINIMO.items():
+            existentes = {r[1] for r in conn.execute(f"PRAGMA table_info({tabela})")}
+            if not existentes: raise ValueError(f"Tabela '{tabela}' não encontrada.")
+            faltando = colunas - existentes
+            if faltando: raise ValueError(f"Tabela '{tabela}' sem as colunas: {', '.join(sorted(faltando))}")
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"Banco inválido: {e}")
+    finally:
+        conn.close()
+
+def _preparar(caminho_trabalho, tamanho_pagina):
+    # Leva o backup à versão atual do esquema (migrações pendentes, triggers novos), recalcula os resumos, as tendências e o
+    # índice de busca a partir dos dados e iguala o tamanho de página ao do banco ativo, exigido pela cópia para um banco em WAL
+    conn = sqlite3.connect(caminho_trabalho, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        migracoes.aplicar(conn)
+        conn.execute("BEGIN")
+        c = conn.cursor()
+        banco.criar_esquema(c)
+        banco.reconstruir_resumos(c)
+        permanencia.reconstruir_histograma(c)
+        busca.reconstruir_indice(c)
+        tendencias.reconstruir_tendencias(c)
+        conn.execute("COMMIT")
+        if conn.execute("PRAGMA page_size").fetchone()[0] != tamanho_pagina:
+            conn.execute(f"PRAGMA page_size={int(tamanho_pagina)}")
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+def preparar_restauracao(arquivo, caminho=banco.CAMINHO_DB):
+    """Grava o upload numa cópia de trabalho ao lado do banco, valida e atualiza o esquema. Retorna o caminho da cópia.
+    Toda falha sai como ValueError (e a cópia de trabalho é apagada)."""
+    caminho_trabalho = f"{caminho}.restauracao"
+    try:
+        _gravar_trabalho(arquivo, caminho_trabalho)
+        validar(caminho_trabalho)
+        destino = banco.conectar(caminho)
+        try: tamanho_pagina = destino.execute("PRAGMA page_size").fetchone()[0]
+        finally: destino.close()
+        _preparar(caminho_trabalho, tamanho_pagina)
+    except Exception as e:
+        # Qualquer falha depois do upload vira recusa com motivo legível, sem deixar a cópia de trabalho para trás
+        _remover_trabalho(caminho_trabalho)
+        if isinstance(e, ValueError): raise
+        if isinstance(e, (OSError, EOFError)): raise ValueError(f"Arquivo ilegível: {e}") from e
+        if isinstance(e, sqlite3.Error): raise ValueError(f"Não foi possível atualizar o backup para a versão atual do sistema: {e}") from e
+        raise ValueError(f"Falha ao preparar o backup: {e}") from e
+    return caminho_trabalho
+
+def _remover_trabalho(caminho_trabalho):
+    for sufixo in ("", "-journal", "-wal", "-shm"):
+        if os.path.exists(caminho_trabalho + sufixo): os.remove(caminho_trabalho + sufixo)
+
+def restaurar(caminho_trabalho, caminho=banco.CAMINHO_DB, banco_atual=None):
+    """Copia a cópia de trabalho validada para o banco ativo. Depois disso as conexões devem ser reabertas (banco.iniciar)."""
+    try:
+        # Para o escritor para nenhuma escrita pendente cair no meio; a cópia ocorre numa transação só
+        # (quem está lendo continua vendo o banco antigo até o fim)
+        if banco_atual: banco_atual.fechar()
+        origem, destino = sqlite3.connect(caminho_trabalho), banco.conectar(caminho)
+        try: _copiar_paginas(origem, destino)
+        finally:
+            origem.close(); destino.close()
+    finally:
+        _remover_trabalho(caminho_trabalho)
@@ -0,0 +1,488 @@
+import re
+import time
+import queue
+import sqlite3
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+from extracao_pdf import criar_tabela_cache
+import legislacao
+import analise_ia
+import permanencia
+import desempenho
+import busca
+import tendencias
+import cache_leituras
+from cache_leituras import cacheado
+import migracoes
+from migracoes import TABELAS_DOMINIO
+
+# ==================== BANCO DE DADOS ====================
+# Camada de acesso ao SQLite compartilhada por todas as sessões do Streamlit:
+# - modo WAL, para leituras não bloquearem (nem serem bloqueadas por) escritas;
+# - uma conexão de leitura por thread, em vez de uma conexão única sem trava para todo mundo;
+# - um único escritor em thread própria, que agrupa as escritas enfileiradas numa só transação.
+CAMINHO_DB = 'processos.db'
+
+PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=10000",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=134217728",
+)
+
+ResultadoEscrita = namedtuple('ResultadoEscrita', 'rowcount lastrowid')
+# Views com triggers INSTEAD OF: nelas o SQLite informa 0 linhas afetadas e id 0 (as escritas reais são feitas pelos triggers)
+VIEWS_GRAVAVEIS = ("processos", "tramitacao")
+_ALVO_ESCRITA = re.compile(r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(\w+)", re.IGNORECASE)
+
+def conectar(caminho=CAMINHO_DB, **kwargs):
+    conn = sqlite3.connect(caminho, timeout=10, **kwargs)
+    for pragma in PRAGMAS: conn.execute(pragma)
+    return conn
+
+# === ESCRITOR EM LOTE ===
+class EscritorLotes:
+    """Thread única de escrita. Cada item é uma função f(conn); os itens que se acumulam enquanto uma transação
+    está em andamento entram juntos na próxima (group commit), cada um isolado num SAVEPOINT."""
+
+    def __init__(self, caminho, max_lote=256):
+        self.caminho = caminho
+        self.max_lote = max_lote
+        self.fila = queue.Queue()
+        self.transacoes = 0
+        self.escritas = 0
+        self._thread = threading.Thread(target=self._loop, name="escritor-sqlite", daemon=True)
+        self._thread.start()
+
+    def enviar(self, funcao):
+        futuro = Future()
+        self.fila.put((funcao, futuro))
+        return futuro
+
+    def parar(self, timeout=5):
+        self.fila.put(None)
+        self._thread.join(timeout)
+
+    def _loop(self):
+        conn = conectar(self.caminho, isolation_level=None)
+        try:
+            while True:
+                item = self.fila.get()
+                if item is None: return
+                lote = [item]
+                while len(lote) < self.max_lote:
+                    try: proximo = self.fila.get_nowait()
+                    except queue.Empty: break
+                    if proximo is None:
+                        self.fila.put(None); break
+                    lote.append(proximo)
+                self._executar_lote(conn, lote)
+        finally:
+            conn.close()
+
+    def _executar_lote(self, conn, lote):
+        resultados = []
+        inicio = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for funcao, futuro in lote:
+                conn.execute("SAVEPOINT item")
+                try:
+                    resultados.append((futuro, funcao(conn), None))
+                    conn.execute("RELEASE item")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO item"); conn.execute("RELEASE item")
+                    resultados.append((futuro, None, e))
+            conn.execute("COMMIT")
+            self.transacoes += 1; self.escritas += len(lote)
+            desempenho.registrar('escrita', 'transação do escritor', (time.perf_counter() - inicio) * 1000, len(lote))
+        except Exception as e:
+            if conn.in_transaction: conn.execute("ROLLBACK")
+            resultados = [(futuro, None, e) for _, futuro in lote]
+        for futuro, resultado, erro in resultados:
+            if erro is not None: futuro.set_exception(erro)
+            else: futuro.set_result(resultado)
+
+class Banco:
+    def __init__(self, caminho=CAMINHO_DB):
+        self.caminho = caminho
+        self._local = threading.local()
+        self.escritor = EscritorLotes(caminho)
+
+    def conexao(self):
+        # Conexão própria da thread (o Streamlit roda cada sessão numa thread)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = conectar(self.caminho, factory=desempenho.ConexaoMedida)
+        return conn
+
+    def transacao(self, funcao, timeout=30):
+        return self.escritor.enviar(funcao).result(timeout)
+
+    def escrever(self, query, params=(), timeout=30):
+        """Executa um comando pelo escritor. Numa view gravável, linhas e id saem None (desconhecidos, não 0): quem precisa
+        deles usa salvar_processo/salvar_movimentacao, que gravam nas tabelas base."""
+        alvo = _ALVO_ESCRITA.match(query)
+        na_view = bool(alvo) and alvo.group(1).lower() in VIEWS_GRAVAVEIS
+
+        def executar(c):
+            cur = c.execute(query, params)
+            return ResultadoEscrita(None, None) if na_view else ResultadoEscrita(cur.rowcount, cur.lastrowid)
+        # Tempo visto pela sessão: espera na fila do escritor + execução + commit do lote. Sem 'quantidade': um comando
+        # por medição, e as linhas afetadas não são conhecidas nas views (os triggers INSTEAD OF informam 0)
+        with desempenho.medir('escrita', desempenho.texto_sql(query)):
+            return self.transacao(executar, timeout)
+
+    def fechar(self):
+        self.escritor.parar()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close(); self._local.conn = None
+
+_banco = None
+
+def usar(banco):
+    global _banco
+    _banco = banco
+    # Outro banco (ou o mesmo restaurado de um backup): nada do que está em cache vale mais
+    cache_leituras.CACHE.limpar()
+
+def obter():
+    return _banco
+
+def _conexao_atual():
+    return _banco.conexao() if _banco else None
+
+def gravar(conn, funcao, esperar=True):
+    """Executa funcao(c) numa transação. Se `conn` é a conexão de leitura de uma thread do banco ativo, a escrita vai
+    para o escritor único (sem disputar a trava de escrita com ele); senão (scripts, bancos avulsos), direto em `conn`.
+    Com esperar=False a escrita só é enfileirada e nada é retornado."""
+    if _banco and conn is getattr(_banco._local, 'conn', None):
+        if not esperar:
+            _banco.escritor.enviar(funcao); return None
+        return _banco.transacao(funcao)
+    with conn:
+        return funcao(conn)
+
+# === TABELAS DE RESUMO DO DASHBOARD (MANTIDAS POR TRIGGERS) ===
+DIMENSOES_RESUMO = ("status", "uso", "tipologia", "analista")
+
+def _nome_dominio(dim, linha):
+    return f"(SELECT nome FROM {TABELAS_DOMINIO[dim]} WHERE id = {linha}.{dim}_id)"
+
+def _sql_resumo_processo(linha, sinal):
+    # Soma (sinal=1) ou subtrai (sinal=-1) a linha NEW/OLD de processos_base em cada dimensão do resumo
+    cmds = []
+    for dim in DIMENSOES_RESUMO:
+        cmds.append(f"""INSERT INTO resumo_processos (dimensao, valor, total, area, soma_jd_protocolo, com_data)
+            VALUES ('{dim}', COALESCE({_nome_dominio(dim, linha)}, ''), {sinal}, {sinal} * COALESCE({linha}.area, 0),
+                    {sinal} * COALESCE(julianday({linha}.data_protocolo), 0), {sinal} * (julianday({linha}.data_protocolo) IS NOT NULL))
+            ON CONFLICT(dimensao, valor) DO UPDATE SET
+                total = total + excluded.total, area = area + excluded.area,
+                soma_jd_protocolo = soma_jd_protocolo + excluded.soma_jd_protocolo, com_data = com_data + excluded.com_data;""")
+    if sinal < 0: cmds.append("DELETE FROM resumo_processos WHERE total <= 0;")
+    return "\n".join(cmds)
+
+def _sql_resumo_tramitacao(linha, sinal):
+    # Movimentações fechadas guardam os dias; abertas guardam a soma das datas de entrada (dias = hoje * abertos - soma)
+    cmds = [f"""INSERT INTO resumo_setor (setor, movimentacoes, dias_fechados, abertos, soma_jd_abertos)
+        VALUES (COALESCE({_nome_dominio('setor', linha)}, ''), {sinal},
+                {sinal} * CASE WHEN {linha}.data_saida IS NOT NULL THEN COALESCE(julianday({linha}.data_saida) - julianday({linha}.data_entrada), 0) ELSE 0 END,
+                {sinal} * ({linha}.data_saida IS NULL AND julianday({linha}.data_entrada) IS NOT NULL),
+                {sinal} * CASE WHEN {linha}.data_saida IS NULL THEN COALESCE(julianday({linha}.data_entrada), 0) ELSE 0 END)
+        ON CONFLICT(setor) DO UPDATE SET
+            movimentacoes = movimentacoes + excluded.movimentacoes, dias_fechados = dias_fechados + excluded.dias_fechados,
+            abertos = abertos + excluded.abertos, soma_jd_abertos = soma_jd_abertos + excluded.soma_jd_abertos;"""]
+    if sinal < 0: cmds.append("DELETE FROM resumo_setor WHERE movimentacoes <= 0;")
+    return "\n".join(cmds)
+
+def reconstruir_resumos(c):
+    # Recalcula os resumos a partir das tabelas base (primeira criação ou base restaurada), agrupando pelos ids
+    c.execute("DELETE FROM resumo_processos")
+    for dim in DIMENSOES_RESUMO:
+        c.execute(f"""INSERT INTO resumo_processos (dimensao, valor, total, area, soma_jd_protocolo, com_data)
+            SELECT '{dim}', COALESCE(d.nome, ''), COUNT(*), COALESCE(SUM(p.area), 0),
+                   COALESCE(SUM(julianday(p.data_protocolo)), 0), COUNT(julianday(p.data_protocolo))
+            FROM processos_base p LEFT JOIN {TABELAS_DOMINIO[dim]} d ON d.id = p.{dim}_id GROUP BY p.{dim}_id""")
+    c.execute("DELETE FROM resumo_setor")
+    c.execute("""INSERT INTO resumo_setor (setor, movimentacoes, dias_fechados, abertos, soma_jd_abertos)
+        SELECT COALESCE(s.nome, ''), COUNT(*),
+               COALESCE(SUM(CASE WHEN t.data_saida IS NOT NULL THEN julianday(t.data_saida) - julianday(t.data_entrada) END), 0),
+               SUM(t.data_saida IS NULL AND julianday(t.data_entrada) IS NOT NULL),
+               COALESCE(SUM(CASE WHEN t.data_saida IS NULL THEN julianday(t.data_entrada) END), 0)
+        FROM tramitacao_base t LEFT JOIN setores s ON s.id = t.setor_id GROUP BY t.setor_id""")
+
+def criar_resumos(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS resumo_processos (
+        dimensao TEXT NOT NULL, valor TEXT NOT NULL,
+        total INTEGER DEFAULT 0, area REAL DEFAULT 0,
+        soma_jd_protocolo REAL DEFAULT 0, com_data INTEGER DEFAULT 0,
+        PRIMARY KEY (dimensao, valor)
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS resumo_setor (
+        setor TEXT PRIMARY KEY NOT NULL, movimentacoes INTEGER DEFAULT 0,
+        dias_fechados REAL DEFAULT 0, abertos INTEGER DEFAULT 0, soma_jd_abertos REAL DEFAULT 0
+    )''')
+    existe = c.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='trg_resumo_proc_ins'").fetchone()
+    gatilhos = {
+        "trg_resumo_proc_ins": ("AFTER INSERT ON processos_base", _sql_resumo_processo("NEW", 1)),
+        "trg_resumo_proc_del": ("AFTER DELETE ON processos_base", _sql_resumo_processo("OLD", -1)),
+        "trg_resumo_proc_upd": ("AFTER UPDATE OF status_id, uso_id, tipologia_id, analista_id, area, data_protocolo ON processos_base",
+                                _sql_resumo_processo("OLD", -1) + "\n" + _sql_resumo_processo("NEW", 1)),
+        "trg_resumo_tram_ins": ("AFTER INSERT ON tramitacao_base", _sql_resumo_tramitacao("NEW", 1)),
+        "trg_resumo_tram_del": ("AFTER DELETE ON tramitacao_base", _sql_resumo_tramitacao("OLD", -1)),
+        "trg_resumo_tram_upd": ("AFTER UPDATE OF setor_id, data_entrada, data_saida ON tramitacao_base",
+                                _sql_resumo_tramitacao("OLD", -1) + "\n" + _sql_resumo_tramitacao("NEW", 1)),
+    }
+    for nome, (evento, corpo) in gatilhos.items():
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS {nome} {evento} BEGIN\n{corpo}\nEND")
+    if not existe: reconstruir_resumos(c)
+
+# === ESQUEMA ===
+def criar_esquema(c):
+    # Tabelas principais e correções de dados ficam nas migrações (migracoes.py); aqui só o que é idempotente
+
+    # === ÍNDICES (FILTROS, ORDENAÇÃO E PAGINAÇÃO) ===
+    c.execute("CREATE INDEX IF NOT EXISTS idx_processos_status ON processos_base(status_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_processos_analista ON processos_base(analista_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_processos_data_protocolo ON processos_base(data_protocolo)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_processos_ordem_protocolo ON processos_base(COALESCE(data_protocolo, ''), id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_tramitacao_processo ON tramitacao_base(processo_id)")
+
+    criar_resumos(c)
+    permanencia.criar_estruturas(c)
+    busca.criar_estruturas(c)
+    tendencias.criar_estruturas(c)
+    cache_leituras.criar_estruturas(c)
+    criar_tabela_cache(c)
+    legislacao.criar_tabelas(c)
+    analise_ia.criar_tabelas(c)
+
+# === CARGA EM LOTE ===
+# Os triggers das estruturas derivadas (resumos, histograma de permanência, busca, tendências) custam mais que a própria
+# inserção; numa carga grande eles saem e, no fim, o criar_esquema os recria e recalcula tudo de uma vez
+# (o que também acontece na próxima inicialização se a carga for interrompida no meio).
+# O app continua gravando durante a carga, então ficam ativos:
+#   - a contagem de transições de status, que não se recalcula das tabelas de origem (e a carga só insere);
+#   - a versão dos dados, para as outras sessões não servirem leituras em cache anteriores às suas gravações.
+PREFIXOS_DERIVADOS = ("trg_resumo_", "trg_permanencia_", "trg_busca_", "trg_tendencia_")
+MANTIDOS_NA_CARGA = ("trg_tendencia_status",)
+
+def suspender_derivados(c):
+    nomes = [r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type='trigger'").fetchall()
+             if r[0].startswith(PREFIXOS_DERIVADOS) and r[0] not in MANTIDOS_NA_CARGA]
+    for nome in nomes: c.execute(f"DROP TRIGGER {nome}")
+
+def retomar_derivados(c):
+    criar_esquema(c)
+    # As estruturas recalculadas mudam sem tocar as tabelas de origem: invalida o que foi lido delas durante a carga
+    c.execute("UPDATE versao_dados SET versao = versao + 1")
+
+def iniciar(caminho=CAMINHO_DB):
+    conn = sqlite3.connect(caminho)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        migracoes.aplicar(conn)
+        c = conn.cursor()
+        criar_esquema(c)
+        conn.commit()
+    finally:
+        conn.close()
+    banco = Banco(caminho)
+    usar(banco)
+    return banco
+
+# ==================== FUNÇÕES AUXILIARES ====================
+def executar_query(query, params=(), commit=False):
+    # Leituras usam a conexão da thread; escritas (commit=True) vão para o escritor único
+    if not _banco: return False, "Sem conexão"
+    try:
+        if commit: return True, _banco.escrever(query, params)
+        return True, _banco.conexao().execute(query, params)
+    except Exception as e:
+        return False, str(e)
+
+@cacheado(_conexao_atual)
+def listar_processos():
+    suc, res = executar_query('SELECT * FROM processos ORDER BY id DESC')
+    return res.fetchall() if suc else []
+
+# Chaves de ordenação da paginação (keyset), como expressões sobre processos_base p: a última chave vira o desempate.
+# Nenhuma chave pode ser NULL (a comparação do cursor daria NULL e pularia a linha): a data vazia vira '' e fica no fim.
+ORDENACOES_PROCESSOS = {
+    "Mais recentes": ("p.id",),
+    "Data de protocolo": ("COALESCE(p.data_protocolo, '')", "p.id"),
+}
+
+# Filtros por nome resolvidos para o id da tabela de domínio (o índice é sobre o inteiro)
+def _filtro_dominio(dim, coluna=None):
+    return f"{coluna or dim + '_id'} = (SELECT id FROM {TABELAS_DOMINIO[dim]} WHERE nome = ?)"
+
+# Retorna (linhas, próximo cursor) com filtro, ordenação e paginação feitos no SQL
+@cacheado(_conexao_atual)
+def listar_processos_pagina(analista=None, status=None, ordem="Mais recentes", cursor=None, limite=50):
+    chaves = ORDENACOES_PROCESSOS[ordem]
+    filtros, params = [], []
+    if analista: filtros.append(_filtro_dominio('analista', 'p.analista_id')); params.append(analista)
+    if status: filtros.append(_filtro_dominio('status', 'p.status_id')); params.append(status)
+    if cursor is not None:
+        filtros.append(f"({', '.join(chaves)}) < ({', '.join('?' * len(chaves))})")
+        params.extend(cursor)
+        # O SQLite não usa o índice de expressões para o row value; a primeira chave sozinha vira a faixa do índice
+        if len(chaves) > 1: filtros.append(f"{chaves[0]} <= ?"); params.append(cursor[0])
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    ordem_sql = ", ".join(f"{k} DESC" for k in chaves)
+    suc, res = executar_query(
+        f"""SELECT p.id, p.numero, p.requerente, s.nome, {', '.join(chaves)}
+            FROM processos_base p LEFT JOIN status_processo s ON s.id = p.status_id {where} ORDER BY {ordem_sql} LIMIT ?""",
+        (*params, limite + 1)
+    )
+    if not suc: return [], None
+    linhas = res.fetchall()
+    if len(linhas) <= limite: return linhas, None
+    linhas = linhas[:limite]
+    return linhas, tuple(linhas[-1][4:])
+
+@cacheado(_conexao_atual)
+def _listar_dominio(dim):
+    # Só os valores em uso, lidos da tabela de domínio (pequena) com EXISTS pelo índice do id
+    tabela = TABELAS_DOMINIO[dim]
+    suc, res = executar_query(f"""SELECT d.nome FROM {tabela} d
+        WHERE EXISTS (SELECT 1 FROM processos_base p WHERE p.{dim}_id = d.id) ORDER BY d.nome""")
+    return [r[0] for r in res.fetchall()] if suc else []
+
+def listar_analistas():
+    return _listar_dominio('analista')
+
+def listar_status():
+    return _listar_dominio('status')
+
+# === KANBAN ===
+@cacheado(_conexao_atual)
+def contar_por_status():
+    suc, res = executar_query("""SELECT s.nome, COUNT(*) FROM processos_base p
+        JOIN status_processo s ON s.id = p.status_id GROUP BY p.status_id""")
+    return dict(res.fetchall()) if suc else {}
+
+@cacheado(_conexao_atual)
+def listar_cartoes_kanban(status, limite):
+    suc, res = executar_query(f"SELECT id, numero, requerente FROM processos_base WHERE {_filtro_dominio('status')} ORDER BY id DESC LIMIT ?", (status, limite))
+    return res.fetchall() if suc else []
+
+# Move vários processos de uma vez, num único UPDATE por lote dentro de uma só transação
+def mover_processos(ids, novo_status, lote=500):
+    if not _banco: return False, "Sem conexão"
+    ids = list(ids)
+    if not ids: return True, 0
+
+    def mover(c):
+        status_id = _id_dominio(c, 'status', novo_status)
+        for i in range(0, len(ids), lote):
+            parte = ids[i:i + lote]
+            c.execute(f"UPDATE processos_base SET status_id=? WHERE id IN ({','.join('?' * len(parte))})", (status_id, *parte))
+        return len(ids)
+    try:
+        return True, _banco.transacao(mover)
+    except Exception as e:
+        return False, str(e)
+
+# === ESCRITAS DE PROCESSOS E MOVIMENTAÇÕES ===
+# Direto nas tabelas base, para as linhas afetadas e o id gerado virem certos (pelas views viriam 0);
+# os nomes dos domínios são cadastrados e resolvidos como nos triggers das views
+def _id_dominio(c, dim, nome):
+    nome = str(nome).strip() if nome is not None else ""
+    if not nome: return None
+    # Um nome que só difere na caixa ou nos espaços de um já cadastrado é ignorado e resolve para o existente
+    c.execute(f"INSERT OR IGNORE INTO {TABELAS_DOMINIO[dim]} (nome) VALUES (?)", (migracoes.nome_exibicao(nome),))
+    return c.execute(f"SELECT {migracoes.id_por_nome(dim)}", (nome,)).fetchone()[0]
+
+def _gravar_base(tabela, dominios, dados, registro_id):
+    # dados: campos com os nomes da view (processos/tramitacao); registro_id None = cadastro
+    def gravar(c):
+        valores = dict(dados)
+        for dim in dominios:
+            if dim in valores: valores[f"{dim}_id"] = _id_dominio(c, dim, valores.pop(dim))
+        if registro_id is None:
+            cur = c.execute(f"INSERT INTO {tabela} ({', '.join(valores)}) VALUES ({', '.join('?' * len(valores))})", tuple(valores.values()))
+            return ResultadoEscrita(cur.rowcount, cur.lastrowid)
+        cur = c.execute(f"UPDATE {tabela} SET {', '.join(f'{k} = ?' for k in valores)} WHERE id = ?", (*valores.values(), registro_id))
+        return ResultadoEscrita(cur.rowcount, registro_id if cur.rowcount else None)
+    return gravar
+
+def _executar_escrita(funcao):
+    if not _banco: return False, "Sem conexão"
+    try:
+        return True, _banco.transacao(funcao)
+    except Exception as e:
+        return False, str(e)
+
+def salvar_processo(dados, processo_id=None):
+    """Cadastra (sem processo_id) ou atualiza um processo. Retorna (sucesso, ResultadoEscrita ou mensagem de erro)."""
+    if processo_id is None and dados.get('status') is None: dados = {**dados, 'status': 'Protocolado'}
+    return _executar_escrita(_gravar_base('processos_base', ('analista', 'uso', 'tipologia', 'status'), dados, processo_id))
+
+def excluir_processo(processo_id):
+    # Movimentações e análises saem junto, numa só transação
+    def excluir(c):
+        c.execute("DELETE FROM tramitacao_base WHERE processo_id=?", (processo_id,))
+        c.execute("DELETE FROM analises WHERE processo_id=?", (processo_id,))
+        cur = c.execute("DELETE FROM processos_base WHERE id=?", (processo_id,))
+        return ResultadoEscrita(cur.rowcount, None)
+    return _executar_escrita(excluir)
+
+def salvar_movimentacao(dados, movimentacao_id=None, fechar_aberta=False):
+    """Registra (sem movimentacao_id) ou corrige uma movimentação. Com fechar_aberta, a movimentação em aberto do processo
+    recebe como saída a data de entrada da nova, na mesma transação."""
+    gravar = _gravar_base('tramitacao_base', ('setor',), dados, movimentacao_id)
+
+    def movimentar(c):
+        if fechar_aberta:
+            c.execute("UPDATE tramitacao_base SET data_saida=? WHERE processo_id=? AND data_saida IS NULL", (dados['data_entrada'], dados['processo_id']))
+        return gravar(c)
+    return _executar_escrita(movimentar)
+
+def excluir_movimentacao(movimentacao_id):
+    return _executar_escrita(lambda c: ResultadoEscrita(c.execute("DELETE FROM tramitacao_base WHERE id=?", (movimentacao_id,)).rowcount, None))
+
+@cacheado(_conexao_atual)
+def buscar_processo(numero_ou_id):
+    query = 'SELECT * FROM processos WHERE id = ?' if isinstance(numero_ou_id, int) else 'SELECT * FROM processos WHERE numero = ?'
+    suc, res = executar_query(query, (numero_ou_id,))
+    return res.fetchone() if suc else None
+
+# === DASHBOARD ===
+# Lê as tabelas de resumo (poucas linhas agregadas) em vez de varrer os processos
+@cacheado(_conexao_atual)
+def resumo_dashboard(conn):
+    import pandas as pd  # só quando o Dashboard ou um relatório é pedido
+    try:
+        df_res = pd.read_sql_query("SELECT dimensao, valor, total, area, soma_jd_protocolo, com_data FROM resumo_processos WHERE total > 0", conn)
+        df_setor = pd.read_sql_query(
+            "SELECT setor, dias_fechados + abertos * julianday(date('now', 'localtime')) - soma_jd_abertos AS dias FROM resumo_setor WHERE movimentacoes > 0", conn)
+    except Exception:
+        return None
+    if df_res.empty: return None
+
+    def por_dimensao(dim):
+        # Os nomes já vêm canônicos das tabelas de domínio (uma linha por valor)
+        d = df_res[df_res['dimensao'] == dim][['valor', 'total', 'area']].rename(columns={'valor': dim})
+        return d.sort_values('total', ascending=False, ignore_index=True)
+
+    df_status = por_dimensao('status')
+    linhas_status = df_res[df_res['dimensao'] == 'status']
+    com_data = linhas_status['com_data'].sum()
+    hoje_jd = pd.Timestamp.now().normalize().to_julian_date()
+    df_analista = por_dimensao('analista')
+    return {
+        'total': int(df_status['total'].sum()),
+        'area_total': float(df_status['area'].sum()),
+        'aprovados': int(df_status.loc[df_status['status'] == 'Aprovado', 'total'].sum()),
+        'media_dias': (hoje_jd - linhas_status['soma_jd_protocolo'].sum() / com_data) if com_data else float('nan'),
+        'status': df_status,
+        'uso': por_dimensao('uso'),
+        'tipologia': por_dimensao('tipologia'),
+        'analista': df_analista[df_analista['analista'].str.len() > 0][['analista', 'area']],
+        'setor': df_setor,
+    }
@@ -0,0 +1,231 @@
+"""Benchmark dos caminhos mais usados da aplicação sobre bases sintéticas de vários tamanhos."""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+from datetime import date, datetime, timedelta
+import banco
+import busca
+import permanencia
+import tendencias
+import dados_sinteticos
+import cache_leituras
+
+# ==================== BENCHMARK ====================
+# Cada caso roda uma vez para aquecer e depois é repetido; o resultado vai para um JSON Lines com o commit do git e
+# é comparado com a versão anterior: quem ficou mais lento que a tolerância é regressão (código de saída 1)
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_RESULTADOS = "resultados_benchmark.jsonl"
+TAMANHOS = (1000, 10000, 50000)
+REPETICOES = 7
+TOLERANCIA = 0.25
+PISO_MS = 1.0  # diferenças menores que isso são ruído, mesmo que a proporção seja grande
+AMOSTRA = 100  # buscas por id/número/texto em cada repetição
+PAGINAS_PDF = (4, 20, 60)
+
+# ==================== CASOS ====================
+def casos_banco(conn, n):
+    """Casos que dependem do tamanho da base: nome -> função sem argumentos."""
+    rnd = random.Random(n)
+    ids = [rnd.randint(1, n) for _ in range(AMOSTRA)]
+    numeros = [r[0] for r in conn.execute("SELECT numero FROM processos_base WHERE id IN (%s)" % ",".join(map(str, ids))).fetchall()]
+    termos = [f"{rnd.choice(dados_sinteticos.NOMES)[:4]} {rnd.choice(dados_sinteticos.SOBRENOMES)}" for _ in range(AMOSTRA)]
+    pagina = [r[0] for r in banco.listar_processos_pagina()[0]]
+    return {
+        'listar_processos': banco.listar_processos,
+        'listar_processos_pagina': banco.listar_processos_pagina,
+        'listar_processos_pagina (filtro)': lambda: banco.listar_processos_pagina(status='Em Análise', ordem="Data de protocolo"),
+        f'buscar_processo (id) x{AMOSTRA}': lambda: [banco.buscar_processo(i) for i in ids],
+        f'buscar_processo (número) x{AMOSTRA}': lambda: [banco.buscar_processo(nr) for nr in numeros],
+        f'buscar_processos (texto) x{AMOSTRA}': lambda: [busca.buscar_processos(conn, t) for t in termos],
+        'resumo_dashboard': lambda: banco.resumo_dashboard(conn),
+        'contar_por_status': banco.contar_por_status,
+        'dias_por_setor (página)': lambda: permanencia.dias_por_setor(conn, pagina),
+        'dias_por_setor (todos)': lambda: permanencia.dias_por_setor(conn),
+        f'movimentacoes_processo x{AMOSTRA}': lambda: [permanencia.movimentacoes_processo(conn, i) for i in ids],
+        'percentis_setor': lambda: permanencia.percentis_setor(conn),
+        'contar_violacoes': lambda: permanencia.contar_violacoes(conn),
+        'tendencias (semanal, 1 ano)': lambda: _tendencias(conn, 'semana', 1),
+        'tendencias (diário, 10 anos)': lambda: _tendencias(conn, 'dia', 10),
+        'gerar_pdf_dashboard': lambda: _pdf_dashboard(conn),
+    }
+
+def _tendencias(conn, grao, anos):
+    # O que a seção de tendências do Dashboard lê a cada mudança de intervalo
+    fim = date.today()
+    inicio = fim - timedelta(days=365 * anos)
+    return (tendencias.totais(conn, inicio, fim), tendencias.serie(conn, 'protocolo', grao, inicio, fim),
+            tendencias.serie_por_chave(conn, 'transicao', grao, inicio, fim), tendencias.serie(conn, 'entrada', grao, inicio, fim),
+            tendencias.serie(conn, 'saida', grao, inicio, fim), tendencias.estoque(conn, grao, inicio, fim))
+
+def _pdf_dashboard(conn):
+    # O caminho do botão do Dashboard: agregação, figuras, JPEGs pelo kaleido e montagem do PDF
+    import relatorio_pdf
+    resumo = banco.resumo_dashboard(conn)
+    figuras = relatorio_pdf.montar_figuras_dashboard(resumo)
+    return relatorio_pdf.gerar_pdf_dashboard(resumo['analista'], relatorio_pdf.metricas_dashboard(resumo),
+                                            *(relatorio_pdf.renderizar_figura(f) for f in figuras))
+
+def gerar_pdf_amostra(paginas, semente=0):
+    """PDF de texto com `paginas` páginas, no lugar de um projeto real (os textos são frases da legislação inventadas)."""
+    from fpdf import FPDF
+    rnd = random.Random(semente)
+    palavras = "recuo frontal lateral taxa ocupação coeficiente aproveitamento gabarito altura área permeável vagas".split()
+    pdf = FPDF()
+    pdf.set_font("Arial", size=10)
+    for p in range(paginas):
+        pdf.add_page()
+        for linha in range(45):
+            pdf.cell(0, 5, f"Art. {p * 45 + linha + 1}. " + " ".join(rnd.choices(palavras, k=12)), 0, 1)
+    return pdf.output(dest='S').encode('latin-1')
+
+def casos_pdf():
+    """Extração de texto (sem o cache do banco) de amostras com poucas e muitas páginas, em série e no pool de processos."""
+    from extracao_pdf import extrair_textos
+    amostras = [gerar_pdf_amostra(p, semente=p) for p in PAGINAS_PDF]
+    rotulo = "+".join(map(str, PAGINAS_PDF))
+    return {
+        f'extrair_textos ({rotulo} págs, série)': lambda: extrair_textos(None, amostras, limite=None, paralelo=False),
+        f'extrair_textos ({rotulo} págs, paralelo)': lambda: extrair_textos(None, amostras, limite=None, paralelo=True),
+        f'extrair_textos ({rotulo} págs, 30k caracteres)': lambda: extrair_textos(None, amostras),
+    }
+
+# ==================== MEDIÇÃO ====================
+def cronometrar(funcao, repeticoes):
+    funcao()  # aquecimento: cache de páginas do SQLite, importações, subida do kaleido e do pool
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {'p50_ms': statistics.median(tempos), 'min_ms': tempos[0], 'max_ms': tempos[-1], 'repeticoes': repeticoes}
+
+def versao_codigo():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+        alterado = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=RAIZ, capture_output=True, text=True).stdout.strip()
+        return commit + ("-modificado" if alterado else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecida"
+
+def _selecionar(casos, filtros):
+    return {nome: f for nome, f in casos.items() if not filtros or any(x in nome for x in filtros)}
+
+def executar(tamanhos, repeticoes, filtros=None, semente=42, pasta=None):
+    pasta = pasta or tempfile.mkdtemp(prefix="benchmark_")
+    resultados = []
+
+    def registrar(caso, tamanho, funcao):
+        r = cronometrar(funcao, repeticoes)
+        r.update(caso=caso, tamanho=tamanho)
+        resultados.append(r)
+        print(f"  {caso:45s} p50={r['p50_ms']:9.2f}ms  mín={r['min_ms']:9.2f}ms  máx={r['max_ms']:9.2f}ms")
+
+    for n in tamanhos:
+        caminho = os.path.join(pasta, f"processos_{n}_{semente}.db")
+        if not os.path.exists(caminho):
+            inicio = time.perf_counter()
+            gerado = dados_sinteticos.gerar(caminho, n, semente=semente)
+            print(f"Base com {n} processos e {gerado['tramitacao']['importadas']} movimentações gerada em {time.perf_counter() - inicio:.1f}s")
+        db = banco.iniciar(caminho)
+        try:
+            print(f"== {n} processos")
+            for caso, funcao in _selecionar(casos_banco(db.conexao(), n), filtros).items():
+                registrar(caso, n, funcao)
+        finally:
+            db.fechar()
+    pdf = _selecionar(casos_pdf(), filtros)
+    if pdf:
+        print("== extração de PDF")
+        for caso, funcao in pdf.items():
+            registrar(caso, None, funcao)
+    return resultados
+
+# ==================== RESULTADOS E REGRESSÕES ====================
+def gravar(arquivo, resultados, versao):
+    execucao = {'execucao': datetime.now().isoformat(timespec='seconds'), 'versao': versao,
+                'maquina': socket.gethostname(), 'python': platform.python_version()}
+    with open(arquivo, "a", encoding="utf-8") as f:
+        for r in resultados:
+            f.write(json.dumps({**execucao, **r}, ensure_ascii=False) + "\n")
+
+def ler(arquivo):
+    if not os.path.exists(arquivo): return []
+    with open(arquivo, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+def _ultima_execucao(registros, filtro):
+    execucoes = sorted({r['execucao'] for r in registros if filtro(r)})
+    return [r for r in registros if r['execucao'] == execucoes[-1]] if execucoes else []
+
+def comparar(registros, atual, referencia=None, tolerancia=TOLERANCIA):
+    """Linhas (caso, tamanho, p50 de referência, p50 atual, variação, situação) contra a última execução de outra versão
+    (ou da versão `referencia`) na mesma máquina."""
+    if not atual: return None, []
+    maquina, versao = atual[0]['maquina'], atual[0]['versao']
+    if referencia: anteriores = _ultima_execucao(registros, lambda r: r['versao'].startswith(referencia) and r['maquina'] == maquina)
+    else: anteriores = _ultima_execucao(registros, lambda r: r['versao'] != versao and r['maquina'] == maquina)
+    if not anteriores: return None, []
+    base = {(r['caso'], r['tamanho']): r['p50_ms'] for r in anteriores}
+    linhas = []
+    for r in atual:
+        antes = base.get((r['caso'], r['tamanho']))
+        if antes is None: continue
+        variacao = r['p50_ms'] / antes - 1 if antes else 0.0
+        diferenca = r['p50_ms'] - antes
+        if variacao > tolerancia and diferenca > PISO_MS: situacao = "REGRESSÃO"
+        elif variacao < -tolerancia and -diferenca > PISO_MS: situacao = "melhora"
+        else: situacao = ""
+        linhas.append((r['caso'], r['tamanho'], antes, r['p50_ms'], variacao, situacao))
+    return anteriores[0], linhas
+
+def imprimir_comparacao(referencia, linhas, tolerancia=TOLERANCIA):
+    if referencia is None:
+        print("Sem execução anterior de outra versão nesta máquina para comparar."); return 0
+    print(f"\nComparação com {referencia['versao']} ({referencia['execucao']}):")
+    for caso, tamanho, antes, depois, variacao, situacao in linhas:
+        print(f"  {caso:45s} {str(tamanho or '-'):>7s}  {antes:9.2f} -> {depois:9.2f}ms  {variacao:+7.1%}  {situacao}")
+    regressoes = sum(1 for l in linhas if l[5] == "REGRESSÃO")
+    print(f"{regressoes} regressão(ões) acima de {tolerancia:.0%}" if regressoes else "Nenhuma regressão.")
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=list(TAMANHOS), help="processos em cada base")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES)
+    parser.add_argument("--casos", nargs="+", metavar="TRECHO", help="só os casos cujo nome contém algum dos trechos")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--pasta", help="onde guardar as bases geradas (reaproveitadas entre execuções)")
+    parser.add_argument("--resultados", default=ARQUIVO_RESULTADOS)
+    parser.add_argument("--referencia", help="versão (commit) com a qual comparar; padrão: a última de outra versão")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA, help="aumento proporcional do p50 tolerado (0.25 = 25%%)")
+    parser.add_argument("--comparar", action="store_true", help="não mede; compara a última execução gravada")
+    parser.add_argument("--nao-gravar", action="store_true")
+    args = parser.parse_args()
+
+    # Sem o cache de leituras: cada repetição mede a consulta de fato, não um acerto
+    cache_leituras.CACHE.ativo = False
+    registros = ler(args.resultados)
+    if args.comparar:
+        atual = _ultima_execucao(registros, lambda r: True)
+    else:
+        versao = versao_codigo()
+        print(f"Versão {versao} | {socket.gethostname()} | Python {platform.python_version()}")
+        atual = executar(args.tamanhos, args.repeticoes, args.casos, args.semente, args.pasta)
+        if not args.nao_gravar:
+            gravar(args.resultados, atual, versao)
+            print(f"Resultados acrescentados a {args.resultados}")
+        atual = [{**r, 'versao': versao, 'maquina': socket.gethostname(), 'execucao': ''} for r in atual]
+    referencia, linhas = comparar(registros, atual, args.referencia, args.tolerancia)
+    sys.exit(1 if imprimir_comparacao(referencia, linhas, args.tolerancia) else 0)
+
+if __name__ == "__main__":
+    main()
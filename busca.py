@@ -0,0 +1,72 @@
+import re
+from migracoes import TABELAS_DOMINIO
+from cache_leituras import cacheado
+
+# ==================== BUSCA DE PROCESSOS (FTS5) ====================
+# Um documento por processo (número, requerente, RT e as observações das movimentações) num índice FTS5
+# mantido por triggers. Sem acentos e sem diferença de maiúsculas; cada palavra digitada vale como prefixo,
+# então "jo silv 0012" encontra "João da Silva", processo "P-0012/2024".
+
+LIMITE_RESULTADOS = 20
+RE_TERMO = re.compile(r'\w{2,}|\d', re.U)  # uma letra sozinha casaria com quase tudo; um dígito ainda filtra números
+
+# Pesos do BM25 por coluna: casar o número pesa mais que casar uma observação
+PESOS = (10.0, 5.0, 3.0, 1.0)
+
+def _sql_documento(processo_id):
+    # Refaz o documento do processo (apaga e reinsere): as observações são agregadas de todas as movimentações
+    return f"""DELETE FROM busca_processos WHERE rowid = {processo_id};
+        INSERT INTO busca_processos (rowid, numero, requerente, rt, observacoes)
+        SELECT p.id, p.numero, p.requerente, p.rt,
+               (SELECT group_concat(t.observacao, ' ') FROM tramitacao_base t WHERE t.processo_id = p.id)
+        FROM processos_base p WHERE p.id = {processo_id};"""
+
+def reconstruir_indice(c):
+    c.execute("DELETE FROM busca_processos")
+    c.execute("""INSERT INTO busca_processos (rowid, numero, requerente, rt, observacoes)
+        SELECT p.id, p.numero, p.requerente, p.rt, o.texto FROM processos_base p
+        LEFT JOIN (SELECT processo_id, group_concat(observacao, ' ') AS texto FROM tramitacao_base
+                   WHERE observacao IS NOT NULL AND observacao <> '' GROUP BY processo_id) o ON o.processo_id = p.id""")
+
+def criar_estruturas(c):
+    # Índices de prefixo de 2 e 3 letras deixam a busca enquanto se digita tão rápida quanto a de palavras inteiras
+    c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS busca_processos USING fts5(
+        numero, requerente, rt, observacoes, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )''')
+    existe = c.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='trg_busca_proc_ins'").fetchone()
+    # Movimentação sem observação não muda o documento: o trigger nem dispara
+    com_obs = "{0}.observacao IS NOT NULL AND {0}.observacao <> ''"
+    gatilhos = {
+        "trg_busca_proc_ins": ("AFTER INSERT ON processos_base", _sql_documento("NEW.id")),
+        "trg_busca_proc_upd": ("AFTER UPDATE OF numero, requerente, rt ON processos_base", _sql_documento("NEW.id")),
+        "trg_busca_proc_del": ("AFTER DELETE ON processos_base", "DELETE FROM busca_processos WHERE rowid = OLD.id;"),
+        "trg_busca_tram_ins": (f"AFTER INSERT ON tramitacao_base WHEN {com_obs.format('NEW')}", _sql_documento("NEW.processo_id")),
+        "trg_busca_tram_del": (f"AFTER DELETE ON tramitacao_base WHEN {com_obs.format('OLD')}", _sql_documento("OLD.processo_id")),
+        "trg_busca_tram_upd": ("AFTER UPDATE OF observacao, processo_id ON tramitacao_base",
+                               _sql_documento("OLD.processo_id") + "\n" + _sql_documento("NEW.processo_id")),
+    }
+    for nome, (evento, corpo) in gatilhos.items():
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS {nome} {evento} BEGIN\n{corpo}\nEND")
+    if not existe: reconstruir_indice(c)
+
+# === CONSULTA ===
+def montar_consulta(texto):
+    """Expressão MATCH do FTS5: todas as palavras digitadas (2+ letras ou um dígito), cada uma como prefixo ("" se não houver termos)."""
+    return " ".join(f'"{t}"*' for t in RE_TERMO.findall(texto or ""))
+
+@cacheado()
+def buscar_processos(conn, texto, limite=LIMITE_RESULTADOS, analista=None, status=None):
+    """Processos mais relevantes para o texto: (id, número, requerente, status). Sem texto, os mais recentes."""
+    filtros, params = [], []
+    if analista: filtros.append(f"p.analista_id = (SELECT id FROM {TABELAS_DOMINIO['analista']} WHERE nome = ?)"); params.append(analista)
+    if status: filtros.append(f"p.status_id = (SELECT id FROM {TABELAS_DOMINIO['status']} WHERE nome = ?)"); params.append(status)
+    consulta = montar_consulta(texto)
+    selecao = "SELECT p.id, p.numero, p.requerente, s.nome"
+    juncao = "LEFT JOIN status_processo s ON s.id = p.status_id"
+    if not consulta:
+        where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+        return conn.execute(f"{selecao} FROM processos_base p {juncao} {where} ORDER BY p.id DESC LIMIT ?", (*params, limite)).fetchall()
+    where = " AND ".join(["busca_processos MATCH ?"] + filtros)
+    return conn.execute(f"""{selecao} FROM busca_processos b JOIN processos_base p ON p.id = b.rowid {juncao}
+        WHERE {where} ORDER BY bm25(busca_processos, {', '.join(map(str, PESOS))}) LIMIT ?""",
+        (consulta, *params, limite)).fetchall()
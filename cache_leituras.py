@@ -0,0 +1,136 @@
+import sys
+import sqlite3
+import functools
+import threading
+from datetime import date
+from collections import OrderedDict
+
+# ==================== CACHE DE LEITURAS ====================
+# Resultados das consultas ficam em memória, compartilhados por todas as sessões, sob a versão dos dados:
+# um contador no próprio banco que os triggers incrementam a cada escrita nas tabelas lidas. Enquanto a versão
+# não muda, a mesma chamada devolve o resultado guardado; quando muda, tudo o que havia é descartado.
+# A versão é lida antes da consulta, então um resultado nunca fica mais velho que a versão sob a qual é guardado.
+# Os valores devolvidos são compartilhados: quem chama não deve alterá-los.
+
+MAX_ENTRADAS = 1024
+MAX_BYTES = 64 * 1024 * 1024
+# Tabelas cujas escritas invalidam o cache (as análises da IA não são lidas por funções em cache)
+TABELAS_VERSIONADAS = ("processos_base", "tramitacao_base")
+
+# === VERSÃO DOS DADOS ===
+def criar_estruturas(c):
+    # A época (aleatória, fixada na criação) distingue bancos diferentes abertos no mesmo processo
+    c.execute("CREATE TABLE IF NOT EXISTS versao_dados (id INTEGER PRIMARY KEY CHECK (id = 1), versao INTEGER NOT NULL, epoca TEXT NOT NULL)")
+    c.execute("INSERT OR IGNORE INTO versao_dados (id, versao, epoca) VALUES (1, 0, lower(hex(randomblob(8))))")
+    existe = c.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='trg_versao_processos_base_ins'").fetchone()
+    for tabela in TABELAS_VERSIONADAS:
+        for sufixo, evento in (("ins", "INSERT"), ("upd", "UPDATE"), ("del", "DELETE")):
+            c.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_versao_{tabela}_{sufixo} AFTER {evento} ON {tabela}
+                BEGIN UPDATE versao_dados SET versao = versao + 1; END""")
+    # Triggers recriados depois de uma carga em lote (que grava sem eles): os dados mudaram sem contar
+    if not existe: c.execute("UPDATE versao_dados SET versao = versao + 1")
+
+def versao_dados(conn):
+    return conn.execute("SELECT epoca, versao FROM versao_dados").fetchone()
+
+# === CACHE LRU ===
+def _tamanho(valor, profundidade=0):
+    # Estimativa do espaço ocupado: DataFrames pelo pandas, coleções pela soma dos itens (até 3 níveis)
+    if hasattr(valor, 'memory_usage'):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if hasattr(uso, 'sum') else uso)
+    tamanho = sys.getsizeof(valor)
+    if profundidade < 3:
+        if isinstance(valor, dict):
+            tamanho += sum(_tamanho(k, profundidade + 1) + _tamanho(v, profundidade + 1) for k, v in valor.items())
+        elif isinstance(valor, (list, tuple)):
+            tamanho += sum(_tamanho(v, profundidade + 1) for v in valor)
+    return tamanho
+
+class CacheLeituras:
+    """LRU limitado em entradas e bytes; descarta tudo quando a versão dos dados muda."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS, max_bytes=MAX_BYTES):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()  # chave -> (valor, bytes)
+        self._versao = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.ativo = True
+        self.por_funcao = {}  # nome -> [acertos, falhas]
+        self.invalidacoes = 0
+        self.despejos = 0
+
+    def _contar(self, nome, acerto):
+        contagem = self.por_funcao.setdefault(nome, [0, 0])
+        contagem[0 if acerto else 1] += 1
+
+    def _descartar_tudo(self):
+        self._entradas.clear(); self._bytes = 0
+
+    def obter(self, nome, chave, versao, calcular):
+        with self._lock:
+            if versao != self._versao:
+                if self._entradas: self.invalidacoes += 1
+                self._descartar_tudo(); self._versao = versao
+            item = self._entradas.get(chave)
+            if item is not None:
+                self._entradas.move_to_end(chave)
+                self._contar(nome, True)
+                return item[0]
+            self._contar(nome, False)
+        # Calculado fora da trava: duas sessões podem calcular a mesma chave ao mesmo tempo, mas ninguém espera pelo banco dos outros
+        valor = calcular()
+        tamanho = _tamanho(valor)
+        with self._lock:
+            if versao != self._versao or tamanho > self.max_bytes: return valor
+            anterior = self._entradas.pop(chave, None)
+            if anterior: self._bytes -= anterior[1]
+            self._entradas[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                _, (_, liberado) = self._entradas.popitem(last=False)
+                self._bytes -= liberado; self.despejos += 1
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._descartar_tudo(); self._versao = None
+
+    def estatisticas(self):
+        with self._lock:
+            funcoes = {nome: {'acertos': a, 'falhas': f, 'taxa_acerto': a / (a + f) if a + f else 0.0}
+                       for nome, (a, f) in self.por_funcao.items()}
+            acertos = sum(a for a, _ in self.por_funcao.values())
+            consultas = acertos + sum(f for _, f in self.por_funcao.values())
+            return {'entradas': len(self._entradas), 'bytes': self._bytes, 'versao': self._versao,
+                    'acertos': acertos, 'falhas': consultas - acertos, 'taxa_acerto': acertos / consultas if consultas else 0.0,
+                    'invalidacoes': self.invalidacoes, 'despejos': self.despejos, 'por_funcao': funcoes}
+
+# Um cache por processo do servidor, comum a todas as sessões
+CACHE = CacheLeituras()
+
+def _congelar(valor):
+    if isinstance(valor, (list, tuple, set)): return tuple(_congelar(v) for v in valor)
+    if isinstance(valor, dict): return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    return valor
+
+def cacheado(conexao=None):
+    """Decora uma função de leitura. A conexão vem do primeiro argumento (se for uma sqlite3.Connection, fica fora da
+    chave) ou de `conexao()`. Sem conexão ou sem a tabela de versão, a função roda direto, sem cache."""
+    def decorador(funcao):
+        nome = funcao.__name__
+
+        @functools.wraps(funcao)
+        def cacheada(*args, **kwargs):
+            conn = args[0] if args and isinstance(args[0], sqlite3.Connection) else (conexao() if conexao else None)
+            if conn is None or not CACHE.ativo: return funcao(*args, **kwargs)
+            try: versao = versao_dados(conn)
+            except sqlite3.Error: return funcao(*args, **kwargs)
+            resto = args[1:] if args and args[0] is conn else args
+            # A data entra na chave: prazos e dias em aberto mudam na virada do dia mesmo sem escrita
+            chave = (nome, _congelar(resto), _congelar(kwargs), date.today().toordinal())
+            return CACHE.obter(nome, chave, versao, lambda: funcao(*args, **kwargs))
+        return cacheada
+    return decorador
@@ -0,0 +1,8 @@
+import pytest
+import banco
+
+@pytest.fixture
+def db(tmp_path):
+    db = banco.iniciar(str(tmp_path / "processos.db"))
+    yield db
+    db.fechar()
@@ -0,0 +1,139 @@
+"""Gera uma base sintética reprodutível (mesma semente, mesmos dados) com processos e tramitações realistas."""
+import os
+import math
+import random
+import argparse
+from datetime import date, timedelta
+import banco
+import importacao
+
+# ==================== DISTRIBUIÇÕES ====================
+# Proporções próximas das reais; os dias em cada setor vêm de log-normais (há prazos estourados e movimentações em aberto)
+# (valor, peso relativo)
+STATUS = [('Protocolado', 18), ('Em Análise', 32), ('Aguardando Correções', 15), ('Aprovado', 28), ('Reprovado', 7)]
+USOS = [("Multifamiliar", 30), ("Unifamiliar", 25), ("Comércio Varejista", 15), ("Serviços", 12), ("Misto", 8),
+        ("Indústria", 6), ("Sem destinação específica", 4)]
+TIPOLOGIAS = [("Aprovação inicial", 35), ("Regularização", 25), ("Modificação de projeto", 15), ("Levantamento do existente", 10),
+              ("Misto", 7), ("Análise RIU", 5), ("ERB", 3)]
+# Área em m² por uso: mediana e dispersão da log-normal
+AREAS = {"Multifamiliar": (1800, 0.8), "Unifamiliar": (180, 0.5), "Comércio Varejista": (400, 0.9), "Serviços": (350, 0.9),
+         "Misto": (900, 0.8), "Indústria": (2500, 1.0), "Sem destinação específica": (250, 0.7)}
+# Dias em cada setor: mediana e dispersão da log-normal
+PERMANENCIA = {"Análise prévia": (3, 0.6), "Pré-análise": (6, 0.7), "Analista": (20, 0.8), "Requerente": (25, 0.9),
+               "Parecer externo": (30, 0.7), "Fiscalização": (12, 0.6), "Emissão de documentos": (5, 0.5)}
+ANALISTAS = 14
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João", "Larissa", "Marcos",
+         "Natália", "Otávio", "Paula", "Rafael", "Sabrina", "Tiago", "Vanessa", "Wagner"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Pereira", "Costa", "Rodrigues", "Almeida", "Nascimento", "Lima",
+              "Araújo", "Fernandes", "Carvalho", "Gomes", "Martins", "Rocha", "Ribeiro", "Alves", "Monteiro", "Mendes"]
+OBSERVACOES = ["Documentação completa", "Pendência de documentação", "Vistoria agendada", "Aguardando ART do responsável técnico",
+               "Projeto com divergência de área", "Enviado para parecer do corpo de bombeiros", "Correções atendidas",
+               "Solicitada planta de situação atualizada", "Taxa recolhida", "Retorno com exigências"]
+PROPORCAO_OBSERVACAO = 0.45
+
+# Percurso típico: entrada, triagem e análise; depois idas e vindas ao requerente até o desfecho
+INICIO = ["Análise prévia", "Pré-análise", "Analista"]
+CORRECAO = ["Requerente", "Analista"]
+DESFECHO = {'Aprovado': ["Emissão de documentos"], 'Reprovado': []}
+EXTRAS = [("Parecer externo", 0.15), ("Fiscalização", 0.2)]
+# Movimentações naturais (sem --tramitacoes) por status
+PASSOS_STATUS = {'Protocolado': (1, 2), 'Em Análise': (3, 3), 'Aguardando Correções': (4, 6), 'Aprovado': (4, 9), 'Reprovado': (3, 7)}
+
+def _sortear(rnd, pares, k):
+    valores, pesos = zip(*pares)
+    return rnd.choices(valores, pesos, k=k)
+
+def _lognormal(rnd, mediana, sigma):
+    return rnd.lognormvariate(math.log(mediana), sigma)
+
+def _nome(rnd):
+    return f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}"
+
+def _distribuir(rnd, quantidades, total):
+    # Ajusta as quantidades naturais até somarem `total`, sorteando os processos que ganham ou perdem movimentações
+    diferenca = total - sum(quantidades)
+    n = len(quantidades)
+    while diferenca > 0:
+        quantidades[rnd.randrange(n)] += 1; diferenca -= 1
+    while diferenca < 0:
+        i = rnd.randrange(n)
+        if quantidades[i]: quantidades[i] -= 1; diferenca += 1
+    return quantidades
+
+def _percurso(rnd, status, passos):
+    setores = list(INICIO)
+    for setor, chance in EXTRAS:
+        if rnd.random() < chance: setores.insert(rnd.randint(3, len(setores)), setor)
+    fim = DESFECHO.get(status, [])
+    while len(setores) < passos - len(fim): setores.extend(CORRECAO)
+    setores = setores[:max(0, passos - len(fim))] + fim
+    return setores[:passos]
+
+def _movimentacoes(rnd, numero, status, passos, hoje):
+    """Linhas de tramitação (número, setor, entrada, saída, observação) e a data de protocolo do processo."""
+    setores = _percurso(rnd, status, passos)
+    dias = [max(1, round(_lognormal(rnd, *PERMANENCIA[s]))) for s in setores]
+    concluido = status in DESFECHO
+    # Recua a partir de hoje: o último setor fica em aberto (há alguns dias) ou o processo terminou há algum tempo
+    if concluido: decorrido = sum(dias) + rnd.randint(0, 540)
+    else: decorrido = sum(dias[:-1]) + rnd.randint(0, 2 * dias[-1]) if dias else 0
+    protocolo = hoje - timedelta(days=decorrido + rnd.randint(0, 10))
+    linhas, entrada = [], protocolo
+    for i, (setor, d) in enumerate(zip(setores, dias)):
+        saida = entrada + timedelta(days=d)
+        aberta = i == len(setores) - 1 and not concluido
+        obs = rnd.choice(OBSERVACOES) if rnd.random() < PROPORCAO_OBSERVACAO else ""
+        linhas.append([numero, setor, entrada.isoformat(), None if aberta else saida.isoformat(), obs])
+        entrada = saida
+    return protocolo, linhas
+
+def gerar_linhas(n_processos, n_tramitacoes=None, semente=42, hoje=None):
+    """(processos, tramitações) como listas de linhas na ordem de importacao.CAMPOS. Mesma semente, mesmas linhas."""
+    rnd = random.Random(semente)
+    hoje = hoje or date.today()
+    status = _sortear(rnd, STATUS, n_processos)
+    passos = [rnd.randint(*PASSOS_STATUS[s]) for s in status]
+    if n_tramitacoes is not None: passos = _distribuir(rnd, passos, n_tramitacoes)
+    usos = _sortear(rnd, USOS, n_processos)
+    tipologias = _sortear(rnd, TIPOLOGIAS, n_processos)
+    analistas = [f"{nome} {sobrenome}" for nome, sobrenome in zip(NOMES[:ANALISTAS], reversed(SOBRENOMES))]
+    processos, tramitacoes = [], []
+    for i in range(n_processos):
+        protocolo, movs = _movimentacoes(rnd, None, status[i], passos[i], hoje)
+        numero = f"{i + 1:06d}/{protocolo.year}"
+        for m in movs: m[0] = numero
+        # Processo recém-protocolado ainda sem analista designado
+        analista = "" if status[i] == 'Protocolado' and rnd.random() < 0.5 else rnd.choice(analistas)
+        processos.append([numero, _nome(rnd), _nome(rnd), analista, usos[i], tipologias[i],
+                          round(_lognormal(rnd, *AREAS[usos[i]]), 2), protocolo.isoformat(), status[i]])
+        tramitacoes.extend(movs)
+    return processos, tramitacoes
+
+def gerar(caminho, n_processos, n_tramitacoes=None, semente=42, hoje=None):
+    """Cria (ou completa) a base em `caminho` com os dados sintéticos, pela carga rápida da importação."""
+    processos, tramitacoes = gerar_linhas(n_processos, n_tramitacoes, semente, hoje)
+    banco_atual = banco.iniciar(caminho)
+    try:
+        resultado = {}
+        for tipo, linhas in (('processos', processos), ('tramitacao', tramitacoes)):
+            mapa = {campo: i for i, (campo, *_) in enumerate(importacao.CAMPOS[tipo])}
+            resultado[tipo] = importacao.importar(banco_atual, linhas, mapa, tipo)
+        return resultado
+    finally:
+        banco_atual.fechar()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--processos", type=int, default=10000)
+    parser.add_argument("--tramitacoes", type=int, default=None, help="total de movimentações (padrão: conforme o status, ~4 por processo)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--banco", default=banco.CAMINHO_DB)
+    args = parser.parse_args()
+
+    if os.path.exists(args.banco): print(f"Aviso: {args.banco} já existe; os dados serão acrescentados (números repetidos são recusados)")
+    r = gerar(args.banco, args.processos, args.tramitacoes, args.semente)
+    for tipo, estat in r.items():
+        print(f"{tipo:11s} {estat['importadas']:8d} gravadas em {estat['segundos']:6.2f}s ({estat['recusadas']} recusadas)")
+
+if __name__ == "__main__":
+    main()
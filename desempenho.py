@@ -0,0 +1,190 @@
+import io
+import re
+import csv
+import json
+import math
+import time
+import sqlite3
+import functools
+from datetime import datetime
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+# ==================== MEDIÇÕES DE DESEMPENHO ====================
+# Buffer circular em memória, comum a todas as sessões do processo: consultas ao banco (tempo do execute mais a
+# leitura das linhas), tempo de cada aba por rerun, extração de PDF e chamadas ao modelo. Consultas acima do
+# limite também entram no log de consultas lentas, que tem buffer próprio para não ser empurrado pelo volume.
+
+CAPACIDADE = 20000
+CAPACIDADE_LENTAS = 500
+LIMITE_LENTA_MS = 100.0
+
+Medicao = namedtuple('Medicao', 'momento tipo nome ms quantidade detalhe')
+
+_medicoes = deque(maxlen=CAPACIDADE)
+_lentas = deque(maxlen=CAPACIDADE_LENTAS)
+_config = {'ativo': True, 'limite_ms': LIMITE_LENTA_MS}
+RE_ESPACOS = re.compile(r'\s+')
+
+def registrar(tipo, nome, ms, quantidade=None, detalhe=None):
+    if not _config['ativo']: return
+    m = Medicao(time.time(), tipo, nome, ms, quantidade, detalhe)
+    # deque.append é atômico: as threads das sessões registram sem trava
+    _medicoes.append(m)
+    if tipo == 'consulta' and ms >= _config['limite_ms']: _lentas.append(m)
+
+@contextmanager
+def medir(tipo, nome, **detalhe):
+    """Mede o bloco. O dicionário devolvido aceita 'quantidade' (linhas, caracteres...) e detalhes extras."""
+    info = dict(detalhe)
+    inicio = time.perf_counter()
+    try:
+        yield info
+    finally:
+        quantidade = info.pop('quantidade', None)
+        registrar(tipo, nome, (time.perf_counter() - inicio) * 1000, quantidade, info or None)
+
+def cronometrar(tipo, nome=None):
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            with medir(tipo, nome or funcao.__name__):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorador
+
+def configurar(ativo=None, limite_ms=None):
+    if ativo is not None: _config['ativo'] = bool(ativo)
+    if limite_ms is not None: _config['limite_ms'] = float(limite_ms)
+    return dict(_config)
+
+def limpar():
+    _medicoes.clear(); _lentas.clear()
+
+# === CONEXÃO INSTRUMENTADA ===
+def texto_sql(sql):
+    # Sem quebras de linha e sem os parâmetros: a mesma consulta agrupa numa linha só do resumo
+    return RE_ESPACOS.sub(' ', sql).strip()[:300]
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que registra cada consulta quando as linhas terminam de ser lidas."""
+    _sql = None
+
+    def _fechar(self, linhas=None):
+        if self._sql is None: return
+        registrar('consulta', texto_sql(self._sql), self._ms, self._linhas if linhas is None else linhas)
+        self._sql = None
+
+    def _ler(self, funcao, *args):
+        inicio = time.perf_counter()
+        try: return funcao(*args)
+        finally:
+            if self._sql is not None: self._ms += (time.perf_counter() - inicio) * 1000
+
+    def execute(self, sql, params=()):
+        self._fechar()
+        inicio = time.perf_counter()
+        super().execute(sql, params)
+        self._sql, self._ms, self._linhas = sql, (time.perf_counter() - inicio) * 1000, 0
+        if self.description is None: self._fechar(self.rowcount if self.rowcount >= 0 else None)  # escrita/DDL: não há linhas para ler
+        return self
+
+    def executemany(self, sql, params):
+        self._fechar()
+        inicio = time.perf_counter()
+        super().executemany(sql, params)
+        registrar('consulta', texto_sql(sql), (time.perf_counter() - inicio) * 1000, self.rowcount if self.rowcount >= 0 else None)
+        return self
+
+    def fetchall(self):
+        linhas = self._ler(super().fetchall)
+        if self._sql is not None: self._linhas += len(linhas)
+        self._fechar()
+        return linhas
+
+    def fetchone(self):
+        # Quase sempre a única leitura da consulta (COUNT, busca por id): registra já
+        linha = self._ler(super().fetchone)
+        if self._sql is not None and linha is not None: self._linhas += 1
+        self._fechar()
+        return linha
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        linhas = self._ler(super().fetchmany, size)
+        if self._sql is not None: self._linhas += len(linhas)
+        if len(linhas) < size: self._fechar()
+        return linhas
+
+    def __next__(self):
+        try: linha = self._ler(super().__next__)
+        except StopIteration:
+            self._fechar(); raise
+        if self._sql is not None: self._linhas += 1
+        return linha
+
+    def close(self):
+        self._fechar()
+        super().close()
+
+class ConexaoMedida(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive os do pandas.read_sql_query) são CursorMedido."""
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, params):
+        return self.cursor().executemany(sql, params)
+
+# === CONSULTA DAS MEDIÇÕES ===
+def medicoes(tipo=None):
+    return [m for m in tuple(_medicoes) if tipo is None or m.tipo == tipo]
+
+def lentas(limite_ms=None):
+    """Consultas acima do limite, das mais antigas às mais recentes. Baixar o limite também alcança o que ainda está no buffer geral."""
+    limite = _config['limite_ms'] if limite_ms is None else limite_ms
+    todas = tuple(_lentas) + tuple(m for m in tuple(_medicoes) if m.tipo == 'consulta')
+    return sorted({m for m in todas if m.ms >= limite}, key=lambda m: m.momento)
+
+def tipos():
+    return sorted({m.tipo for m in tuple(_medicoes)})
+
+def _percentil(ordenados, p):
+    # Posto mais próximo: sempre um valor que de fato ocorreu
+    return ordenados[min(len(ordenados) - 1, max(0, math.ceil(p / 100 * len(ordenados)) - 1))]
+
+def resumo(tipo=None, percentis=(50, 90, 99)):
+    """Estatísticas por (tipo, nome): n, percentis e máximo (ms), tempo total e quantidade média; maiores totais primeiro."""
+    grupos = {}
+    for m in medicoes(tipo):
+        grupos.setdefault((m.tipo, m.nome), []).append(m)
+    linhas = []
+    for (t, nome), lista in grupos.items():
+        tempos = sorted(m.ms for m in lista)
+        quantidades = [m.quantidade for m in lista if m.quantidade is not None]
+        linha = {'tipo': t, 'nome': nome, 'n': len(tempos)}
+        linha.update({f"p{p}": _percentil(tempos, p) for p in percentis})
+        linha.update({'max': tempos[-1], 'total': sum(tempos),
+                      'quantidade_media': sum(quantidades) / len(quantidades) if quantidades else None})
+        linhas.append(linha)
+    return sorted(linhas, key=lambda l: l['total'], reverse=True)
+
+# === EXPORTAÇÃO ===
+def _linha_exportacao(m):
+    return {'momento': datetime.fromtimestamp(m.momento).isoformat(timespec='milliseconds'), 'tipo': m.tipo, 'nome': m.nome,
+            'ms': round(m.ms, 3), 'quantidade': m.quantidade, 'detalhe': m.detalhe}
+
+def exportar_csv(lista=None):
+    saida = io.StringIO()
+    escritor = csv.DictWriter(saida, fieldnames=Medicao._fields, delimiter=';')
+    escritor.writeheader()
+    for m in medicoes() if lista is None else lista:
+        linha = _linha_exportacao(m)
+        linha['detalhe'] = json.dumps(m.detalhe, ensure_ascii=False) if m.detalhe else ""
+        escritor.writerow(linha)
+    return saida.getvalue()
+
+def exportar_json(lista=None):
+    return json.dumps([_linha_exportacao(m) for m in (medicoes() if lista is None else lista)], ensure_ascii=False, indent=1)
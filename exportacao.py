@@ -0,0 +1,101 @@
+import csv
+import io
+import importlib.util
+from datetime import date
+
+# ==================== EXPORTAÇÃO DE PLANILHAS ====================
+# As exportações só são geradas quando pedidas, lendo o banco em blocos (fetchmany) e escrevendo direto no
+# arquivo de saída: a memória usada fica limitada ao tamanho do bloco, não ao tamanho do arquivo.
+
+TAMANHO_BLOCO = 5000
+
+# (coluna, expressão SQL, tipo Parquet); datas saem em DD/MM/AAAA no CSV e como data no Parquet
+COLUNAS = {
+    'processos': [
+        ('id', 'p.id', 'int'), ('numero', 'p.numero', 'str'), ('rt', 'p.rt', 'str'), ('requerente', 'p.requerente', 'str'),
+        ('analista', 'p.analista', 'str'), ('uso', 'p.uso', 'str'), ('tipologia', 'p.tipologia', 'str'), ('area', 'p.area', 'float'),
+        ('data_protocolo', 'p.data_protocolo', 'data'), ('status', 'p.status', 'str'), ('data_cadastro', 'p.data_cadastro', 'str'),
+    ],
+    'historico': [
+        ('numero', 'p.numero', 'str'), ('id', 't.id', 'int'), ('processo_id', 't.processo_id', 'int'), ('setor', 't.setor', 'str'),
+        ('data_entrada', 't.data_entrada', 'data'), ('data_saida', 't.data_saida', 'data'), ('observacao', 't.observacao', 'str'),
+    ],
+}
+ORIGEM = {
+    'processos': ("FROM processos p", "p.data_protocolo", "p.id"),
+    'historico': ("FROM tramitacao t JOIN processos p ON t.processo_id = p.id", "t.data_entrada", "t.id"),
+}
+
+def formatos_disponiveis():
+    # O pyarrow só é importado ao gerar um Parquet; aqui basta saber se está instalado
+    return ["CSV", "Parquet"] if importlib.util.find_spec("pyarrow") else ["CSV"]
+
+def montar_consulta(tipo, inicio=None, fim=None, status=None, formato="CSV"):
+    """SELECT da exportação com os filtros de período (data de protocolo / entrada) e de status do processo."""
+    origem, coluna_data, ordem = ORIGEM[tipo]
+    campos = []
+    for nome, expr, tipo_col in COLUNAS[tipo]:
+        if tipo_col == 'data' and formato == "CSV": expr = f"strftime('%d/%m/%Y', {expr})"
+        campos.append(f"{expr} AS {nome}")
+    condicoes, params = [], []
+    if inicio: condicoes.append(f"{coluna_data} >= ?"); params.append(str(inicio))
+    if fim: condicoes.append(f"{coluna_data} <= ?"); params.append(str(fim))
+    if status:
+        condicoes.append(f"p.status IN ({','.join('?' * len(status))})"); params.extend(status)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    return f"SELECT {', '.join(campos)} {origem} {where} ORDER BY {ordem}", params
+
+def _blocos(conn, query, params, tamanho):
+    cur = conn.execute(query, params)
+    while True:
+        linhas = cur.fetchmany(tamanho)
+        if not linhas: break
+        yield linhas
+
+def exportar_csv(conn, destino, tipo, inicio=None, fim=None, status=None, tamanho=TAMANHO_BLOCO):
+    """Escreve o CSV (separador ';', UTF-8 com BOM para o Excel) em `destino` (arquivo binário). Retorna o nº de linhas."""
+    query, params = montar_consulta(tipo, inicio, fim, status, "CSV")
+    texto = io.TextIOWrapper(destino, encoding='utf-8-sig', newline='')
+    escritor = csv.writer(texto, delimiter=';')
+    escritor.writerow([c[0] for c in COLUNAS[tipo]])
+    total = 0
+    for linhas in _blocos(conn, query, params, tamanho):
+        escritor.writerows(linhas)
+        total += len(linhas)
+    texto.flush()
+    texto.detach()
+    return total
+
+def _esquema(pa, tipo):
+    tipos = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string(), 'data': pa.date32()}
+    return pa.schema([(nome, tipos[t]) for nome, _, t in COLUNAS[tipo]])
+
+def _data(valor):
+    # Datas inválidas ou vazias viram nulo em vez de derrubar a exportação inteira
+    try: return date.fromisoformat(valor[:10])
+    except (TypeError, ValueError): return None
+
+def _numero(valor):
+    try: return float(valor) if valor is not None else None
+    except (TypeError, ValueError): return None
+
+def exportar_parquet(conn, destino, tipo, inicio=None, fim=None, status=None, tamanho=TAMANHO_BLOCO * 10):
+    """Escreve o Parquet em `destino`, um row group por bloco lido do banco. Retorna o nº de linhas."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("pyarrow não está instalado")
+    query, params = montar_consulta(tipo, inicio, fim, status, "Parquet")
+    esquema = _esquema(pa, tipo)
+    conversores = [{'data': _data, 'float': _numero}.get(t) for _, _, t in COLUNAS[tipo]]
+    total = 0
+    with pq.ParquetWriter(destino, esquema, compression='zstd') as escritor:
+        for linhas in _blocos(conn, query, params, tamanho):
+            colunas = list(zip(*linhas))
+            arrays = [pa.array([conv(v) for v in col] if conv else col, type=campo.type)
+                      for col, conv, campo in zip(colunas, conversores, esquema)]
+            escritor.write_table(pa.Table.from_arrays(arrays, schema=esquema))
+            total += len(linhas)
+        if not total: escritor.write_table(esquema.empty_table())
+    return total
@@ -0,0 +1,135 @@
+import os
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import desempenho
+
+# ==================== EXTRAÇÃO DE TEXTO DE PDFs ====================
+# As páginas são extraídas em paralelo num pool de processos (o PyPDF2 é CPU puro e segura o GIL)
+# e o texto fica em cache no SQLite pelo hash do conteúdo do arquivo.
+
+PAGINAS_POR_TAREFA = 8
+MAX_PROCESSOS = max(1, min(4, os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def hash_conteudo(dados):
+    return hashlib.sha256(dados).hexdigest()
+
+def obter_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" evita herdar as threads do servidor do Streamlit no fork
+            _pool = ProcessPoolExecutor(max_workers=MAX_PROCESSOS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _extrair_intervalo(caminho, inicio, fim):
+    import PyPDF2
+    paginas = PyPDF2.PdfReader(caminho).pages
+    return "".join(paginas[i].extract_text() or "" for i in range(inicio, fim))
+
+# === CACHE NO BANCO ===
+def criar_tabela_cache(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS textos_pdf (
+        hash TEXT PRIMARY KEY,
+        texto TEXT, completo INTEGER DEFAULT 0, paginas INTEGER,
+        data_extracao TEXT DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+def ler_cache(conn, h):
+    try:
+        return conn.execute("SELECT texto, completo FROM textos_pdf WHERE hash=?", (h,)).fetchone()
+    except Exception:
+        return None
+
+def salvar_cache(conn, h, texto, completo, paginas):
+    import banco  # importado aqui: o banco importa este módulo
+
+    def salvar(c):
+        c.execute(
+            "INSERT INTO textos_pdf (hash, texto, completo, paginas) VALUES (?,?,?,?) "
+            "ON CONFLICT(hash) DO UPDATE SET texto=excluded.texto, completo=excluded.completo, paginas=excluded.paginas, "
+            "data_extracao=CURRENT_TIMESTAMP WHERE excluded.completo > textos_pdf.completo OR length(excluded.texto) > length(textos_pdf.texto)",
+            (h, texto, int(completo), paginas)
+        )
+    # Ninguém espera pelo cache: no banco ativo a gravação só é enfileirada no escritor
+    try:
+        banco.gravar(conn, salvar, esperar=False)
+    except Exception:
+        pass
+
+# === EXTRAÇÃO ===
+def extrair_textos(conn, arquivos, limite=30000, paralelo=True):
+    """Concatena o texto dos PDFs (lista de bytes) na ordem recebida, parando ao atingir `limite` caracteres (None = tudo)."""
+    with desempenho.medir('pdf', 'extrair_textos', arquivos=len(arquivos), paralelo=paralelo) as m:
+        texto = _extrair_textos(conn, arquivos, limite, paralelo)
+        m['quantidade'] = len(texto)
+    return texto
+
+def _extrair_textos(conn, arquivos, limite, paralelo):
+    import PyPDF2  # carregado só quando há PDF para extrair, não na partida da aplicação
+    orcamento = float('inf') if limite is None else limite
+    fontes, tarefas, temporarios = [], [], []
+    try:
+        for dados in arquivos:
+            h = hash_conteudo(dados)
+            cache = ler_cache(conn, h) if conn else None
+            if cache and (cache[1] or len(cache[0]) >= orcamento):
+                fontes.append({'hash': h, 'texto': [cache[0]], 'blocos': 0})
+                continue
+            # Arquivo novo: cópia temporária única para os processos lerem sem receber os bytes a cada tarefa
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+                tmp.write(dados)
+            temporarios.append(tmp.name)
+            n_paginas = len(PyPDF2.PdfReader(tmp.name).pages)
+            blocos = [(tmp.name, i, min(i + PAGINAS_POR_TAREFA, n_paginas)) for i in range(0, n_paginas, PAGINAS_POR_TAREFA)]
+            fontes.append({'hash': h, 'texto': [], 'blocos': len(blocos), 'paginas': n_paginas})
+            tarefas.extend((len(fontes) - 1, b) for b in blocos)
+
+        _executar_tarefas(fontes, tarefas, orcamento, paralelo)
+    finally:
+        for caminho in temporarios:
+            try: os.remove(caminho)
+            except OSError: pass
+
+    partes = []
+    for fonte in fontes:
+        texto = "".join(fonte['texto'])
+        if fonte['blocos'] and fonte['texto'] and conn:
+            salvar_cache(conn, fonte['hash'], texto, len(fonte['texto']) == fonte['blocos'], fonte['paginas'])
+        partes.append(texto)
+    texto = "".join(partes)
+    return texto if limite is None else texto[:limite]
+
+def _executar_tarefas(fontes, tarefas, limite, paralelo):
+    # Consome os blocos de páginas em ordem (entre arquivos também) com uma janela limitada de tarefas em voo,
+    # parando e cancelando o restante assim que o orçamento de caracteres é atingido
+    pool = None
+    if paralelo and len(tarefas) > 1:
+        try: pool = obter_pool()
+        except Exception: pool = None
+
+    janela = MAX_PROCESSOS * 2
+    futuros = [pool.submit(_extrair_intervalo, *b) for _, b in tarefas[:janela]] if pool else []
+    total, ultimo_idx = 0, -1
+    try:
+        for i, (idx, bloco) in enumerate(tarefas):
+            # Soma o texto em cache dos arquivos que ficaram entre o último bloco e este
+            total += sum(len(t) for f in fontes[ultimo_idx + 1:idx] for t in f['texto'])
+            ultimo_idx = idx
+            if total >= limite: break
+            if pool:
+                texto = futuros[i].result()
+                if i + janela < len(tarefas):
+                    futuros.append(pool.submit(_extrair_intervalo, *tarefas[i + janela][1]))
+            else:
+                texto = _extrair_intervalo(*bloco)
+            fontes[idx]['texto'].append(texto)
+            total += len(texto)
+            if total >= limite: break
+    finally:
+        for f in futuros: f.cancel()
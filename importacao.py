@@ -0,0 +1,305 @@
+"""Importação em lote de processos e tramitações a partir de CSV ou XLSX."""
+import io
+import os
+import csv
+import sys
+import time
+import argparse
+import unicodedata
+import importlib.util
+from datetime import date, datetime
+from migracoes import TABELAS_DOMINIO, id_por_nome, nome_exibicao
+import banco
+
+# ==================== IMPORTAÇÃO EM LOTE ====================
+# Arquivo lido em fluxo, validado e gravado em lotes (um executemany por transação nas tabelas base);
+# as linhas recusadas vão para um CSV com o motivo
+TAMANHO_LOTE = 5000
+
+# (campo, tipo, obrigatório, nomes de coluna reconhecidos sem acento/maiúsculas)
+CAMPOS = {
+    'processos': [
+        ('numero', 'texto', True, ('numero', 'processo', 'numero_processo', 'n_processo', 'no_processo', 'num')),
+        ('rt', 'texto', False, ('rt', 'responsavel_tecnico')),
+        ('requerente', 'texto', False, ('requerente', 'interessado')),
+        ('analista', 'dominio', False, ('analista',)),
+        ('uso', 'dominio', False, ('uso',)),
+        ('tipologia', 'dominio', False, ('tipologia', 'tipo')),
+        ('area', 'numero', False, ('area', 'area_m2', 'area_m')),
+        ('data_protocolo', 'data', False, ('data_protocolo', 'protocolo', 'data')),
+        ('status', 'dominio', False, ('status', 'situacao')),
+    ],
+    'tramitacao': [
+        ('numero', 'texto', True, ('numero', 'processo', 'numero_processo', 'n_processo', 'no_processo', 'num')),
+        ('setor', 'dominio', True, ('setor', 'setor_destino')),
+        ('data_entrada', 'data', True, ('data_entrada', 'entrada')),
+        ('data_saida', 'data', False, ('data_saida', 'saida')),
+        ('observacao', 'texto', False, ('observacao', 'observacoes', 'obs')),
+    ],
+}
+STATUS_PADRAO = 'Protocolado'
+# Valor dos campos opcionais ausentes ou vazios que o app trata como número (o formulário de edição mostra a área)
+PADROES = {'area': 0.0}
+FORMATOS_DATA = ('%d/%m/%Y', '%Y-%m-%d', '%d/%m/%y', '%d-%m-%Y', '%Y/%m/%d')
+
+def formatos_disponiveis():
+    # O openpyxl só é importado ao ler uma planilha; aqui basta saber se está instalado
+    return ["csv", "xlsx"] if importlib.util.find_spec("openpyxl") else ["csv"]
+
+# ==================== LEITURA EM FLUXO ====================
+def _ler_csv(arquivo, encoding):
+    texto = io.TextIOWrapper(arquivo, encoding=encoding, newline='')
+    amostra = texto.readline()
+    texto.seek(0)
+    # Separador mais frequente no cabeçalho (planilhas brasileiras costumam sair com ';')
+    separador = max(";,\t", key=amostra.count)
+    return csv.reader(texto, delimiter=separador)
+
+def _ler_xlsx(arquivo):
+    try:
+        import openpyxl
+    except ImportError:
+        raise RuntimeError("openpyxl não está instalado")
+    # Somente leitura: as linhas são geradas sob demanda, sem carregar a planilha inteira
+    planilha = openpyxl.load_workbook(arquivo, read_only=True, data_only=True).active
+    return planilha.iter_rows(values_only=True)
+
+def ler_tabela(arquivo, nome, encoding='utf-8-sig'):
+    """Abre CSV ou XLSX (pelo nome do arquivo) como (cabeçalho, iterador de linhas)."""
+    linhas = _ler_xlsx(arquivo) if nome.lower().endswith(('.xlsx', '.xlsm')) else _ler_csv(arquivo, encoding)
+    cabecalho = next(linhas, None)
+    if not cabecalho: raise ValueError("Arquivo vazio ou sem cabeçalho.")
+    return [str(c).strip() if c is not None else "" for c in cabecalho], linhas
+
+# ==================== MAPEAMENTO DE COLUNAS ====================
+def _normalizar(nome):
+    sem_acento = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode()
+    return "_".join("".join(ch if ch.isalnum() else " " for ch in sem_acento.lower()).split())
+
+def mapear_colunas(cabecalho, tipo):
+    """Sugere {campo: índice da coluna} pelos nomes do cabeçalho; campos sem coluna ficam de fora."""
+    colunas = {_normalizar(c): i for i, c in reversed(list(enumerate(cabecalho)))}
+    mapa = {}
+    for campo, _, _, apelidos in CAMPOS[tipo]:
+        i = next((colunas[a] for a in apelidos if a in colunas and colunas[a] not in mapa.values()), None)
+        if i is not None: mapa[campo] = i
+    return mapa
+
+# ==================== CONVERSÃO E VALIDAÇÃO ====================
+def _texto(valor):
+    if isinstance(valor, float) and valor.is_integer(): valor = int(valor)  # "123" lido como 123.0 da planilha
+    return str(valor).strip() if valor is not None else ""
+
+def _data(valor):
+    if isinstance(valor, datetime): return valor.date().isoformat()
+    if isinstance(valor, date): return valor.isoformat()
+    texto = _texto(valor)
+    if not texto: return None
+    for formato in FORMATOS_DATA:
+        try: return datetime.strptime(texto[:10], formato).date().isoformat()
+        except ValueError: pass
+    raise ValueError(f"data inválida: {texto}")
+
+def _numero(valor):
+    if isinstance(valor, (int, float)): return float(valor)
+    texto = _texto(valor).replace(" ", "")
+    if not texto: return None
+    # Formato brasileiro (1.234,56) ou com ponto decimal (1234.56)
+    if "," in texto: texto = texto.replace(".", "").replace(",", ".")
+    try: return float(texto)
+    except ValueError: raise ValueError(f"número inválido: {texto}")
+
+CONVERSORES = {'texto': lambda v: _texto(v) or None, 'dominio': lambda v: _texto(v) or None, 'data': _data, 'numero': _numero}
+
+def converter_linha(linha, mapa, tipo):
+    """Dicionário {campo: valor} convertido da linha. Levanta ValueError com o motivo da recusa."""
+    registro = {}
+    for campo, tipo_campo, obrigatorio, _ in CAMPOS[tipo]:
+        i = mapa.get(campo)
+        valor = CONVERSORES[tipo_campo](linha[i] if i is not None and i < len(linha) else None)
+        if valor is None: valor = PADROES.get(campo)
+        if obrigatorio and valor is None: raise ValueError(f"campo obrigatório vazio: {campo}")
+        registro[campo] = valor
+    if tipo == 'tramitacao' and registro['data_saida'] and registro['data_saida'] < registro['data_entrada']:
+        raise ValueError("data de saída anterior à entrada")
+    return registro
+
+# ==================== GRAVAÇÃO ====================
+def _ids_dominio(c, dim, nomes, cache):
+    # Nomes novos entram na tabela de domínio (como em banco.salvar_processo: variações de caixa resolvem para o
+    # já cadastrado); os ids ficam em cache entre lotes
+    tabela = TABELAS_DOMINIO[dim]
+    novos = {n for n in nomes if n and n not in cache}
+    if novos:
+        c.executemany(f"INSERT OR IGNORE INTO {tabela} (nome) VALUES (?)", [(nome_exibicao(n),) for n in novos])
+        for n in novos: cache[n] = c.execute(f"SELECT {id_por_nome(dim)}", (n,)).fetchone()[0]
+    return cache
+
+def _existentes(c, numeros):
+    marcadores = ",".join("?" * len(numeros))
+    return dict(c.execute(f"SELECT numero, id FROM processos_base WHERE numero IN ({marcadores})", numeros).fetchall())
+
+def _gravar_processos(c, lote, caches):
+    # Recusa os números já cadastrados; a checagem e a gravação ficam na mesma transação
+    ja_cadastrados = _existentes(c, [r['numero'] for _, r in lote])
+    aceitos = [(n, r) for n, r in lote if r['numero'] not in ja_cadastrados]
+    for dim in ('analista', 'uso', 'tipologia', 'status'):
+        _ids_dominio(c, dim, {r[dim] or (STATUS_PADRAO if dim == 'status' else None) for _, r in aceitos}, caches[dim])
+    c.executemany("""INSERT INTO processos_base (numero, rt, requerente, analista_id, uso_id, tipologia_id, area, data_protocolo, status_id)
+        VALUES (?,?,?,?,?,?,?,?,?)""", [
+        (r['numero'], r['rt'], r['requerente'], caches['analista'].get(r['analista']), caches['uso'].get(r['uso']),
+         caches['tipologia'].get(r['tipologia']), r['area'], r['data_protocolo'], caches['status'][r['status'] or STATUS_PADRAO])
+        for _, r in aceitos])
+    return len(aceitos), [(n, "número já cadastrado") for n, r in lote if r['numero'] in ja_cadastrados]
+
+def _gravar_tramitacao(c, lote, caches):
+    processos = _existentes(c, list({r['numero'] for _, r in lote}))
+    aceitos = [(n, r) for n, r in lote if r['numero'] in processos]
+    _ids_dominio(c, 'setor', {r['setor'] for _, r in aceitos}, caches['setor'])
+    c.executemany("INSERT INTO tramitacao_base (processo_id, setor_id, data_entrada, data_saida, observacao) VALUES (?,?,?,?,?)", [
+        (processos[r['numero']], caches['setor'][r['setor']], r['data_entrada'], r['data_saida'], r['observacao'])
+        for _, r in aceitos])
+    return len(aceitos), [(n, "processo não encontrado") for n, r in lote if r['numero'] not in processos]
+
+def importar(banco_atual, linhas, mapa, tipo, rejeitos=None, tamanho=TAMANHO_LOTE, progresso=None, carga_rapida=True):
+    """Valida e grava as linhas (iterador, sem o cabeçalho) em lotes de `tamanho`, cada lote numa transação do escritor.
+    `rejeitos` recebe (nº da linha no arquivo, motivo, linha original). Retorna estatísticas da importação.
+
+    Com `carga_rapida`, um arquivo com mais de um lote é gravado sem os triggers das estruturas derivadas, que são
+    recalculadas no fim (enquanto isso, Dashboard e busca não mostram os dados novos). As gravações do app durante a
+    carga continuam valendo: entram no recálculo, as transições de status seguem contadas e a versão dos dados segue
+    invalidando o cache das leituras."""
+    inicio = time.perf_counter()
+    gravar = _gravar_processos if tipo == 'processos' else _gravar_tramitacao
+    caches = {dim: {} for dim in TABELAS_DOMINIO}
+    vistos, originais, lote = set(), {}, []
+    lidas = importadas = recusadas = 0
+    suspenso = False
+
+    def recusar(n, motivo):
+        nonlocal recusadas
+        recusadas += 1
+        if rejeitos: rejeitos(n, motivo, originais.get(n, ()))
+
+    def descarregar():
+        nonlocal importadas, suspenso
+        if not lote: return
+        if carga_rapida and not suspenso and len(lote) >= tamanho:
+            banco_atual.transacao(banco.suspender_derivados); suspenso = True
+        # Os dicionários de cache são alterados na thread do escritor; uma cópia por lote evita ids de um lote desfeito
+        novos_caches = {dim: dict(v) for dim, v in caches.items()}
+        gravadas, recusas = banco_atual.transacao(lambda c: gravar(c, lote, novos_caches), timeout=300)
+        caches.update(novos_caches)
+        importadas += gravadas
+        for n, motivo in recusas: recusar(n, motivo)
+        lote.clear(); originais.clear()
+        if progresso: progresso(lidas, importadas, recusadas)
+
+    try:
+        for n, linha in enumerate(linhas, start=2):
+            if not any(v not in (None, "") for v in linha): continue
+            lidas += 1
+            originais[n] = linha
+            try:
+                registro = converter_linha(linha, mapa, tipo)
+                if tipo == 'processos':
+                    if registro['numero'] in vistos: raise ValueError("número repetido no arquivo")
+                    vistos.add(registro['numero'])
+                lote.append((n, registro))
+            except ValueError as e:
+                recusar(n, str(e))
+                del originais[n]
+            if len(lote) >= tamanho: descarregar()
+        descarregar()
+    finally:
+        if suspenso: banco_atual.transacao(banco.retomar_derivados, timeout=600)
+    return {'lidas': lidas, 'importadas': importadas, 'recusadas': recusadas, 'segundos': time.perf_counter() - inicio}
+
+def escritor_rejeitos(destino, cabecalho):
+    """Relatório de recusas em CSV (';', UTF-8 com BOM) escrito em `destino` (arquivo binário) à medida que surgem."""
+    texto = io.TextIOWrapper(destino, encoding='utf-8-sig', newline='')
+    escritor = csv.writer(texto, delimiter=';')
+    escritor.writerow(["linha", "motivo", *cabecalho])
+    def registrar(n, motivo, linha):
+        escritor.writerow([n, motivo, *("" if v is None else v for v in linha)])
+    return registrar, texto
+
+# ==================== LINHA DE COMANDO ====================
+def _gerar_csv_sintetico(caminho, n, semente=1):
+    import random
+    rnd = random.Random(semente)
+    setores = ["Análise prévia", "Pré-análise", "Analista", "Parecer externo", "Fiscalização"]
+    with open(caminho, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["Número", "RT", "Requerente", "Analista", "Uso", "Tipologia", "Área", "Data Protocolo", "Status"])
+        for i in range(n):
+            # ~1% de linhas ruins (número repetido ou data inválida) para exercitar o relatório de recusas
+            numero = f"IMP-{rnd.randint(0, i)}" if rnd.random() < 0.005 else f"IMP-{i}"
+            data = "31/02/2024" if rnd.random() < 0.005 else f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2024"
+            w.writerow([numero, f"RT {i % 300}", f"Requerente {i}", f"Analista {i % 15}", "Multifamiliar", "Regularização",
+                        f"{rnd.uniform(50, 2000):.2f}".replace(".", ","), data, rnd.choice(["Protocolado", "em análise", "Aprovado"])])
+    with open(caminho.replace(".csv", "_tram.csv"), "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["Processo", "Setor", "Entrada", "Saída", "Observação"])
+        for i in range(n * 2):
+            w.writerow([f"IMP-{rnd.randint(0, n)}", rnd.choice(setores), "2024-03-01", rnd.choice(["", "2024-03-15"]), rnd.choice(["", "vistoria agendada", "pendência de documentação"])])
+
+def _benchmark(n, tamanho):
+    import tempfile
+    pasta = tempfile.mkdtemp(prefix="importacao_")
+    arquivo = os.path.join(pasta, "processos.csv")
+    _gerar_csv_sintetico(arquivo, n)
+    for carga_rapida in (False, True):
+        print("Carga rápida (triggers suspensos e estruturas recalculadas no fim)" if carga_rapida else "Com triggers linha a linha")
+        banco_atual = banco.iniciar(os.path.join(pasta, f"processos_{int(carga_rapida)}.db"))
+        try:
+            for tipo, caminho in (('processos', arquivo), ('tramitacao', arquivo.replace(".csv", "_tram.csv"))):
+                with open(caminho, "rb") as f:
+                    cabecalho, linhas = ler_tabela(f, caminho)
+                    r = importar(banco_atual, linhas, mapear_colunas(cabecalho, tipo), tipo, tamanho=tamanho, carga_rapida=carga_rapida)
+                print(f"  {tipo:11s} {r['lidas']:8d} linhas em {r['segundos']:6.2f}s = {r['lidas'] / r['segundos']:9,.0f} linhas/s "
+                      f"({r['importadas']} importadas, {r['recusadas']} recusadas)")
+        finally:
+            banco_atual.fechar()
+    print(f"Bases de teste em {pasta}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("arquivo", nargs="?", help="CSV ou XLSX")
+    parser.add_argument("--tipo", choices=list(CAMPOS), default="processos")
+    parser.add_argument("--banco", default=None, help="caminho do banco (padrão: processos.db)")
+    parser.add_argument("--mapa", action="append", default=[], metavar="CAMPO=COLUNA", help="coluna do arquivo para um campo")
+    parser.add_argument("--rejeitos", help="CSV com as linhas recusadas e o motivo")
+    parser.add_argument("--encoding", default="utf-8-sig")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE)
+    parser.add_argument("--benchmark", type=int, metavar="N", help="importa N processos e 2N movimentações sintéticos numa base temporária")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        _benchmark(args.benchmark, args.lote); return
+    if not args.arquivo: parser.error("informe o arquivo ou --benchmark")
+
+    with open(args.arquivo, "rb") as f:
+        cabecalho, linhas = ler_tabela(f, args.arquivo, args.encoding)
+        mapa = mapear_colunas(cabecalho, args.tipo)
+        for item in args.mapa:
+            campo, _, coluna = item.partition("=")
+            if coluna not in cabecalho: parser.error(f"coluna '{coluna}' não está no arquivo")
+            mapa[campo] = cabecalho.index(coluna)
+        faltando = [c for c, _, obrig, _ in CAMPOS[args.tipo] if obrig and c not in mapa]
+        if faltando: parser.error(f"sem coluna para: {', '.join(faltando)} (use --mapa)")
+        print("Colunas: " + ", ".join(f"{c} <- {cabecalho[i]}" for c, i in mapa.items()))
+
+        saida = open(args.rejeitos, "wb") if args.rejeitos else None
+        rejeitos, texto = escritor_rejeitos(saida, cabecalho) if saida else (None, None)
+        banco_atual = banco.iniciar(args.banco or banco.CAMINHO_DB)
+        try:
+            r = importar(banco_atual, linhas, mapa, args.tipo, rejeitos, args.lote,
+                         progresso=lambda lidas, ok, rec: print(f"  {lidas} lidas, {ok} importadas, {rec} recusadas", file=sys.stderr))
+        finally:
+            banco_atual.fechar()
+            if saida: texto.flush(); saida.close()
+    print(f"{r['importadas']} importadas, {r['recusadas']} recusadas de {r['lidas']} linhas em {r['segundos']:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import re
+from collections import Counter
+from extracao_pdf import extrair_textos, hash_conteudo
+
+# ==================== BIBLIOTECA DE LEGISLAÇÃO ====================
+# As leis ficam salvas no processos.db divididas em artigos/seções e indexadas em FTS5.
+# Na análise só os trechos mais relevantes (BM25) para o projeto entram no prompt.
+
+TAMANHO_MAX_TRECHO = 2500
+TOP_K_TRECHOS = 12
+
+RE_ARTIGO = re.compile(r'(?=(?:^|\n)\s*(?:Art\.?|Artigo)\s*\d+)', re.I)
+RE_SECAO = re.compile(r'(?=(?:^|\n)\s*(?:CAP[IÍ]TULO|SE[CÇ][AÃ]O|T[IÍ]TULO)\s+[IVXLC\d]+)', re.I)
+RE_PALAVRA = re.compile(r'\w{4,}', re.U)
+
+STOPWORDS = {
+    "para", "como", "pela", "pelo", "pelas", "pelos", "mais", "este", "esta", "esse", "essa", "isso", "deve",
+    "devem", "será", "serão", "sobre", "entre", "quando", "onde", "qual", "quais", "caso", "cada", "sendo",
+    "também", "desde", "até", "seus", "suas", "dele", "dela", "tendo", "conforme", "nesta", "neste", "ainda",
+    "projeto", "folha", "página", "prancha", "escala",
+}
+
+def criar_tabelas(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS leis (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        titulo TEXT NOT NULL, hash TEXT UNIQUE NOT NULL,
+        data_cadastro TEXT DEFAULT CURRENT_TIMESTAMP
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS trechos_lei (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        lei_id INTEGER NOT NULL, ordem INTEGER, rotulo TEXT, texto TEXT,
+        FOREIGN KEY (lei_id) REFERENCES leis(id)
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_trechos_lei ON trechos_lei(lei_id)")
+    # Índice invertido externo ao conteúdo (sem duplicar o texto), sem acentos para casar "edificação" com "edificacao"
+    c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS trechos_lei_fts USING fts5(
+        rotulo, texto, content='trechos_lei', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_trechos_lei_ins AFTER INSERT ON trechos_lei BEGIN
+        INSERT INTO trechos_lei_fts(rowid, rotulo, texto) VALUES (NEW.id, NEW.rotulo, NEW.texto);
+    END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_trechos_lei_del AFTER DELETE ON trechos_lei BEGIN
+        INSERT INTO trechos_lei_fts(trechos_lei_fts, rowid, rotulo, texto) VALUES ('delete', OLD.id, OLD.rotulo, OLD.texto);
+    END''')
+
+# === DIVISÃO EM TRECHOS ===
+def dividir_trechos(texto):
+    """Divide o texto da lei em (rótulo, trecho) por artigo; sem artigos reconhecíveis, por seções ou blocos."""
+    partes = RE_ARTIGO.split(texto)
+    if len(partes) < 3: partes = RE_SECAO.split(texto)
+    trechos = []
+    for parte in partes:
+        parte = parte.strip()
+        if not parte: continue
+        rotulo = parte.split("\n", 1)[0][:60].strip()
+        # Artigos muito longos são quebrados em blocos, preferindo quebrar em fim de linha
+        while len(parte) > TAMANHO_MAX_TRECHO:
+            corte = parte.rfind("\n", 0, TAMANHO_MAX_TRECHO)
+            if corte < TAMANHO_MAX_TRECHO // 2: corte = TAMANHO_MAX_TRECHO
+            trechos.append((rotulo, parte[:corte].strip()))
+            parte = parte[corte:].strip()
+        if parte: trechos.append((rotulo, parte))
+    return trechos
+
+# === CADASTRO ===
+def adicionar_lei(conn, titulo, dados_pdf):
+    """Extrai, divide e indexa a lei. Retorna (id, nova); um PDF já cadastrado (mesmo conteúdo) não é reprocessado."""
+    import banco  # importado aqui: o banco importa este módulo
+    h = hash_conteudo(dados_pdf)
+    existente = conn.execute("SELECT id FROM leis WHERE hash=?", (h,)).fetchone()
+    if existente: return existente[0], False
+    texto = extrair_textos(conn, [dados_pdf], limite=None)
+    trechos = dividir_trechos(texto)
+
+    def inserir(c):
+        # Outra sessão pode ter cadastrado o mesmo PDF durante a extração
+        existente = c.execute("SELECT id FROM leis WHERE hash=?", (h,)).fetchone()
+        if existente: return existente[0], False
+        lei_id = c.execute("INSERT INTO leis (titulo, hash) VALUES (?,?)", (titulo, h)).lastrowid
+        c.executemany("INSERT INTO trechos_lei (lei_id, ordem, rotulo, texto) VALUES (?,?,?,?)",
+                      [(lei_id, i, rotulo, t) for i, (rotulo, t) in enumerate(trechos)])
+        return lei_id, True
+    return banco.gravar(conn, inserir)
+
+def listar_leis(conn):
+    return conn.execute('''SELECT l.id, l.titulo, COUNT(t.id), l.data_cadastro
+        FROM leis l LEFT JOIN trechos_lei t ON t.lei_id = l.id GROUP BY l.id ORDER BY l.titulo''').fetchall()
+
+def hashes_leis(conn, lei_ids):
+    if not lei_ids: return []
+    return [r[0] for r in conn.execute(f"SELECT hash FROM leis WHERE id IN ({','.join('?' * len(lei_ids))}) ORDER BY hash", tuple(lei_ids))]
+
+def remover_lei(conn, lei_id):
+    import banco
+
+    def remover(c):
+        c.execute("DELETE FROM trechos_lei WHERE lei_id=?", (lei_id,))
+        c.execute("DELETE FROM leis WHERE id=?", (lei_id,))
+    banco.gravar(conn, remover)
+
+# === RECUPERAÇÃO ===
+def termos_consulta(texto, extras=(), max_termos=30):
+    # Termos mais frequentes do projeto (sem stopwords) somados aos dados do processo
+    contagem = Counter(p.lower() for p in RE_PALAVRA.findall(texto or "") if not p.isdigit())
+    for s in STOPWORDS: contagem.pop(s, None)
+    termos = [e.lower() for extra in extras if extra for e in RE_PALAVRA.findall(str(extra)) if not e.isdigit()]
+    termos += [p for p, _ in contagem.most_common(max_termos)]
+    return list(dict.fromkeys(termos))[:max_termos]
+
+def buscar_trechos(conn, texto_projeto, extras=(), lei_ids=None, top_k=TOP_K_TRECHOS, limite=30000):
+    """Retorna os trechos (título da lei, rótulo, texto) mais relevantes por BM25, dentro de `limite` caracteres."""
+    termos = termos_consulta(texto_projeto, extras)
+    if not termos: return []
+    consulta = " OR ".join(f'"{t}"' for t in termos)
+    filtro, params = "", [consulta]
+    if lei_ids:
+        filtro = f"AND t.lei_id IN ({','.join('?' * len(lei_ids))})"
+        params.extend(lei_ids)
+    linhas = conn.execute(f'''SELECT l.titulo, t.rotulo, t.texto
+        FROM trechos_lei_fts f JOIN trechos_lei t ON t.id = f.rowid JOIN leis l ON l.id = t.lei_id
+        WHERE trechos_lei_fts MATCH ? {filtro}
+        ORDER BY bm25(trechos_lei_fts, 2.0, 1.0) LIMIT ?''', (*params, top_k)).fetchall()
+    selecionados, total = [], 0
+    for linha in linhas:
+        if total + len(linha[2]) > limite: break
+        selecionados.append(linha); total += len(linha[2])
+    return selecionados
+
+def formatar_trechos(trechos):
+    return "\n\n".join(f"[{titulo} - {rotulo}]\n{texto}" for titulo, rotulo, texto in trechos)
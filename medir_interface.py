@@ -0,0 +1,92 @@
+"""Mede o tempo de partida e de rerun da interface (Streamlit AppTest) sobre uma base sintética."""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+# ==================== TEMPOS DA INTERFACE ====================
+# A partida a frio roda num interpretador novo (inclui importar as bibliotecas); as interações se repetem com a app carregada
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+def nova_app():
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP, default_timeout=300)
+    at.session_state['logged_in'] = True
+    return at
+
+def cronometrar(acao):
+    inicio = time.perf_counter()
+    acao()
+    return time.perf_counter() - inicio
+
+def ir_para(at, aba):
+    # Com a navegação por aba, seleciona a aba; no layout antigo (st.tabs) tudo já está na tela
+    radios = [r for r in at.radio if r.key == "aba"]
+    if radios and radios[0].value != aba: radios[0].set_value(aba).run()
+
+def botao(at, prefixo):
+    return next((b for b in at.button if (b.key or "").startswith(prefixo)), None)
+
+def interacoes():
+    contador = iter(range(10 ** 9))
+    def salvar_novo(at):
+        ir_para(at, "➕ Novo")
+        next(t for t in at.text_input if t.label == "Número Processo").set_value(f"MEDICAO-{time.time_ns()}-{next(contador)}")
+        return next(b for b in at.button if b.label == "Salvar Processo")
+    return {
+        "rerun sem ação (Novo)": lambda at: ir_para(at, "➕ Novo"),
+        "salvar processo (Novo)": salvar_novo,
+        "próxima página (Gerenciar)": lambda at: (ir_para(at, "📝 Gerenciar"), botao(at, "ger_prox"))[1],
+        "mover cartão (Kanban)": lambda at: (ir_para(at, "📊 Kanban"), botao(at, "next_"))[1],
+        "abrir Dashboard": lambda at: ir_para(at, "📈 Dashboard"),
+    }
+
+def medir_partida():
+    at = nova_app()
+    print(f"{cronometrar(at.run):.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--processos", type=int, default=5000)
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--partidas", type=int, default=3, help="execuções a frio (processos novos)")
+    parser.add_argument("--partida", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.partida:
+        medir_partida(); return
+
+    import dados_sinteticos
+    pasta = tempfile.mkdtemp(prefix="interface_")
+    dados_sinteticos.gerar(os.path.join(pasta, "processos.db"), args.processos)
+    os.chdir(pasta)
+    print(f"Base sintética com {args.processos} processos em {pasta}")
+
+    frias, primeiras = [], []
+    for _ in range(args.partidas):
+        inicio = time.perf_counter()
+        saida = subprocess.run([sys.executable, "-W", "ignore", __file__, "--partida"], capture_output=True, text=True,
+                               env={**os.environ, "STREAMLIT_LOGGER_LEVEL": "error"}).stdout.strip().splitlines()
+        frias.append(time.perf_counter() - inicio)
+        primeiras.append(float(saida[-1]))
+    print(f"Partida a frio: processo {statistics.median(frias) * 1000:8.1f}ms | primeira execução do script {statistics.median(primeiras) * 1000:8.1f}ms")
+
+    at = nova_app()
+    at.run()
+    for nome, preparar in interacoes().items():
+        tempos = []
+        for _ in range(args.repeticoes):
+            alvo = preparar(at)
+            if alvo is None:
+                tempos.append(cronometrar(at.run))
+            else:
+                tempos.append(cronometrar(lambda: alvo.click().run()))
+        if at.exception: print(f"  exceção: {at.exception[0].message}")
+        tempos.sort()
+        print(f"  {nome:28s} p50={statistics.median(tempos) * 1000:8.1f}ms  máx={tempos[-1] * 1000:8.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# ==================== MIGRAÇÕES DO ESQUEMA ====================
+# Cada migração roda uma única vez, em ordem, numa transação própria; o número da última aplicada fica
+# gravado em PRAGMA user_version. Migrações já publicadas não devem ser alteradas: crie uma nova no fim da lista.
+
+# Tabelas de domínio (coluna de texto original -> tabela com id inteiro)
+TABELAS_DOMINIO = {
+    'analista': 'analistas',
+    'uso': 'usos',
+    'tipologia': 'tipologias',
+    'status': 'status_processo',
+    'setor': 'setores',
+}
+
+# Grafias oficiais, cadastradas antes dos dados antigos para prevalecerem sobre variações de maiúsculas/espaços
+VALORES_INICIAIS = {
+    'uso': ["Multifamiliar", "Serviços", "Comércio Varejista", "Indústria", "Unifamiliar", "Misto", "Sem destinação específica"],
+    'tipologia': ["Aprovação inicial", "Levantamento do existente", "Modificação de projeto", "Regularização", "Misto", "Análise RIU", "ERB"],
+    'status': ['Protocolado', 'Em Análise', 'Aguardando Correções', 'Aprovado', 'Reprovado'],
+    'setor': ["Análise prévia", "Pré-análise", "Analista", "Parecer externo", "Fiscalização", "Emissão de documentos", "Requerente"],
+}
+
+def _m1_tabelas_iniciais(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS processos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        numero TEXT UNIQUE NOT NULL,
+        rt TEXT, requerente TEXT, analista TEXT, uso TEXT,
+        tipologia TEXT, area REAL, data_protocolo TEXT,
+        status TEXT DEFAULT 'Protocolado',
+        data_cadastro TEXT DEFAULT CURRENT_TIMESTAMP
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS tramitacao (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        processo_id INTEGER, setor TEXT, data_entrada TEXT,
+        data_saida TEXT, observacao TEXT,
+        FOREIGN KEY (processo_id) REFERENCES processos(id)
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS analises (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        processo_id INTEGER, resultado TEXT, status TEXT,
+        data_analise TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (processo_id) REFERENCES processos(id)
+    )''')
+
+def _m2_nomes_setores(c):
+    # Correção de nomes de setores antigos (antes rodava a cada inicialização)
+    c.execute("UPDATE tramitacao SET setor = 'Pré-análise' WHERE setor IN ('Pró-análise', 'Pró-Análise', 'Pro-analise', 'Pro-Analise')")
+
+# Chave de comparação dos nomes: sem espaços nas pontas e em minúsculas, inclusive as letras acentuadas do português
+# (o NOCASE e o lower() do SQLite só conhecem A-Z, e "JOÃO" continuaria diferente de "joão"). Um replace por letra,
+# aninhados: a lista fica curta porque o analisador do SQLite tem limite de profundidade
+MAIUSCULAS_ACENTUADAS = "ÁÀÂÃÇÉÊÍÓÔÕÚÜ"
+
+def chave_sql(valor):
+    expressao = f"TRIM({valor})"
+    for letra in MAIUSCULAS_ACENTUADAS: expressao = f"replace({expressao}, '{letra}', '{letra.lower()}')"
+    return f"lower({expressao})"
+
+def id_por_nome(coluna, valor="?"):
+    """Subconsulta SQL do id do domínio cujo nome equivale a `valor` (maiúsculas, acentos maiúsculos e espaços nas pontas à parte)."""
+    return f"(SELECT id FROM {TABELAS_DOMINIO[coluna]} WHERE chave = {chave_sql(valor)})"
+
+def nome_exibicao(nome):
+    """Grafia com que um nome novo é cadastrado: sem espaços nas pontas e, se veio todo em minúsculas (ou todo em
+    maiúsculas, com mais de uma palavra), com as iniciais maiúsculas. Siglas como "ERB" ficam como estão."""
+    nome = str(nome).strip()
+    if nome.islower() or (nome.isupper() and " " in nome): return nome.title()
+    return nome
+
+def _id_dominio(coluna, valor):
+    return f"(SELECT id FROM {TABELAS_DOMINIO[coluna]} WHERE nome = TRIM({valor}))"
+
+def _cadastrar_dominio(coluna, valor):
+    # Valores novos entram na tabela de domínio na primeira vez em que aparecem (vazio vira NULL)
+    return f"INSERT OR IGNORE INTO {TABELAS_DOMINIO[coluna]} (nome) SELECT TRIM({valor}) WHERE TRIM(COALESCE({valor}, '')) <> '';"
+
+def _copiar_sequencia(c, antiga, nova):
+    # Preserva o contador do AUTOINCREMENT (ids de registros apagados continuam sem reuso)
+    c.execute("DELETE FROM sqlite_sequence WHERE name = ?", (nova,))
+    c.execute("INSERT INTO sqlite_sequence (name, seq) SELECT ?, seq FROM sqlite_sequence WHERE name = ?", (nova, antiga))
+
+def _apontar_para_base(c, tabela):
+    # Recria a tabela com a chave estrangeira apontando para processos_base (uma view não pode ser referenciada);
+    # os índices são recriados pelo criar_esquema
+    sql = c.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (tabela,)).fetchone()[0]
+    sql = sql.replace(f"CREATE TABLE {tabela}", f"CREATE TABLE {tabela}_nova", 1).replace("REFERENCES processos(id)", "REFERENCES processos_base(id)")
+    c.execute(sql)
+    c.execute(f"INSERT INTO {tabela}_nova SELECT * FROM {tabela}")
+    _copiar_sequencia(c, tabela, f"{tabela}_nova")
+    c.execute(f"DROP TABLE {tabela}")
+    c.execute(f"ALTER TABLE {tabela}_nova RENAME TO {tabela}")
+
+def _criar_gatilhos_views(c, id_dominio):
+    # Escritas nas views processos/tramitacao: nomes dos domínios cadastrados e resolvidos para os ids
+    dims = ('analista', 'uso', 'tipologia')
+    cadastrar = "\n".join(_cadastrar_dominio(d, f"NEW.{d}") for d in dims + ('status',))
+    c.execute(f'''CREATE TRIGGER processos_ins INSTEAD OF INSERT ON processos BEGIN
+        {_cadastrar_dominio('status', "COALESCE(NEW.status, 'Protocolado')")}
+        {cadastrar}
+        INSERT INTO processos_base (id, numero, rt, requerente, analista_id, uso_id, tipologia_id, area, data_protocolo, status_id, data_cadastro)
+        VALUES (NEW.id, NEW.numero, NEW.rt, NEW.requerente, {', '.join(id_dominio(d, f'NEW.{d}') for d in dims)},
+                NEW.area, NEW.data_protocolo, {id_dominio('status', "COALESCE(NEW.status, 'Protocolado')")},
+                COALESCE(NEW.data_cadastro, CURRENT_TIMESTAMP));
+    END''')
+    c.execute(f'''CREATE TRIGGER processos_upd INSTEAD OF UPDATE ON processos BEGIN
+        {cadastrar}
+        UPDATE processos_base SET id = NEW.id, numero = NEW.numero, rt = NEW.rt, requerente = NEW.requerente,
+            {', '.join(f"{d}_id = {id_dominio(d, f'NEW.{d}')}" for d in dims)},
+            area = NEW.area, data_protocolo = NEW.data_protocolo, status_id = {id_dominio('status', 'NEW.status')},
+            data_cadastro = NEW.data_cadastro
+        WHERE id = OLD.id;
+    END''')
+    c.execute('''CREATE TRIGGER processos_del INSTEAD OF DELETE ON processos BEGIN
+        DELETE FROM processos_base WHERE id = OLD.id;
+    END''')
+    c.execute(f'''CREATE TRIGGER tramitacao_ins INSTEAD OF INSERT ON tramitacao BEGIN
+        {_cadastrar_dominio('setor', 'NEW.setor')}
+        INSERT INTO tramitacao_base (id, processo_id, setor_id, data_entrada, data_saida, observacao)
+        VALUES (NEW.id, NEW.processo_id, {id_dominio('setor', 'NEW.setor')}, NEW.data_entrada, NEW.data_saida, NEW.observacao);
+    END''')
+    c.execute(f'''CREATE TRIGGER tramitacao_upd INSTEAD OF UPDATE ON tramitacao BEGIN
+        {_cadastrar_dominio('setor', 'NEW.setor')}
+        UPDATE tramitacao_base SET id = NEW.id, processo_id = NEW.processo_id, setor_id = {id_dominio('setor', 'NEW.setor')},
+            data_entrada = NEW.data_entrada, data_saida = NEW.data_saida, observacao = NEW.observacao
+        WHERE id = OLD.id;
+    END''')
+    c.execute('''CREATE TRIGGER tramitacao_del INSTEAD OF DELETE ON tramitacao BEGIN
+        DELETE FROM tramitacao_base WHERE id = OLD.id;
+    END''')
+
+def _m3_tabelas_dominio(c):
+    for coluna, tabela in TABELAS_DOMINIO.items():
+        c.execute(f"CREATE TABLE {tabela} (id INTEGER PRIMARY KEY, nome TEXT NOT NULL UNIQUE COLLATE NOCASE)")
+        c.executemany(f"INSERT OR IGNORE INTO {tabela} (nome) VALUES (?)", [(v,) for v in VALORES_INICIAIS.get(coluna, [])])
+        origem = 'tramitacao' if coluna == 'setor' else 'processos'
+        # A grafia mais frequente vence entre variações que só diferem em maiúsculas/minúsculas (no empate, a com maiúscula)
+        c.execute(f"""INSERT OR IGNORE INTO {tabela} (nome) SELECT TRIM({coluna}) FROM {origem}
+            WHERE TRIM(COALESCE({coluna}, '')) <> '' GROUP BY TRIM({coluna}) ORDER BY COUNT(*) DESC, TRIM({coluna})""")
+
+    c.execute('''CREATE TABLE processos_base (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        numero TEXT UNIQUE NOT NULL,
+        rt TEXT, requerente TEXT,
+        analista_id INTEGER REFERENCES analistas(id),
+        uso_id INTEGER REFERENCES usos(id),
+        tipologia_id INTEGER REFERENCES tipologias(id),
+        area REAL, data_protocolo TEXT,
+        status_id INTEGER REFERENCES status_processo(id),
+        data_cadastro TEXT DEFAULT CURRENT_TIMESTAMP
+    )''')
+    c.execute(f'''INSERT INTO processos_base (id, numero, rt, requerente, analista_id, uso_id, tipologia_id, area, data_protocolo, status_id, data_cadastro)
+        SELECT id, numero, rt, requerente, {_id_dominio('analista', 'analista')}, {_id_dominio('uso', 'uso')},
+               {_id_dominio('tipologia', 'tipologia')}, area, data_protocolo, {_id_dominio('status', 'status')}, data_cadastro
+        FROM processos''')
+    c.execute('''CREATE TABLE tramitacao_base (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        processo_id INTEGER REFERENCES processos_base(id),
+        setor_id INTEGER REFERENCES setores(id),
+        data_entrada TEXT, data_saida TEXT, observacao TEXT
+    )''')
+    c.execute(f'''INSERT INTO tramitacao_base (id, processo_id, setor_id, data_entrada, data_saida, observacao)
+        SELECT id, processo_id, {_id_dominio('setor', 'setor')}, data_entrada, data_saida, observacao FROM tramitacao''')
+    _copiar_sequencia(c, 'processos', 'processos_base')
+    _copiar_sequencia(c, 'tramitacao', 'tramitacao_base')
+
+    # As tabelas antigas (com seus triggers e índices) dão lugar a views com os mesmos nomes e colunas,
+    # então leituras e escritas existentes continuam funcionando sobre as tabelas normalizadas
+    c.execute("DROP TABLE tramitacao")
+    c.execute("DROP TABLE IF EXISTS permanencia_hist")  # recriado por setor_id em permanencia.criar_estruturas
+    _apontar_para_base(c, 'analises')
+    c.execute("DROP TABLE processos")
+    c.execute('''CREATE VIEW processos AS
+        SELECT p.id, p.numero, p.rt, p.requerente, a.nome AS analista, u.nome AS uso, t.nome AS tipologia,
+               p.area, p.data_protocolo, s.nome AS status, p.data_cadastro
+        FROM processos_base p
+        LEFT JOIN analistas a ON a.id = p.analista_id
+        LEFT JOIN usos u ON u.id = p.uso_id
+        LEFT JOIN tipologias t ON t.id = p.tipologia_id
+        LEFT JOIN status_processo s ON s.id = p.status_id''')
+    c.execute('''CREATE VIEW tramitacao AS
+        SELECT t.id, t.processo_id, s.nome AS setor, t.data_entrada, t.data_saida, t.observacao
+        FROM tramitacao_base t LEFT JOIN setores s ON s.id = t.setor_id''')
+
+    _criar_gatilhos_views(c, _id_dominio)
+
+def _m4_chave_dominio(c):
+    # Os nomes passam a ser comparados pela chave (ver chave_sql): variações já gravadas viram um registro só,
+    # o de menor id (as grafias oficiais e as mais frequentes vieram primeiro), e a grafia exibida é a preferida do grupo
+    from banco import PREFIXOS_DERIVADOS  # importado aqui: o banco importa este módulo
+    mudancas = []
+    for coluna, tabela in TABELAS_DOMINIO.items():
+        c.execute(f"ALTER TABLE {tabela} ADD COLUMN chave TEXT GENERATED ALWAYS AS ({chave_sql('nome')}) VIRTUAL")
+        grupos = {}
+        for id_, nome, chave in c.execute(f"SELECT id, nome, chave FROM {tabela} ORDER BY id").fetchall():
+            grupos.setdefault(chave, []).append((id_, nome))
+        for registros in grupos.values():
+            nomes = [n for _, n in registros]
+            grafia = next((n for n in nomes if not n.islower() and not n.isupper()), nome_exibicao(nomes[0]))
+            if len(registros) > 1 or grafia != nomes[0]:
+                mudancas.append((coluna, tabela, [i for i, _ in registros], grafia))
+    if mudancas:
+        # Os resumos guardam os nomes e as tendências e o histograma, os ids: sem os triggers, o criar_esquema recalcula tudo
+        for (nome,) in c.execute("SELECT name FROM sqlite_master WHERE type='trigger'").fetchall():
+            if nome.startswith(PREFIXOS_DERIVADOS): c.execute(f"DROP TRIGGER {nome}")
+        transicoes = [f"tendencia_{g}" for g in ('dia', 'semana', 'mes')
+                      if c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (f"tendencia_{g}",)).fetchone()]
+    for coluna, tabela, ids, grafia in mudancas:
+        sobrevivente, duplicados = ids[0], ids[1:]
+        if duplicados:
+            marcadores = ",".join("?" * len(duplicados))
+            base = 'tramitacao_base' if coluna == 'setor' else 'processos_base'
+            c.execute(f"UPDATE {base} SET {coluna}_id = ? WHERE {coluna}_id IN ({marcadores})", (sobrevivente, *duplicados))
+            # As transições de status não se recalculam: são somadas no status que fica
+            for t in (transicoes if coluna == 'status' else ()):
+                c.execute(f"""INSERT INTO {t} (metrica, periodo, chave, quantidade)
+                    SELECT metrica, periodo, ?, SUM(quantidade) FROM {t} WHERE metrica = 'transicao' AND chave IN ({marcadores}) GROUP BY periodo
+                    ON CONFLICT(metrica, periodo, chave) DO UPDATE SET quantidade = quantidade + excluded.quantidade""", (sobrevivente, *duplicados))
+                c.execute(f"DELETE FROM {t} WHERE metrica = 'transicao' AND chave IN ({marcadores})", duplicados)
+            c.execute(f"DELETE FROM {tabela} WHERE id IN ({marcadores})", duplicados)
+        c.execute(f"UPDATE {tabela} SET nome = ? WHERE id = ?", (grafia, sobrevivente))
+    for tabela in TABELAS_DOMINIO.values():
+        c.execute(f"CREATE UNIQUE INDEX idx_{tabela}_chave ON {tabela}(chave)")
+    if mudancas and c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='versao_dados'").fetchone():
+        c.execute("UPDATE versao_dados SET versao = versao + 1")
+    for gatilho in ('processos_ins', 'processos_upd', 'processos_del', 'tramitacao_ins', 'tramitacao_upd', 'tramitacao_del'):
+        c.execute(f"DROP TRIGGER {gatilho}")
+    _criar_gatilhos_views(c, id_por_nome)
+
+MIGRACOES = [
+    _m1_tabelas_iniciais,
+    _m2_nomes_setores,
+    _m3_tabelas_dominio,
+    _m4_chave_dominio,
+]
+
+def versao(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def aplicar(conn):
+    """Aplica as migrações pendentes. Retorna os números das que rodaram."""
+    aplicadas = []
+    for numero in range(versao(conn) + 1, len(MIGRACOES) + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            MIGRACOES[numero - 1](conn.cursor())
+            conn.execute(f"PRAGMA user_version = {numero}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        aplicadas.append(numero)
+    return aplicadas
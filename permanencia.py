@@ -0,0 +1,115 @@
+from cache_leituras import cacheado
+
+# ==================== PERMANÊNCIA POR SETOR E PRAZOS (SLA) ====================
+# Dias de cada movimentação calculados direto no SQL (sem apply linha a linha), um histograma de durações
+# por setor mantido por triggers (percentis sem varrer a tramitação) e um índice parcial das movimentações
+# em aberto para responder "quem está há mais de N dias no setor X".
+
+# Prazo padrão (dias) de permanência em cada setor
+SLA_PADRAO_DIAS = {
+    "Análise prévia": 30,
+    "Pré-análise": 15,
+    "Analista": 30,
+    "Parecer externo": 45,
+    "Fiscalização": 30,
+    "Emissão de documentos": 10,
+    "Requerente": 60,
+}
+
+HOJE_SQL = "date('now', 'localtime')"
+DIAS_SQL = f"CAST(julianday(COALESCE(data_saida, {HOJE_SQL})) - julianday(data_entrada) AS INTEGER)"
+# Filtro por setor resolvido para o id uma vez, para usar o índice parcial de tramitacao_base
+SETOR_ID_SQL = "(SELECT id FROM setores WHERE nome = ?)"
+
+def _sql_hist(linha, sinal):
+    # Histograma por id do setor (0 = sem setor); os nomes só entram na leitura
+    setor = f"COALESCE({linha}.setor_id, 0)"
+    dias = f"CAST(julianday({linha}.data_saida) - julianday({linha}.data_entrada) AS INTEGER)"
+    cmds = [f"""INSERT INTO permanencia_hist (setor_id, dias, quantidade)
+        SELECT {setor}, {dias}, {sinal}
+        WHERE {linha}.data_saida IS NOT NULL AND julianday({linha}.data_saida) IS NOT NULL AND julianday({linha}.data_entrada) IS NOT NULL
+        ON CONFLICT(setor_id, dias) DO UPDATE SET quantidade = quantidade + excluded.quantidade;"""]
+    # Remove só a faixa que zerou (pela chave), sem varrer o histograma a cada movimentação
+    if sinal < 0: cmds.append(f"DELETE FROM permanencia_hist WHERE setor_id = {setor} AND dias = {dias} AND quantidade <= 0;")
+    return "\n".join(cmds)
+
+def reconstruir_histograma(c):
+    c.execute("DELETE FROM permanencia_hist")
+    c.execute("""INSERT INTO permanencia_hist (setor_id, dias, quantidade)
+        SELECT COALESCE(setor_id, 0), CAST(julianday(data_saida) - julianday(data_entrada) AS INTEGER), COUNT(*)
+        FROM tramitacao_base WHERE data_saida IS NOT NULL AND julianday(data_saida) IS NOT NULL AND julianday(data_entrada) IS NOT NULL
+        GROUP BY 1, 2""")
+
+def criar_estruturas(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS permanencia_hist (
+        setor_id INTEGER NOT NULL, dias INTEGER NOT NULL, quantidade INTEGER DEFAULT 0,
+        PRIMARY KEY (setor_id, dias)
+    )''')
+    # Só as movimentações em aberto entram no índice: continua pequeno com milhões de linhas fechadas
+    c.execute("CREATE INDEX IF NOT EXISTS idx_tramitacao_abertas ON tramitacao_base(setor_id, data_entrada) WHERE data_saida IS NULL")
+    existe = c.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='trg_permanencia_ins'").fetchone()
+    gatilhos = {
+        "trg_permanencia_ins": ("AFTER INSERT ON tramitacao_base", _sql_hist("NEW", 1)),
+        "trg_permanencia_del": ("AFTER DELETE ON tramitacao_base", _sql_hist("OLD", -1)),
+        "trg_permanencia_upd": ("AFTER UPDATE OF setor_id, data_entrada, data_saida ON tramitacao_base",
+                                _sql_hist("OLD", -1) + "\n" + _sql_hist("NEW", 1)),
+    }
+    for nome, (evento, corpo) in gatilhos.items():
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS {nome} {evento} BEGIN\n{corpo}\nEND")
+    if not existe: reconstruir_histograma(c)
+
+# === CONSULTAS ===
+@cacheado()
+def movimentacoes_processo(conn, processo_id):
+    """Movimentações do processo com os dias já calculados: (id, setor, entrada, saída, dias, observação)."""
+    return conn.execute(f"""SELECT id, setor, data_entrada, data_saida, {DIAS_SQL}, observacao
+        FROM tramitacao WHERE processo_id=? ORDER BY data_entrada, id""", (processo_id,)).fetchall()
+
+@cacheado()
+def dias_por_setor(conn, processo_ids=None):
+    """Total de dias por (processo, setor) de vários processos numa única consulta agregada."""
+    filtro, params = "", ()
+    if processo_ids:
+        filtro = f"WHERE processo_id IN ({','.join('?' * len(processo_ids))})"
+        params = tuple(processo_ids)
+    return conn.execute(f"""SELECT processo_id, setor, SUM({DIAS_SQL}) FROM tramitacao {filtro}
+        GROUP BY processo_id, setor ORDER BY processo_id, 3 DESC""", params).fetchall()
+
+@cacheado()
+def violacoes_sla(conn, setor, dias_limite, limite=500):
+    """Processos em aberto no setor há mais de `dias_limite` dias, do mais antigo para o mais novo."""
+    return conn.execute(f"""SELECT p.id, p.numero, p.requerente, p.analista, t.data_entrada,
+               CAST(julianday({HOJE_SQL}) - julianday(t.data_entrada) AS INTEGER) AS dias
+        FROM tramitacao_base t JOIN processos p ON p.id = t.processo_id
+        WHERE t.data_saida IS NULL AND t.setor_id = {SETOR_ID_SQL} AND t.data_entrada <= date({HOJE_SQL}, ?)
+        ORDER BY t.data_entrada LIMIT ?""", (setor, f"-{int(dias_limite)} days", limite)).fetchall()
+
+@cacheado()
+def contar_violacoes(conn, prazos=None):
+    """Quantidade de movimentações em aberto acima do prazo, por setor."""
+    prazos = prazos or SLA_PADRAO_DIAS
+    resultado = {}
+    for setor, dias in prazos.items():
+        resultado[setor] = conn.execute(f"""SELECT COUNT(*) FROM tramitacao_base
+            WHERE data_saida IS NULL AND setor_id = {SETOR_ID_SQL} AND data_entrada <= date({HOJE_SQL}, ?)""", (setor, f"-{int(dias)} days")).fetchone()[0]
+    return resultado
+
+@cacheado()
+def percentis_setor(conn, percentis=(50, 90, 95)):
+    """Percentis (em dias) das permanências concluídas por setor, lidos do histograma, e situação das abertas."""
+    linhas = conn.execute("""SELECT s.nome, h.dias,
+               SUM(h.quantidade) OVER (PARTITION BY h.setor_id ORDER BY h.dias) AS acumulado,
+               SUM(h.quantidade) OVER (PARTITION BY h.setor_id) AS total
+        FROM permanencia_hist h LEFT JOIN setores s ON s.id = h.setor_id
+        WHERE h.quantidade > 0 ORDER BY h.setor_id, h.dias""").fetchall()
+    resultado = {}
+    for setor, dias, acumulado, total in linhas:
+        r = resultado.setdefault(setor, {'concluidas': total, 'abertas': 0, 'mais_antiga': None})
+        for p in percentis:
+            if f"p{p}" not in r and acumulado >= p / 100 * total: r[f"p{p}"] = dias
+    for setor, abertas, mais_antiga in conn.execute(f"""SELECT s.nome, COUNT(*), CAST(julianday({HOJE_SQL}) - julianday(MIN(t.data_entrada)) AS INTEGER)
+            FROM tramitacao_base t LEFT JOIN setores s ON s.id = t.setor_id
+            WHERE t.data_saida IS NULL GROUP BY t.setor_id""").fetchall():
+        r = resultado.setdefault(setor, {'concluidas': 0})
+        r['abertas'], r['mais_antiga'] = abertas, mais_antiga
+    return resultado
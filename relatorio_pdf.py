@@ -0,0 +1,143 @@
+import io
+import struct
+from datetime import datetime
+from fpdf import FPDF
+import plotly.express as px
+
+# ==================== RELATÓRIO PDF DO DASHBOARD ====================
+# Fora do app.py para o fpdf e o plotly só serem carregados quando um relatório é pedido
+
+class PDFRelatorio(FPDF):
+    def header(self):
+        # Fundo do cabeçalho
+        self.set_fill_color(240, 240, 240)
+        self.rect(0, 0, 210, 30, 'F')
+        self.set_font('Arial', 'B', 14)
+        self.set_y(10)
+        self.cell(0, 10, 'Relatório Gerencial - Sistema de Validação', 0, 1, 'C')
+        self.ln(15)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Página {self.page_no()} - Gerado via Sistema Automático', 0, 0, 'C')
+
+    def imagem_memoria(self, dados, nome, x=None, y=None, w=0, h=0):
+        # O FPDF só lê imagens de arquivo; aqui o JPEG em memória entra direto no cache de imagens do documento
+        if nome not in self.images:
+            largura, altura, canais = _dimensoes_jpeg(dados)
+            cs = 'DeviceRGB' if canais == 3 else ('DeviceCMYK' if canais == 4 else 'DeviceGray')
+            self.images[nome] = {'i': len(self.images) + 1, 'w': largura, 'h': altura, 'cs': cs, 'bpc': 8, 'f': 'DCTDecode', 'data': dados}
+        self.image(nome, x=x, y=y, w=w, h=h)
+
+def _dimensoes_jpeg(dados):
+    # Lê largura, altura e canais do marcador SOF do JPEG
+    f = io.BytesIO(dados)
+    if f.read(2) != b'\xff\xd8': raise ValueError("Imagem não é JPEG")
+    while True:
+        marcador_alto, marcador = struct.unpack('BB', f.read(2))
+        if marcador_alto != 0xFF: raise ValueError("JPEG inválido")
+        if marcador in (0xD8, 0x01) or 0xD0 <= marcador <= 0xD7: continue
+        tamanho, = struct.unpack('>H', f.read(2))
+        if marcador in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF):
+            _, altura, largura, canais = struct.unpack('>BHHB', f.read(6))
+            return largura, altura, canais
+        f.seek(tamanho - 2, 1)
+
+def montar_figuras_dashboard(resumo):
+    fig_status = px.pie(resumo['status'], names='status', values='total', title='Distribuição por Status', color_discrete_sequence=px.colors.qualitative.Set2)
+    fig_status.update_layout(template="plotly_white", title_font_size=16)
+    
+    count_uso = resumo['uso'].rename(columns={'total': 'count'})
+    fig_uso = px.bar(count_uso, x='count', y='uso', orientation='h', title='Uso Principal', color='uso', color_discrete_sequence=px.colors.qualitative.Prism)
+    fig_uso.update_layout(template="plotly_white", showlegend=False)
+    
+    count_tipo = resumo['tipologia'].rename(columns={'total': 'count'})
+    fig_tipo = px.bar(count_tipo, x='count', y='tipologia', orientation='h', title='Tipologia dos Projetos', color='tipologia', color_discrete_sequence=px.colors.qualitative.Bold)
+    fig_tipo.update_layout(template="plotly_white", showlegend=False)
+    return fig_status, fig_uso, fig_tipo
+
+def metricas_dashboard(resumo):
+    # Textos do resumo executivo, formatados como nos cartões do Dashboard
+    return {'total': resumo['total'], 'area_total': f"{resumo['area_total']:,.0f} m²", 'aprovados': resumo['aprovados'],
+            'media_dias': f"{resumo['media_dias']:.0f}"}
+
+def renderizar_figura(fig):
+    # JPEG pelo kaleido; sem ele (ou se falhar) o relatório sai sem o gráfico
+    try:
+        return fig.to_image(format="jpeg", width=600, height=400, scale=2)
+    except Exception:
+        return None
+
+def _latin1(texto):
+    return str(texto).encode('latin-1', 'replace').decode('latin-1')
+
+def gerar_pdf_dashboard(df_analista, metricas, img_status=None, img_uso=None, img_tipo=None, recorte=None):
+    pdf = PDFRelatorio()
+    pdf.add_page()
+    pdf.set_font("Arial", size=10)
+    
+    # 1. Cabeçalho com Métricas Gerais
+    pdf.set_font("Arial", 'B', 11)
+    pdf.cell(0, 8, f"Data do Relatório: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 0, 1)
+    # Relatório de uma parte dos processos (por analista, uso, setor...)
+    if recorte: pdf.cell(0, 8, _latin1(f"Recorte: {recorte}"), 0, 1)
+    pdf.ln(2)
+    
+    # Tabela de Resumo Executivo
+    pdf.set_fill_color(230, 230, 250) # Lilás bem claro
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(0, 8, "  Resumo Executivo", 0, 1, 'L', fill=True)
+    pdf.ln(2)
+    
+    pdf.set_font("Arial", size=10)
+    w_col = 63
+    pdf.cell(w_col, 8, f"Total de Processos: {metricas['total']}", 1)
+    pdf.cell(w_col, 8, f"Aprovados: {metricas['aprovados']}", 1)
+    pdf.cell(w_col, 8, f"Média Dias: {metricas['media_dias']}", 1, 1)
+    pdf.cell(w_col*2, 8, f"Área Total Analisada: {metricas['area_total']}", 1, 1)
+    pdf.ln(5)
+
+    # 2. Inserção dos Gráficos
+    pdf.set_font("Arial", 'B', 10)
+    pdf.set_fill_color(230, 230, 250)
+    pdf.cell(0, 8, "  Indicadores Visuais", 0, 1, 'L', fill=True)
+    pdf.ln(2)
+    
+    y_start = pdf.get_y()
+    
+    # GRÁFICOS LADO A LADO (Status e Uso)
+    if img_status and img_uso:
+        pdf.imagem_memoria(img_status, "status", x=10, y=y_start, w=90)
+        pdf.imagem_memoria(img_uso, "uso", x=105, y=y_start, w=90)
+        pdf.ln(65)
+
+    # GRÁFICO DE TIPOLOGIA
+    if img_tipo:
+        if pdf.get_y() > 220: pdf.add_page()
+        x_center = (210 - 120) / 2
+        pdf.imagem_memoria(img_tipo, "tipo", x=x_center, w=120)
+        pdf.ln(5)
+
+    # 3. Produtividade Analistas
+    if pdf.get_y() > 220: pdf.add_page()
+    pdf.ln(5)
+    
+    pdf.set_font("Arial", 'B', 10)
+    pdf.set_fill_color(230, 230, 250)
+    pdf.cell(0, 8, "  Produtividade da Equipe", 0, 1, 'L', fill=True)
+    pdf.ln(2)
+    
+    df_analista = df_analista.sort_values('area', ascending=False)
+    
+    pdf.set_fill_color(245, 245, 245)
+    pdf.set_font("Arial", 'B', 9)
+    pdf.cell(120, 8, "Analista Responsável", 1, 0, fill=True)
+    pdf.cell(50, 8, "Área Total (m²)", 1, 1, fill=True)
+    
+    pdf.set_font("Arial", size=9)
+    for analista, area in zip(df_analista['analista'], df_analista['area']):
+        pdf.cell(120, 8, _latin1(analista), 1)
+        pdf.cell(50, 8, f"{area:,.2f}", 1, 1)
+
+    return pdf.output(dest='S').encode('latin-1')
@@ -0,0 +1,180 @@
+"""Gera em lote, sem o Streamlit, relatórios PDF do Dashboard recortados por analista, uso e setor."""
+import os
+import re
+import sys
+import time
+import argparse
+import unicodedata
+import multiprocessing
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import sqlite3
+import urllib.parse
+import banco
+import migracoes
+
+# ==================== RELATÓRIOS EM LOTE ====================
+# Uma consulta por recorte agrega todos os grupos; os PDFs são gerados em paralelo num pool de processos
+MAX_TRABALHADORES = max(1, os.cpu_count() or 1)
+
+# Recorte -> (expressão do grupo, junção extra). O setor é onde o processo está agora: a movimentação em aberto
+# (a de entrada mais recente, se houver mais de uma, para o processo não contar em dois setores).
+RECORTES = {
+    'geral': ("'Todos'", ""),
+    'analista': ("a.nome", ""),
+    'uso': ("u.nome", ""),
+    'setor': ("se.nome", """JOIN tramitacao_base ta ON ta.id = (SELECT id FROM tramitacao_base WHERE processo_id = p.id AND data_saida IS NULL
+            ORDER BY data_entrada DESC, id DESC LIMIT 1)
+        JOIN setores se ON se.id = ta.setor_id"""),
+}
+NOMES_RECORTE = {'geral': "Geral", 'analista': "Analista", 'uso': "Uso", 'setor': "Setor atual"}
+
+# ==================== AGREGAÇÃO ====================
+def agregar(conn, recorte, desde=None, ate=None):
+    """Totais por (grupo, status, uso, tipologia, analista) numa única varredura dos processos."""
+    import pandas as pd
+    grupo, juncao = RECORTES[recorte]
+    filtros, params = [f"{grupo} IS NOT NULL"], []
+    if desde: filtros.append("p.data_protocolo >= ?"); params.append(str(desde))
+    if ate: filtros.append("p.data_protocolo <= ?"); params.append(str(ate))
+    df = pd.read_sql_query(f"""SELECT {grupo} AS grupo, s.nome AS status, u.nome AS uso, t.nome AS tipologia, a.nome AS analista,
+               COUNT(*) AS total, COALESCE(SUM(p.area), 0) AS area,
+               SUM(julianday(p.data_protocolo)) AS soma_jd, COUNT(p.data_protocolo) AS com_data
+        FROM processos_base p
+        LEFT JOIN status_processo s ON s.id = p.status_id
+        LEFT JOIN usos u ON u.id = p.uso_id
+        LEFT JOIN tipologias t ON t.id = p.tipologia_id
+        LEFT JOIN analistas a ON a.id = p.analista_id
+        {juncao}
+        WHERE {' AND '.join(filtros)}
+        GROUP BY 1, p.status_id, p.uso_id, p.tipologia_id, p.analista_id""", conn, params=params)
+    return df.fillna({'status': '', 'uso': '', 'tipologia': '', 'analista': '', 'soma_jd': 0})
+
+def resumos(df, minimo=1):
+    """{grupo: resumo} no formato de banco.resumo_dashboard, a partir das linhas de agregar()."""
+    import pandas as pd
+    hoje_jd = pd.Timestamp.now().normalize().to_julian_date()
+    resultado = {}
+    for grupo, g in df.groupby('grupo', sort=True):
+        total = int(g['total'].sum())
+        if total < minimo: continue
+
+        def por(dim):
+            d = g.groupby(dim, as_index=False)[['total', 'area']].sum()
+            return d.sort_values('total', ascending=False, ignore_index=True)
+        com_data = g['com_data'].sum()
+        analistas = por('analista')
+        resultado[grupo] = {
+            'total': total,
+            'area_total': float(g['area'].sum()),
+            'aprovados': int(g.loc[g['status'] == 'Aprovado', 'total'].sum()),
+            'media_dias': (hoje_jd - g['soma_jd'].sum() / com_data) if com_data else float('nan'),
+            'status': por('status'),
+            'uso': por('uso'),
+            'tipologia': por('tipologia'),
+            'analista': analistas[analistas['analista'].str.len() > 0][['analista', 'area']],
+        }
+    return resultado
+
+# ==================== GERAÇÃO ====================
+def nome_arquivo(recorte, grupo, usados=None):
+    """Nome do PDF do grupo. Grupos diferentes podem dar o mesmo nome sem acentos e pontuação ("São Paulo" e
+    "Sao-Paulo"): com `usados` (conjunto, atualizado aqui), o repetido ganha sufixo numérico em vez de sobrescrever."""
+    texto = unicodedata.normalize('NFKD', str(grupo)).encode('ascii', 'ignore').decode()
+    base = f"relatorio_{recorte}_{re.sub(r'[^A-Za-z0-9]+', '_', texto).strip('_').lower() or 'sem_nome'}"
+    if usados is None: return base + ".pdf"
+    nome, n = base + ".pdf", 1
+    while nome in usados:
+        n += 1; nome = f"{base}_{n}.pdf"
+    usados.add(nome)
+    return nome
+
+def gerar_relatorio(caminho, resumo, recorte_texto):
+    """Roda no processo do pool: gráficos, JPEGs pelo kaleido e PDF gravado em `caminho`. Retorna (caminho, bytes, segundos)."""
+    import relatorio_pdf
+    inicio = time.perf_counter()
+    figuras = relatorio_pdf.montar_figuras_dashboard(resumo)
+    pdf = relatorio_pdf.gerar_pdf_dashboard(resumo['analista'], relatorio_pdf.metricas_dashboard(resumo),
+                                            *(relatorio_pdf.renderizar_figura(f) for f in figuras), recorte=recorte_texto)
+    with open(caminho, "wb") as f:
+        f.write(pdf)
+    return caminho, len(pdf), time.perf_counter() - inicio
+
+def abrir_somente_leitura(caminho_db):
+    # Só lê as tabelas base: nada de migrações, criar_esquema ou escritor sobre o banco de produção
+    conn = sqlite3.connect(f"file:{urllib.parse.quote(os.path.abspath(caminho_db))}?mode=ro", uri=True)
+    versao, esperada = migracoes.versao(conn), len(migracoes.MIGRACOES)
+    if versao < esperada:
+        conn.close()
+        raise RuntimeError(f"banco na versão {versao} do esquema (esperada {esperada}): abra-o uma vez pelo app para atualizá-lo")
+    return conn
+
+def gerar_lote(caminho_db, recortes, saida, trabalhadores=MAX_TRABALHADORES, desde=None, ate=None, minimo=1, progresso=None):
+    """Gera um PDF por grupo de cada recorte em `saida`. Retorna estatísticas de tempo e vazão."""
+    inicio = time.perf_counter()
+    conn = abrir_somente_leitura(caminho_db)
+    try:
+        tarefas, usados = [], set()
+        for recorte in recortes:
+            periodo = f" | protocolo de {desde or '...'} a {ate or '...'}" if desde or ate else ""
+            for grupo, resumo in resumos(agregar(conn, recorte, desde, ate), minimo).items():
+                texto = "Todos os processos" if recorte == 'geral' else f"{NOMES_RECORTE[recorte]} = {grupo}"
+                tarefas.append((os.path.join(saida, nome_arquivo(recorte, grupo, usados)), resumo, texto + periodo))
+    finally:
+        # Nada do banco é usado pelos processos do pool
+        conn.close()
+    agregacao = time.perf_counter() - inicio
+
+    os.makedirs(saida, exist_ok=True)
+    gerados, erros, soma_bytes, soma_tarefas = [], [], 0, 0.0
+    if trabalhadores <= 1 or len(tarefas) <= 1:
+        executar = [(t, lambda t=t: gerar_relatorio(*t)) for t in tarefas]
+        pool = None
+    else:
+        # "spawn", como na extração de PDF: cada processo sobe o próprio kaleido sem herdar threads
+        pool = ProcessPoolExecutor(max_workers=min(trabalhadores, len(tarefas)), mp_context=multiprocessing.get_context("spawn"))
+        futuros = {pool.submit(gerar_relatorio, *t): t for t in tarefas}
+        executar = ((futuros[f], f.result) for f in as_completed(futuros))
+    try:
+        for tarefa, resultado in executar:
+            try:
+                caminho, n_bytes, segundos = resultado()
+                gerados.append(caminho); soma_bytes += n_bytes; soma_tarefas += segundos
+            except Exception as e:
+                erros.append((tarefa[0], str(e)))
+            if progresso: progresso(len(gerados) + len(erros), len(tarefas))
+    finally:
+        if pool: pool.shutdown(cancel_futures=True)
+    total = time.perf_counter() - inicio
+    return {'relatorios': len(gerados), 'erros': erros, 'bytes': soma_bytes, 'segundos': total, 'agregacao': agregacao,
+            'geracao': total - agregacao, 'soma_tarefas': soma_tarefas, 'por_segundo': len(gerados) / total if total else 0.0}
+
+# ==================== LINHA DE COMANDO ====================
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--por", nargs="+", choices=list(RECORTES), default=['analista', 'uso', 'setor'])
+    parser.add_argument("--banco", default=banco.CAMINHO_DB)
+    parser.add_argument("--saida", default=f"relatorios_{date.today().strftime('%Y%m%d')}")
+    parser.add_argument("--trabalhadores", type=int, default=MAX_TRABALHADORES, help="processos em paralelo (1 = em série)")
+    parser.add_argument("--desde", type=date.fromisoformat, help="data de protocolo inicial (AAAA-MM-DD)")
+    parser.add_argument("--ate", type=date.fromisoformat, help="data de protocolo final (AAAA-MM-DD)")
+    parser.add_argument("--minimo", type=int, default=1, help="processos mínimos para um grupo ganhar relatório")
+    args = parser.parse_args()
+    if not os.path.exists(args.banco): parser.error(f"banco não encontrado: {args.banco}")
+
+    def progresso(feitos, total):
+        print(f"\r  {feitos}/{total} relatórios", end="", file=sys.stderr, flush=True)
+    try:
+        r = gerar_lote(args.banco, args.por, args.saida, args.trabalhadores, args.desde, args.ate, args.minimo, progresso)
+    except RuntimeError as e:
+        parser.error(str(e))
+    print(file=sys.stderr)
+    print(f"{r['relatorios']} relatório(s) em {args.saida} ({r['bytes'] / 1e6:.1f} MB) em {r['segundos']:.1f}s "
+          f"= {r['por_segundo']:.2f} relatórios/s")
+    print(f"  agregação {r['agregacao']:.2f}s | geração {r['geracao']:.1f}s com {args.trabalhadores} processo(s) "
+          f"(soma dos relatórios {r['soma_tarefas']:.1f}s, paralelismo efetivo {r['soma_tarefas'] / r['geracao'] if r['geracao'] else 0:.1f}x)")
+    for caminho, erro in r['erros']: print(f"  ERRO {caminho}: {erro}")
+    sys.exit(1 if r['erros'] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+from datetime import date, timedelta
+from cache_leituras import cacheado
+from migracoes import TABELAS_DOMINIO
+
+# ==================== TENDÊNCIAS (SÉRIES POR DIA, SEMANA E MÊS) ====================
+# Contagens por período mantidas por triggers em três tabelas (tendencia_dia, tendencia_semana, tendencia_mes):
+# uma série de anos cabe em poucas centenas de linhas por métrica e nenhuma consulta de tendência varre os processos.
+# Métricas (chave entre parênteses):
+#   protocolo  processos pela data de protocolo (0)
+#   entrada    movimentações pela data de entrada no setor (setor)
+#   saida      movimentações pela data de saída do setor (setor)
+#   transicao  mudanças de status pelo dia em que aconteceram (novo status)
+# As transições não têm histórico nas tabelas de origem: são contadas a partir da criação das tendências e
+# preservadas quando as demais métricas são recalculadas.
+
+# Grão -> expressão SQL do início do período (semana começando na segunda-feira)
+GRAOS = {
+    'dia': "date({d})",
+    'semana': "date({d}, '-6 days', 'weekday 1')",
+    'mes': "strftime('%Y-%m-01', {d})",
+}
+NOMES_GRAO = {'dia': "Diário", 'semana': "Semanal", 'mes': "Mensal"}
+# Métrica -> domínio da chave (para filtrar e nomear)
+CHAVES = {'protocolo': None, 'entrada': 'setor', 'saida': 'setor', 'transicao': 'status'}
+RECALCULAVEIS = ('protocolo', 'entrada', 'saida')
+HOJE_SQL = "date('now', 'localtime')"
+
+def _sql_evento(metrica, data, chave, sinal, condicao="1"):
+    # Um upsert por grão; a data inválida ou vazia não conta em nenhum período
+    cmds = []
+    for grao, periodo in GRAOS.items():
+        periodo = periodo.format(d=data)
+        cmds.append(f"""INSERT INTO tendencia_{grao} (metrica, periodo, chave, quantidade)
+        SELECT '{metrica}', {periodo}, {chave}, {sinal} WHERE julianday({data}) IS NOT NULL AND {condicao}
+        ON CONFLICT(metrica, periodo, chave) DO UPDATE SET quantidade = quantidade + excluded.quantidade;""")
+        if sinal < 0:
+            cmds.append(f"DELETE FROM tendencia_{grao} WHERE metrica = '{metrica}' AND periodo = {periodo} AND chave = {chave} AND quantidade <= 0;")
+    return "\n".join(cmds)
+
+def _sql_processo(linha, sinal):
+    return _sql_evento('protocolo', f"{linha}.data_protocolo", "0", sinal)
+
+def _sql_tramitacao(linha, sinal):
+    setor = f"COALESCE({linha}.setor_id, 0)"
+    return (_sql_evento('entrada', f"{linha}.data_entrada", setor, sinal) + "\n"
+            + _sql_evento('saida', f"{linha}.data_saida", setor, sinal, f"{linha}.data_saida IS NOT NULL"))
+
+def reconstruir_tendencias(c):
+    # Dia a partir das tabelas de origem; semana e mês somando os dias (as transições ficam como estão)
+    lista = ", ".join(f"'{m}'" for m in RECALCULAVEIS)
+    for grao in GRAOS: c.execute(f"DELETE FROM tendencia_{grao} WHERE metrica IN ({lista})")
+    dia = GRAOS['dia']
+    c.execute(f"""INSERT INTO tendencia_dia (metrica, periodo, chave, quantidade)
+        SELECT 'protocolo', {dia.format(d='data_protocolo')}, 0, COUNT(*) FROM processos_base
+        WHERE julianday(data_protocolo) IS NOT NULL GROUP BY 2""")
+    for metrica, coluna in (('entrada', 'data_entrada'), ('saida', 'data_saida')):
+        c.execute(f"""INSERT INTO tendencia_dia (metrica, periodo, chave, quantidade)
+            SELECT '{metrica}', {dia.format(d=coluna)}, COALESCE(setor_id, 0), COUNT(*) FROM tramitacao_base
+            WHERE julianday({coluna}) IS NOT NULL GROUP BY 2, 3""")
+    for grao in ('semana', 'mes'):
+        c.execute(f"""INSERT INTO tendencia_{grao} (metrica, periodo, chave, quantidade)
+            SELECT metrica, {GRAOS[grao].format(d='periodo')}, chave, SUM(quantidade) FROM tendencia_dia
+            WHERE metrica IN ({lista}) GROUP BY 1, 2, 3""")
+
+def criar_estruturas(c):
+    for grao in GRAOS:
+        c.execute(f'''CREATE TABLE IF NOT EXISTS tendencia_{grao} (
+            metrica TEXT NOT NULL, periodo TEXT NOT NULL, chave INTEGER NOT NULL, quantidade INTEGER DEFAULT 0,
+            PRIMARY KEY (metrica, periodo, chave)
+        ) WITHOUT ROWID''')
+    existe = c.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='trg_tendencia_proc_ins'").fetchone()
+    gatilhos = {
+        "trg_tendencia_proc_ins": ("AFTER INSERT ON processos_base", _sql_processo("NEW", 1)),
+        "trg_tendencia_proc_del": ("AFTER DELETE ON processos_base", _sql_processo("OLD", -1)),
+        "trg_tendencia_proc_upd": ("AFTER UPDATE OF data_protocolo ON processos_base",
+                                   _sql_processo("OLD", -1) + "\n" + _sql_processo("NEW", 1)),
+        # A edição do processo regrava o status mesmo sem mudança: só conta quando o valor muda
+        "trg_tendencia_status": ("AFTER UPDATE OF status_id ON processos_base WHEN OLD.status_id IS NOT NEW.status_id",
+                                 _sql_evento('transicao', HOJE_SQL, "COALESCE(NEW.status_id, 0)", 1)),
+        "trg_tendencia_tram_ins": ("AFTER INSERT ON tramitacao_base", _sql_tramitacao("NEW", 1)),
+        "trg_tendencia_tram_del": ("AFTER DELETE ON tramitacao_base", _sql_tramitacao("OLD", -1)),
+        "trg_tendencia_tram_upd": ("AFTER UPDATE OF setor_id, data_entrada, data_saida ON tramitacao_base",
+                                   _sql_tramitacao("OLD", -1) + "\n" + _sql_tramitacao("NEW", 1)),
+    }
+    for nome, (evento, corpo) in gatilhos.items():
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS {nome} {evento} BEGIN\n{corpo}\nEND")
+    if not existe: reconstruir_tendencias(c)
+
+# === PERÍODOS ===
+def inicio_periodo(d, grao):
+    if grao == 'semana': return d - timedelta(days=d.weekday())
+    if grao == 'mes': return d.replace(day=1)
+    return d
+
+def periodos(grao, inicio, fim):
+    """Inícios de período (AAAA-MM-DD) de `inicio` a `fim`, inclusive."""
+    atual, fim = inicio_periodo(inicio, grao), inicio_periodo(fim, grao)
+    resultado = []
+    while atual <= fim:
+        resultado.append(atual.isoformat())
+        if grao == 'mes': atual = (atual + timedelta(days=32)).replace(day=1)
+        else: atual += timedelta(days=7 if grao == 'semana' else 1)
+    return resultado
+
+def _filtro_chave(metrica, valor):
+    if valor is None or not CHAVES[metrica]: return "", ()
+    return f" AND chave = (SELECT id FROM {TABELAS_DOMINIO[CHAVES[metrica]]} WHERE nome = ?)", (valor,)
+
+# === CONSULTAS ===
+@cacheado()
+def serie(conn, metrica, grao, inicio, fim, valor=None):
+    """[(período, quantidade)] de `inicio` a `fim`, com zero nos períodos sem registro. `valor` filtra a chave
+    pelo nome (setor nas movimentações, novo status nas transições)."""
+    ps = periodos(grao, inicio, fim)
+    filtro, params = _filtro_chave(metrica, valor)
+    contagens = dict(conn.execute(f"""SELECT periodo, SUM(quantidade) FROM tendencia_{grao}
+        WHERE metrica = ? AND periodo BETWEEN ? AND ?{filtro} GROUP BY periodo""", (metrica, ps[0], ps[-1], *params)).fetchall()) if ps else {}
+    return [(p, contagens.get(p, 0)) for p in ps]
+
+@cacheado()
+def serie_por_chave(conn, metrica, grao, inicio, fim):
+    """[(período, nome da chave, quantidade)] só dos períodos com registro, para gráficos empilhados."""
+    ps = periodos(grao, inicio, fim)
+    if not ps: return []
+    dominio = CHAVES[metrica]
+    nome, juncao = ("'Total'", "") if not dominio else ("COALESCE(d.nome, '(sem)')", f"LEFT JOIN {TABELAS_DOMINIO[dominio]} d ON d.id = t.chave")
+    return conn.execute(f"""SELECT t.periodo, {nome}, SUM(t.quantidade) FROM tendencia_{grao} t {juncao}
+        WHERE t.metrica = ? AND t.periodo BETWEEN ? AND ? GROUP BY 1, 2 ORDER BY 1, 2""", (metrica, ps[0], ps[-1])).fetchall()
+
+@cacheado()
+def estoque(conn, grao, inicio, fim, setor=None):
+    """[(período, movimentações em aberto no fim do período)]: entradas menos saídas acumuladas desde o início da história."""
+    ps = periodos(grao, inicio, fim)
+    if not ps: return []
+    filtro, params = _filtro_chave('entrada', setor)
+    # Saídas contam no período em que aconteceram; a soma acumulada percorre só a tabela do grão (poucas linhas por período)
+    linhas = conn.execute(f"""SELECT periodo, SUM(SUM(CASE metrica WHEN 'entrada' THEN quantidade ELSE -quantidade END)) OVER (ORDER BY periodo)
+        FROM tendencia_{grao} WHERE metrica IN ('entrada', 'saida') AND periodo <= ?{filtro}
+        GROUP BY periodo ORDER BY periodo""", (ps[-1], *params)).fetchall()
+    resultado, saldo, i = [], 0, 0
+    for p in ps:
+        while i < len(linhas) and linhas[i][0] <= p:
+            saldo = linhas[i][1]; i += 1
+        resultado.append((p, saldo))
+    return resultado
+
+@cacheado()
+def totais(conn, inicio, fim):
+    """Totais do intervalo por métrica (lidos do grão diário)."""
+    return dict(conn.execute("""SELECT metrica, SUM(quantidade) FROM tendencia_dia WHERE periodo BETWEEN ? AND ? GROUP BY metrica""",
+                             (inicio.isoformat(), fim.isoformat())).fetchall())
+
+def intervalo_padrao(hoje=None, meses=12):
+    """(início, fim) dos últimos `meses` meses completos mais o atual."""
+    hoje = hoje or date.today()
+    ano, mes = divmod(hoje.year * 12 + hoje.month - 1 - meses, 12)
+    return date(ano, mes + 1, 1), hoje
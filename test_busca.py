@@ -0,0 +1,42 @@
+import sqlite3
+import threading
+import pytest
+import banco
+import busca
+
+@pytest.fixture
+def db(db):
+    for numero, requerente, analista, status in (("100/2024", "Maria Souza", "Ana Lima", "Em Análise"),
+                                                 ("101/2024", "João Pereira", "Ana Lima", "Aprovado"),
+                                                 ("102/2024", "Maria Alves", "Bruno Costa", "Aprovado")):
+        db.escrever("INSERT INTO processos (numero, requerente, analista, data_protocolo, status) VALUES (?, ?, ?, '2024-05-02', ?)",
+                    (numero, requerente, analista, status))
+    return db
+
+def _em_outra_thread(funcao):
+    # Como o rerun de um fragmento do Streamlit: outra thread, depois da primeira execução do script
+    resultado = {}
+    def rodar():
+        try: resultado['valor'] = funcao()
+        except Exception as e: resultado['erro'] = e
+    t = threading.Thread(target=rodar); t.start(); t.join()
+    if 'erro' in resultado: raise resultado['erro']
+    return resultado['valor']
+
+def _numeros(linhas):
+    return sorted(l[1] for l in linhas)
+
+def test_busca_em_outra_thread_com_a_conexao_da_thread(db):
+    assert _numeros(busca.buscar_processos(db.conexao(), "maria")) == ["100/2024", "102/2024"]
+    achados = _em_outra_thread(lambda: busca.buscar_processos(banco.obter().conexao(), "maria", status="Aprovado"))
+    assert _numeros(achados) == ["102/2024"]
+
+def test_busca_por_prefixo_a_cada_tecla(db):
+    for termo, esperado in (("jo", ["101/2024"]), ("joão", ["101/2024"]), ("joão pe", ["101/2024"]), ("102", ["102/2024"])):
+        assert _numeros(_em_outra_thread(lambda: busca.buscar_processos(db.conexao(), termo))) == esperado
+
+def test_conexao_da_thread_anterior_nao_serve(db):
+    # O motivo de o app não guardar a conexão numa variável global
+    conn = db.conexao()
+    with pytest.raises(sqlite3.ProgrammingError):
+        _em_outra_thread(lambda: busca.buscar_processos(conn, "maria"))
@@ -0,0 +1,71 @@
+import banco
+
+def test_cadastro_retorna_o_id_gerado(db):
+    for i in range(3):
+        suc, res = banco.salvar_processo({'numero': f"P-{i}", 'requerente': "Fulano", 'analista': " Ana ", 'uso': "Misto"})
+        assert suc and res.rowcount == 1
+        assert banco.buscar_processo(res.lastrowid)[1] == f"P-{i}"
+    linha = banco.buscar_processo("P-0")
+    assert (linha[4], linha[5], linha[9]) == ("Ana", "Misto", "Protocolado")
+
+def test_atualizacao_informa_se_achou_o_processo(db):
+    _, res = banco.salvar_processo({'numero': "P-1"})
+    suc, atualizado = banco.salvar_processo({'numero': "P-1", 'status': "Aprovado", 'analista': ""}, res.lastrowid)
+    assert suc and atualizado == (1, res.lastrowid)
+    assert banco.buscar_processo(res.lastrowid)[9] == "Aprovado" and banco.buscar_processo(res.lastrowid)[4] is None
+    assert banco.salvar_processo({'numero': "P-2"}, 999)[1].rowcount == 0
+    assert banco.salvar_processo({'numero': "P-1"})[0] is False  # número repetido
+
+def test_movimentacao_fecha_a_aberta_e_exclusao_em_cascata(db):
+    _, proc = banco.salvar_processo({'numero': "P-1"})
+    _, m1 = banco.salvar_movimentacao({'processo_id': proc.lastrowid, 'setor': "Analista", 'data_entrada': "2024-01-02"})
+    _, m2 = banco.salvar_movimentacao({'processo_id': proc.lastrowid, 'setor': "Requerente", 'data_entrada': "2024-02-01"}, fechar_aberta=True)
+    assert m2.lastrowid > m1.lastrowid
+    linhas = db.conexao().execute("SELECT id, setor, data_saida FROM tramitacao ORDER BY id").fetchall()
+    assert linhas == [(m1.lastrowid, "Analista", "2024-02-01"), (m2.lastrowid, "Requerente", None)]
+    assert banco.excluir_movimentacao(m1.lastrowid)[1].rowcount == 1
+    assert banco.excluir_processo(proc.lastrowid)[1].rowcount == 1
+    assert db.conexao().execute("SELECT COUNT(*) FROM tramitacao_base").fetchone()[0] == 0
+
+def test_escrita_pela_view_nao_informa_zero(db):
+    assert db.escrever("INSERT INTO processos (numero) VALUES ('P-9')") == (None, None)
+    assert db.escrever("UPDATE processos_base SET rt = 'x'").rowcount == 1
+
+def test_gravacao_durante_carga_rapida(db):
+    import cache_leituras
+    _, proc = banco.salvar_processo({'numero': "P-1"})
+    db.transacao(banco.suspender_derivados)
+    versao = cache_leituras.versao_dados(db.conexao())[1]
+    banco.salvar_processo({'numero': "P-1", 'status': "Aprovado"}, proc.lastrowid)
+    assert cache_leituras.versao_dados(db.conexao())[1] > versao
+    versao = cache_leituras.versao_dados(db.conexao())[1]
+    db.transacao(banco.retomar_derivados)
+    assert cache_leituras.versao_dados(db.conexao())[1] > versao
+    assert db.conexao().execute("SELECT SUM(quantidade) FROM tendencia_dia WHERE metrica = 'transicao'").fetchone()[0] == 1
+
+def test_nomes_acentuados_com_caixa_diferente_sao_um_so(db):
+    for i, nome in enumerate(["joão silva ", "JOÃO SILVA", "João Silva"]):
+        banco.salvar_processo({'numero': f"P-{i}", 'analista': nome, 'status': "em análise"})
+    banco.mover_processos([1], "EM ANÁLISE")
+    assert banco.listar_analistas() == ["João Silva"] and banco.listar_status() == ["Em Análise"]
+    assert list(banco.resumo_dashboard(db.conexao())['analista']['analista']) == ["João Silva"]
+    # Também pelas views, que resolvem os nomes nos triggers
+    db.escrever("INSERT INTO processos (numero, analista) VALUES ('P-9', 'JOÃO SILVA')")
+    assert db.conexao().execute("SELECT COUNT(DISTINCT analista_id) FROM processos_base").fetchone()[0] == 1
+
+def test_migracao_junta_variacoes_ja_gravadas(tmp_path):
+    import sqlite3
+    import migracoes
+    caminho = str(tmp_path / "antigo.db")
+    conn = sqlite3.connect(caminho)
+    for numero, migracao in enumerate(migracoes.MIGRACOES[:3], 1):
+        migracao(conn.cursor()); conn.execute(f"PRAGMA user_version = {numero}")
+    conn.executemany("INSERT INTO processos (numero, analista, status) VALUES (?, ?, ?)",
+                     [("P-1", "ana lúcia", "EM ANÁLISE"), ("P-2", "ANA LÚCIA", "Em Análise"), ("P-3", "Ana Lúcia", None)])
+    conn.commit(); conn.close()
+    db = banco.iniciar(caminho)
+    try:
+        assert banco.listar_analistas() == ["Ana Lúcia"] and banco.listar_status() == ["Em Análise", "Protocolado"]
+        assert list(banco.resumo_dashboard(db.conexao())['analista']['analista']) == ["Ana Lúcia"]
+    finally:
+        db.fechar()
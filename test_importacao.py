@@ -0,0 +1,26 @@
+import io
+import os
+import banco
+import importacao
+
+def _importar(db, texto, tipo='processos'):
+    cabecalho, linhas = importacao.ler_tabela(io.BytesIO(texto.encode()), "dados.csv")
+    return importacao.importar(db, linhas, importacao.mapear_colunas(cabecalho, tipo), tipo)
+
+def test_processo_importado_sem_area_abre_no_formulario(db, tmp_path, monkeypatch):
+    from streamlit.testing.v1 import AppTest
+    assert _importar(db, "Número;Requerente\nP-1;Fulano\n")['importadas'] == 1
+    assert db.conexao().execute("SELECT area FROM processos_base").fetchone()[0] == 0
+    # Bases anteriores ao padrão podem ter a área vazia: o formulário também precisa abrir
+    db.escrever("INSERT INTO processos_base (numero) VALUES ('P-0')")
+    # O app abre banco.CAMINHO_DB (relativo): o mesmo arquivo do fixture
+    monkeypatch.chdir(tmp_path)
+    at = AppTest.from_file(os.path.join(os.path.dirname(__file__), "app.py"), default_timeout=120)
+    at.session_state['logged_in'] = True
+    at.run()
+    at.radio(key="aba").set_value("📝 Gerenciar").run()
+    try:
+        assert not at.exception
+        assert [n.value for n in at.number_input if n.label == "Área"] == [0.0]
+    finally:
+        banco._banco.fechar()
@@ -0,0 +1,26 @@
+import pytest
+import banco
+
+def _cadastrar(db, datas):
+    for i, data in enumerate(datas, start=1):
+        db.escrever("INSERT INTO processos (numero, requerente, data_protocolo, status) VALUES (?, ?, ?, 'Protocolado')",
+                    (f"P-{i}", f"Requerente {i}", data))
+
+def _todas_as_paginas(ordem, limite):
+    ids, cursor = [], None
+    while True:
+        linhas, cursor = banco.listar_processos_pagina(ordem=ordem, cursor=cursor, limite=limite)
+        ids.extend(l[0] for l in linhas)
+        if cursor is None: return ids
+
+@pytest.mark.parametrize("ordem", list(banco.ORDENACOES_PROCESSOS))
+@pytest.mark.parametrize("limite", [1, 2, 3, 10])
+def test_paginas_incluem_datas_vazias(db, ordem, limite):
+    _cadastrar(db, ["2024-01-10", "2024-03-05", None, "2024-03-05", None, "2023-12-01"])
+    ids = _todas_as_paginas(ordem, limite)
+    assert sorted(ids) == [1, 2, 3, 4, 5, 6]
+    assert len(ids) == len(set(ids))
+
+def test_data_vazia_fica_no_fim(db):
+    _cadastrar(db, ["2024-01-10", None, "2024-03-05", "2024-03-05"])
+    assert _todas_as_paginas("Data de protocolo", 1) == [4, 3, 1, 2]
@@ -0,0 +1,30 @@
+import sqlite3
+import pytest
+import banco
+import migracoes
+import relatorios_lote
+
+def test_banco_aberto_somente_para_leitura(db):
+    conn = relatorios_lote.abrir_somente_leitura(db.caminho)
+    try:
+        with pytest.raises(sqlite3.OperationalError): conn.execute("INSERT INTO processos_base (numero) VALUES ('P-1')")
+    finally:
+        conn.close()
+
+def test_banco_desatualizado_e_recusado(tmp_path):
+    caminho = str(tmp_path / "antigo.db")
+    conn = sqlite3.connect(caminho)
+    migracoes._m1_tabelas_iniciais(conn.cursor()); conn.execute("PRAGMA user_version = 1"); conn.commit(); conn.close()
+    with pytest.raises(RuntimeError): relatorios_lote.gerar_lote(caminho, ['geral'], str(tmp_path / "saida"))
+    assert migracoes.versao(sqlite3.connect(caminho)) == 1
+
+def test_processo_com_duas_movimentacoes_abertas_conta_num_setor(db):
+    _, proc = banco.salvar_processo({'numero': "P-1", 'area': 100})
+    banco.salvar_movimentacao({'processo_id': proc.lastrowid, 'setor': "Analista", 'data_entrada': "2024-01-02"})
+    banco.salvar_movimentacao({'processo_id': proc.lastrowid, 'setor': "Requerente", 'data_entrada': "2024-02-01"})
+    conn = relatorios_lote.abrir_somente_leitura(db.caminho)
+    try:
+        df = relatorios_lote.agregar(conn, 'setor')
+    finally:
+        conn.close()
+    assert df[['grupo', 'total', 'area']].values.tolist() == [["Requerente", 1, 100.0]]
@@ -0,0 +1,119 @@
+"""Teste de carga do acesso ao banco: simula várias sessões simultâneas lendo e escrevendo."""
+import os
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+from collections import Counter
+import banco
+
+# ==================== TESTE DE CARGA ====================
+# Camada atual (WAL + conexão por thread + escritor em lote) contra o modo antigo (uma conexão sem trava, commit por comando)
+STATUS = ['Protocolado', 'Em Análise', 'Aguardando Correções', 'Aprovado', 'Reprovado']
+SETORES = ["Análise prévia", "Pré-análise", "Analista", "Parecer externo", "Fiscalização", "Emissão de documentos", "Requerente"]
+
+def preparar_banco(caminho, n_processos):
+    banco.iniciar(caminho).fechar()
+    conn = sqlite3.connect(caminho)
+    with conn:
+        conn.executemany(
+            "INSERT INTO processos (numero, requerente, analista, uso, tipologia, area, data_protocolo, status) VALUES (?,?,?,?,?,?,?,?)",
+            [(f"CARGA-{i}", f"Requerente {i}", f"Analista {i % 12}", "Multifamiliar", "Regularização",
+              random.uniform(50, 2000), f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", random.choice(STATUS)) for i in range(n_processos)]
+        )
+    conn.close()
+
+def executor_legado(caminho):
+    # Reproduz o acesso antigo: uma conexão para todas as threads, sem trava, commit por comando
+    conn = sqlite3.connect(caminho, check_same_thread=False)
+    def executar(query, params=(), commit=False):
+        try:
+            c = conn.cursor()
+            c.execute(query, params)
+            if commit: conn.commit()
+            return True, c
+        except Exception as e:
+            return False, str(e)
+    return executar
+
+def sessao(executar, n_operacoes, max_id, latencias, erros, lock, semente):
+    rnd = random.Random(semente)
+    for _ in range(n_operacoes):
+        op = rnd.random()
+        inicio = time.perf_counter()
+        if op < 0.35:
+            tipo = 'leitura'
+            suc, res = executar("""SELECT id, numero, requerente, status_id, id FROM processos_base
+                WHERE status_id = (SELECT id FROM status_processo WHERE nome = ?) ORDER BY id DESC LIMIT 51""", (rnd.choice(STATUS),))
+        elif op < 0.55:
+            tipo = 'leitura'
+            suc, res = executar("SELECT status_id, COUNT(*) FROM processos_base GROUP BY status_id")
+        elif op < 0.75:
+            tipo = 'leitura'
+            suc, res = executar("SELECT * FROM processos WHERE id = ?", (rnd.randint(1, max_id),))
+        elif op < 0.9:
+            tipo = 'escrita'
+            suc, res = executar("INSERT INTO tramitacao (processo_id, setor, data_entrada, observacao) VALUES (?,?,date('now'),?)",
+                                (rnd.randint(1, max_id), rnd.choice(SETORES), "teste de carga"), commit=True)
+        else:
+            tipo = 'escrita'
+            suc, res = executar("UPDATE processos SET status=? WHERE id=?", (rnd.choice(STATUS), rnd.randint(1, max_id)), commit=True)
+        if suc and tipo == 'leitura':
+            try: res.fetchall()
+            except Exception as e: suc, res = False, str(e)
+        duracao = time.perf_counter() - inicio
+        with lock:
+            latencias[tipo].append(duracao)
+            if not suc: erros[str(res)[:80]] += 1
+
+def percentil(valores, p):
+    if not valores: return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sessoes", type=int, default=16)
+    parser.add_argument("--operacoes", type=int, default=300, help="operações por sessão")
+    parser.add_argument("--processos", type=int, default=20000, help="processos na base sintética")
+    parser.add_argument("--modo", choices=["atual", "legado"], default="atual")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.semente)
+    pasta = tempfile.mkdtemp(prefix="carga_")
+    caminho = os.path.join(pasta, "processos.db")
+    preparar_banco(caminho, args.processos)
+
+    if args.modo == "atual":
+        db = banco.iniciar(caminho)
+        executar = banco.executar_query
+    else:
+        db = None
+        executar = executor_legado(caminho)
+
+    latencias = {'leitura': [], 'escrita': []}
+    erros, lock = Counter(), threading.Lock()
+    threads = [threading.Thread(target=sessao, args=(executar, args.operacoes, args.processos, latencias, erros, lock, args.semente + i))
+               for i in range(args.sessoes)]
+    inicio = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    total = time.perf_counter() - inicio
+
+    n_ops = args.sessoes * args.operacoes
+    print(f"Modo: {args.modo} | {args.sessoes} sessões x {args.operacoes} operações | base com {args.processos} processos")
+    print(f"Tempo total: {total:.2f}s | {n_ops / total:,.0f} operações/s")
+    for tipo, valores in latencias.items():
+        print(f"  {tipo:8s} n={len(valores):6d}  p50={percentil(valores, 50) * 1000:7.2f}ms  "
+              f"p95={percentil(valores, 95) * 1000:7.2f}ms  p99={percentil(valores, 99) * 1000:7.2f}ms")
+    if db:
+        print(f"  escritor: {db.escritor.escritas} escritas em {db.escritor.transacoes} transações")
+        db.fechar()
+    print(f"Erros: {sum(erros.values())}")
+    for msg, n in erros.most_common(5): print(f"  {n:6d}  {msg}")
+
+if __name__ == "__main__":
+    main()